@@ -0,0 +1,150 @@
+"""
+Synthetic dataset for benchmarks, seeded into the in-memory backend
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from database.memory_client import MemorySupabaseClient
+from utils.level_calculator import calculate_level
+
+TIERS = range(1, 7)
+TOPICS = ["fitness", "reading", "cooking", "coding", "music", "finance", "language", "art"]
+
+
+@dataclass
+class DatasetConfig:
+    """Shape of the seeded dataset"""
+
+    users: int = 2000
+    heavy_users: int = 100  # users owning a large part of the item catalog
+    items_per_heavy_user: int = 250
+    quests_per_tier: int = 20
+    items_per_tier: int = 60
+    max_completed_quests: int = 30  # per regular user
+    max_owned_items: int = 20  # per regular user
+    seed: int = 42
+
+
+@dataclass
+class Dataset:
+    """Ids of the seeded rows, as the benchmark workers need them"""
+
+    user_ids: List[str] = field(default_factory=list)
+    quest_ids: List[str] = field(default_factory=list)
+    item_ids: List[str] = field(default_factory=list)
+    completed: Dict[str, set] = field(default_factory=dict)  # user -> quest ids
+    owned: Dict[str, set] = field(default_factory=dict)  # user -> item ids
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def seed_dataset(client: MemorySupabaseClient, config: DatasetConfig) -> Dataset:
+    """Populate every table with a reproducible, realistically skewed dataset"""
+    rng = random.Random(config.seed)
+    dataset = Dataset()
+    now = datetime.now(timezone.utc)
+
+    # Catalog: quests, items and achievements for every tier and topic
+    quests_by_topic: Dict[str, List[str]] = {}
+    for tier in TIERS:
+        for i in range(config.quests_per_tier):
+            topic = TOPICS[i % len(TOPICS)]
+            quest = client.seed("quests", [{
+                "title": f"Tier {tier} quest {i + 1}",
+                "description": f"Make progress on {topic}",
+                "topic": topic,
+                "tier": tier,
+                "glory_reward": 1000 * tier,
+                "xp_reward": 250 * tier,
+                "time_limit_hours": 24 * tier,
+                "enemy_name": f"Shade of {topic.title()}",
+                "enemy_type": "Shade",
+                "enemy_description": "A persistent obstacle",
+            }])[0]
+            dataset.quest_ids.append(quest["id"])
+            quests_by_topic.setdefault(topic, []).append(quest["id"])
+            client.seed("achievements", [{
+                "title": f"{quest['title']} cleared",
+                "description": "Complete the quest",
+                "achievement_type": "quest",
+                "color_tier": tier,
+                "quest_id": quest["id"],
+            }])
+        client.seed("achievements", [{
+            "title": f"Tier {tier} master",
+            "description": f"Complete every tier {tier} quest",
+            "achievement_type": "tier",
+            "tier": tier,
+            "color_tier": tier,
+            "is_rare": tier >= 5,
+        }])
+        for i in range(config.items_per_tier):
+            item = client.seed("items", [{
+                "name": f"Tier {tier} item {i + 1}",
+                "description": "A collectible",
+                "rarity_tier": tier,
+                "rarity_stars": 1 + i % 6,
+                "price": 500 * tier,
+            }])[0]
+            dataset.item_ids.append(item["id"])
+
+    for topic in quests_by_topic:
+        client.seed("achievements", [{
+            "title": f"{topic.title()} questline",
+            "description": f"Complete every {topic} quest",
+            "achievement_type": "questline",
+            "topic": topic,
+            "color_tier": 3,
+        }])
+    for tier, threshold in zip(TIERS, (1, 10, 25, 50, 100, 200)):
+        client.seed("achievements", [{
+            "title": f"Collector {threshold}",
+            "description": f"Own {threshold} items",
+            "achievement_type": "collection",
+            "tier": tier,
+            "color_tier": tier,
+        }])
+
+    # Users, their completed quests and owned items
+    for n in range(config.users):
+        heavy = n < config.heavy_users
+        xp = rng.randint(0, 250_000)
+        user = client.seed("users", [{
+            "username": f"bench_user_{n}",
+            "email": f"bench_user_{n}@example.com",
+            "total_glory": 10**9,  # enough to purchase anything
+            "total_xp": xp,
+            "level": calculate_level(xp),
+            "created_at": _iso(now - timedelta(minutes=n)),
+        }])[0]
+        user_id = user["id"]
+        dataset.user_ids.append(user_id)
+
+        completed_count = rng.randint(
+            0, min(config.max_completed_quests, len(dataset.quest_ids))
+        )
+        completed = rng.sample(dataset.quest_ids, completed_count)
+        for quest_id in completed:
+            finished = now - timedelta(hours=rng.randint(1, 24 * 90))
+            client.seed("user_completed_quests", [{
+                "user_id": user_id,
+                "quest_id": quest_id,
+                "is_active": False,
+                "started_at": _iso(finished - timedelta(hours=2)),
+                "deadline_at": _iso(finished + timedelta(hours=22)),
+                "completed_at": _iso(finished),
+            }])
+        dataset.completed[user_id] = set(completed)
+
+        owned_count = (
+            config.items_per_heavy_user if heavy else rng.randint(0, config.max_owned_items)
+        )
+        owned = rng.sample(dataset.item_ids, min(owned_count, len(dataset.item_ids)))
+        client.seed("user_items", [{"user_id": user_id, "item_id": item_id} for item_id in owned])
+        dataset.owned[user_id] = set(owned)
+
+    return dataset
@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark of the hot endpoints
+
+Seeds the in-memory backend with a synthetic dataset, then drives the full
+ASGI app (middleware, routers, services, caches) with concurrent simulated
+users. Each user session lists quests, starts one, reads the active quests,
+optionally chats about it, completes it, buys an item and lists its items.
+
+Results are printed (or written with --output) as JSON: throughput and
+p50/p95/p99 latency per endpoint, plus database calls per request taken from
+the X-DB-Queries header.
+
+Usage (from embark-backend/):
+    uv run python -m benchmarks.run --duration 30 --concurrency 64 --output before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Embark API in-process")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds first")
+    parser.add_argument("--concurrency", type=int, default=32, help="simulated users at once")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--heavy-users", type=int, default=100)
+    parser.add_argument("--items-per-heavy-user", type=int, default=250)
+    parser.add_argument("--quests-per-tier", type=int, default=20)
+    parser.add_argument("--items-per-tier", type=int, default=60)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0,
+                        help="simulated round trip per database call")
+    parser.add_argument("--chat", action="store_true",
+                        help="include quest chat, answered by a local OpenAI stub")
+    parser.add_argument("--openai-latency-ms", type=float, default=500.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Settings are read at import time, so this must run before importing the app"""
+    os.environ["DATABASE_BACKEND"] = "memory"
+    os.environ["MEMORY_DB_LATENCY_MS"] = str(args.db_latency_ms)
+    os.environ["DEBUG"] = "true"  # X-DB-Queries header
+    # The in-memory backend implements the database functions
+    os.environ.setdefault("QUEST_COMPLETION_USE_RPC", "true")
+    os.environ.setdefault("ITEM_PURCHASE_USE_RPC", "true")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.chat:
+        from benchmarks.openai_stub import start_openai_stub
+
+        os.environ["OPENAI_BASE_URL"] = start_openai_stub(args.openai_latency_ms)
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Per-endpoint latencies, status codes and database call counts"""
+
+    def __init__(self):
+        self.enabled = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.db_queries: Dict[str, List[int]] = defaultdict(list)
+
+    def record(self, name: str, seconds: float, status: int, db_queries: Optional[str]):
+        if not self.enabled:
+            return
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+        if db_queries is not None:
+            self.db_queries[name].append(int(db_queries))
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            queries = self.db_queries[name]
+            errors = sum(n for status, n in self.statuses[name].items() if status >= 500)
+            endpoints[name] = {
+                "requests": len(values),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "errors_5xx": errors,
+                "status_codes": {str(k): v for k, v in sorted(self.statuses[name].items())},
+                "latency_ms": {
+                    "mean": round(sum(values) / len(values) * 1000, 3),
+                    "p50": round(percentile(values, 50) * 1000, 3),
+                    "p95": round(percentile(values, 95) * 1000, 3),
+                    "p99": round(percentile(values, 99) * 1000, 3),
+                    "max": round(values[-1] * 1000, 3),
+                },
+                "db_queries_per_request": {
+                    "mean": round(sum(queries) / len(queries), 2) if queries else None,
+                    "max": max(queries) if queries else None,
+                },
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+class Session:
+    """One simulated user working through the quest loop"""
+
+    def __init__(self, client, recorder: Recorder, dataset, rng: random.Random, chat: bool):
+        self.client = client
+        self.recorder = recorder
+        self.dataset = dataset
+        self.rng = rng
+        self.chat = chat
+
+    async def call(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.recorder.record(
+            name, time.perf_counter() - start, response.status_code,
+            response.headers.get("x-db-queries"),
+        )
+        return response
+
+    async def run(self, user_id: str) -> None:
+        dataset, rng = self.dataset, self.rng
+        await self.call("list_quests", "GET", "/api/quests", params={"tier": rng.randint(1, 6)})
+
+        quest_id = user_quest_id = None
+        available = [q for q in dataset.quest_ids if q not in dataset.completed[user_id]]
+        if available:
+            quest_id = rng.choice(available)
+            response = await self.call(
+                "start_quest", "POST", f"/api/users/{user_id}/quests/start",
+                json={"quest_id": quest_id},
+            )
+            if response.status_code == 201:
+                user_quest_id = response.json()["id"]
+
+        await self.call("get_active_quests", "GET", f"/api/users/{user_id}/quests/active")
+
+        if user_quest_id:
+            if self.chat:
+                await self.call(
+                    "quest_chat", "POST", f"/api/users/{user_id}/quests/{user_quest_id}/chat",
+                    json={"message": "How do I get started today?", "chat_history": []},
+                )
+            response = await self.call(
+                "complete_quest", "POST", f"/api/users/{user_id}/quests/{user_quest_id}/complete"
+            )
+            if response.status_code == 200:
+                dataset.completed[user_id].add(quest_id)
+                awarded = response.json().get("awarded_item")
+                if awarded:
+                    dataset.owned[user_id].add(awarded["item_id"])
+
+        unowned = [i for i in dataset.item_ids if i not in dataset.owned[user_id]]
+        if unowned:
+            item_id = rng.choice(unowned)
+            response = await self.call(
+                "purchase_item", "POST", f"/api/users/{user_id}/items/{item_id}/purchase"
+            )
+            if response.status_code == 200:
+                dataset.owned[user_id].add(item_id)
+
+        await self.call("get_user_items", "GET", f"/api/users/{user_id}/items")
+
+
+async def worker(session: Session, user_ids: List[str], stop_at: float) -> None:
+    i = 0
+    while time.perf_counter() < stop_at and user_ids:
+        await session.run(user_ids[i % len(user_ids)])
+        i += 1
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    import main
+    from benchmarks.dataset import DatasetConfig, seed_dataset
+    from database.supabase_client import get_async_supabase_client
+
+    config = DatasetConfig(
+        users=args.users,
+        heavy_users=args.heavy_users,
+        items_per_heavy_user=args.items_per_heavy_user,
+        quests_per_tier=args.quests_per_tier,
+        items_per_tier=args.items_per_tier,
+        seed=args.seed,
+    )
+    seed_start = time.perf_counter()
+    dataset = seed_dataset(get_async_supabase_client(), config)
+    seed_seconds = time.perf_counter() - seed_start
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", timeout=60.0
+        ) as client:
+            # Each worker owns a disjoint slice of users so sessions don't collide
+            workers = [
+                Session(client, recorder, dataset, random.Random(args.seed + n), args.chat)
+                for n in range(args.concurrency)
+            ]
+            slices = [dataset.user_ids[n::args.concurrency] for n in range(args.concurrency)]
+
+            if args.warmup > 0:
+                stop_at = time.perf_counter() + args.warmup
+                await asyncio.gather(*(worker(w, s, stop_at) for w, s in zip(workers, slices)))
+
+            recorder.enabled = True
+            start = time.perf_counter()
+            stop_at = start + args.duration
+            await asyncio.gather(*(worker(w, s, stop_at) for w, s in zip(workers, slices)))
+            elapsed = time.perf_counter() - start
+
+    return {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k != "output"},
+            "seed_seconds": round(seed_seconds, 3),
+            "python": platform.python_version(),
+            "git_revision": _git_revision(),
+        },
+        **recorder.report(elapsed),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    args = parse_args()
+    configure_environment(args)
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
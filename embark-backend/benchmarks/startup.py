@@ -0,0 +1,167 @@
+"""
+Cold start benchmark: import time and time to readiness
+
+Starts fresh interpreters that import the app and run its lifespan startup
+(client and service construction plus the warm-up) against the in-memory
+backend, and reports the median of several runs. One extra run under
+`python -X importtime` gives the slowest modules by cumulative and self time.
+
+The run fails (exit code 1) when the median exceeds the import or startup
+target, or when a module that is meant to load lazily (openai, the full
+supabase SDK) is imported with the app, so it can gate CI.
+
+Usage (from embark-backend/):
+    uv run python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# Loaded on first use only, never at import
+DEFERRED_MODULES = (
+    "openai",
+    "supabase",
+    "realtime",
+    "storage3",
+    "supabase_auth",
+    "supabase_functions",
+)
+
+DEFAULT_MAX_IMPORT_MS = 800.0
+DEFAULT_MAX_STARTUP_MS = 1000.0
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [m for m in {deferred!r} if m in sys.modules]
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (ready - start) * 1000,
+    "deferred_loaded": loaded,
+}}))
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure Embark API cold start")
+    parser.add_argument("--runs", type=int, default=5, help="timed interpreter starts")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to report")
+    parser.add_argument("--max-import-ms", type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help="target for the median import of main")
+    parser.add_argument("--max-startup-ms", type=float, default=DEFAULT_MAX_STARTUP_MS,
+                        help="target for the median import plus lifespan startup")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["DATABASE_BACKEND"] = "memory"
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def probe(importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    args += ["-c", PROBE.format(deferred=DEFERRED_MODULES)]
+    return subprocess.run(args, capture_output=True, text=True, env=child_env(), check=True)
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output as {module, self_ms, cumulative_ms}"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    samples = [json.loads(probe().stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    startup_ms = statistics.median(s["startup_ms"] for s in samples)
+    deferred_loaded = sorted({m for s in samples for m in s["deferred_loaded"]})
+
+    modules = parse_importtime(probe(importtime=True).stderr)
+    top_cumulative = sorted(modules, key=lambda r: r["cumulative_ms"], reverse=True)
+    top_self = sorted(modules, key=lambda r: r["self_ms"], reverse=True)
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.0f}ms, target {args.max_import_ms:.0f}ms")
+    if startup_ms > args.max_startup_ms:
+        failures.append(f"startup took {startup_ms:.0f}ms, target {args.max_startup_ms:.0f}ms")
+    if deferred_loaded:
+        failures.append(f"imported with the app: {', '.join(deferred_loaded)}")
+
+    return {
+        "config": {
+            "runs": args.runs,
+            "max_import_ms": args.max_import_ms,
+            "max_startup_ms": args.max_startup_ms,
+            "python": platform.python_version(),
+            "git_revision": _git_revision(),
+        },
+        "import_ms": {
+            "median": round(import_ms, 1),
+            "samples": [round(s["import_ms"], 1) for s in samples],
+        },
+        "startup_ms": {
+            "median": round(startup_ms, 1),
+            "samples": [round(s["startup_ms"], 1) for s in samples],
+        },
+        "deferred_loaded": deferred_loaded,
+        "modules_imported": len(modules),
+        "slowest_cumulative": top_cumulative[: args.top],
+        "slowest_self": top_self[: args.top],
+        "failures": failures,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    args = parse_args()
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in report["failures"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
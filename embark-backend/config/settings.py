@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     """Application settings"""
     
     # API Settings
+    DEBUG: bool = False
     API_TITLE: str = "Embark API"
     API_DESCRIPTION: str = "Life Gamification API for the Embark MVP"
     API_VERSION: str = "0.1.0"
@@ -25,14 +26,85 @@ class Settings(BaseSettings):
     CORS_ALLOW_HEADERS: List[str] = ["*"]
     
     # Database Settings (Supabase)
+    # "supabase", or "memory" for the in-process fake used in load tests/benchmarks
+    DATABASE_BACKEND: str = "supabase"
+    MEMORY_DB_LATENCY_MS: float = 0.0  # simulated round trip per call
+    MEMORY_DB_SEED_FILE: str = ""  # JSON {table: [rows]} loaded at startup
     SUPABASE_URL: str = ""
     SUPABASE_ANON_KEY: str = ""
-    
+    SUPABASE_HTTP_TIMEOUT: float = 10.0  # seconds per PostgREST call
+    SUPABASE_MAX_CONNECTIONS: int = 100
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+    # Catalog cache (quests, items, achievements)
+    CATALOG_CACHE_ENABLED: bool = True
+    CATALOG_CACHE_TTL_SECONDS: float = 300.0
+    CATALOG_CACHE_MAX_ENTRIES: int = 5000
+
+    # Prepared (pre-serialized, pre-compressed) catalog responses
+    CATALOG_RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 9
+    RESPONSE_BROTLI_QUALITY: int = 9
+
+    # Per-user progress snapshots (completed/active quests, owned items, achievements)
+    PROGRESS_CACHE_ENABLED: bool = True
+    PROGRESS_CACHE_TTL_SECONDS: float = 60.0
+    PROGRESS_CACHE_MAX_USERS: int = 10000
+
+    # Quest completion runs as one database transaction. Migration: apply
+    # database/complete_quest_transaction.sql, then set this to true. If the
+    # function is missing, completions fall back to the multi-query path.
+    QUEST_COMPLETION_USE_RPC: bool = False
+    # Achievement checks run in parallel when completing without the RPC
+    ACHIEVEMENT_CHECK_CONCURRENCY: int = 3
+
+    # Item purchases run as one conditional database operation. Migration:
+    # apply database/purchase_item_transaction.sql (it also adds the
+    # user_items (user_id, item_id) unique constraint), then set this to true.
+    # If the function is missing, purchases fall back to the multi-query path.
+    ITEM_PURCHASE_USE_RPC: bool = False
+
     # OpenAI Settings
     OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_TIMEOUT_SECONDS: float = 30.0  # per call (between chunks when streaming)
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    OPENAI_MAX_RETRIES: int = 1
+    OPENAI_MAX_CONNECTIONS: int = 50
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    # Quest chats calling OpenAI at once; others queue up to the timeout, then get a 503
+    CHAT_MAX_CONCURRENCY: int = 20
+    CHAT_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    # Answers to repeated short chats, per quest and normalized question
+    CHAT_CACHE_ENABLED: bool = True
+    CHAT_CACHE_TTL_SECONDS: float = 3600.0
+    CHAT_CACHE_MAX_ENTRIES: int = 5000
+    CHAT_CACHE_MAX_HISTORY: int = 2  # longest chat history still cached
+    # Prompt size per chat call: recent history is kept within the budget and
+    # older messages are replaced by a summary
+    CHAT_HISTORY_TOKEN_BUDGET: int = 3000
+    CHAT_SUMMARY_TOKEN_BUDGET: int = 200
+    CHAT_PROMPT_CACHE_MAX_ENTRIES: int = 1024
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0  # share of successful requests logged
+
+    # Per-request database call budget (0 disables a check); the count is
+    # returned in an X-DB-Queries header when DEBUG is on
+    DB_QUERY_BUDGET: int = 20
+    DB_QUERY_REPEAT_LIMIT: int = 5  # same table/filter shape per request
+
+    # GET /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>" and
+    # is not served at all while the token is empty
+    METRICS_TOKEN: str = ""
+
+    # Startup warm-up: open pools, load catalogs and build serializers before
+    # the app accepts traffic
+    STARTUP_WARMUP_ENABLED: bool = True
+    STARTUP_WARMUP_TIMEOUT_SECONDS: float = 20.0  # per phase
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,127 @@
+-- Quest Completion Transaction
+-- Completes a user quest and applies every reward in a single round trip:
+-- validates the deadline, marks the quest complete, adds glory/XP and the new
+-- level, awards a random unowned item from the quest's tier and runs the
+-- achievement checks. Everything commits or rolls back together.
+--
+-- Called from the API as: rpc("complete_user_quest", {p_user_id, p_user_quest_id})
+-- Errors:
+--   P0002 (no_data_found)   - user does not exist
+--   P0001 (raise_exception) - quest not active/not owned, quest missing, deadline passed
+
+CREATE OR REPLACE FUNCTION complete_user_quest(
+    p_user_id UUID,
+    p_user_quest_id UUID
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Cumulative XP required per level (must match utils/level_calculator.py)
+    v_level_xp CONSTANT INTEGER[] := ARRAY[
+        0, 300, 621, 964, 1331, 1724, 2145, 2595, 3077, 3593,
+        4145, 4736, 5368, 6044, 6767, 7541, 8369, 9255, 10203, 11217,
+        12302, 13463, 14705, 16034, 17456, 18978, 20607, 22350, 24215, 26211,
+        28347, 30633, 33079, 35696, 38496, 41492, 44698, 48128, 51798, 55725,
+        59927, 64423, 69234, 74382, 79890, 85784, 92091, 98839, 106059, 113784,
+        122050, 130895, 140359, 150485, 161320, 172913, 185318, 198591, 212793, 227989,
+        244249, 261647, 280263, 300182, 321495, 344300, 368701, 394810, 422747, 452640,
+        484626, 518851, 555472, 594656, 636583, 681445, 729447, 780809, 835766, 894570,
+        957490, 1024814, 1096851, 1173931, 1256407, 1344656, 1439082, 1540118, 1648227, 1763904,
+        1887678, 2020116, 2161825, 2313454, 2475697, 2649297, 2835049, 3033804, 3246472, 3474027
+    ];
+    v_user users%ROWTYPE;
+    v_user_quest user_completed_quests%ROWTYPE;
+    v_quest quests%ROWTYPE;
+    v_item items%ROWTYPE;
+    v_user_item user_items%ROWTYPE;
+    v_new_xp INTEGER;
+    v_awarded_item JSONB := NULL;
+    v_awarded_achievements JSONB;
+    v_known_achievements UUID[];
+BEGIN
+    -- Lock the user row so concurrent completions/purchases apply in order
+    SELECT * INTO v_user FROM users WHERE id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'User not found' USING ERRCODE = 'no_data_found';
+    END IF;
+
+    SELECT * INTO v_user_quest
+    FROM user_completed_quests
+    WHERE id = p_user_quest_id AND user_id = p_user_id AND is_active = TRUE
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Active quest not found or does not belong to user';
+    END IF;
+
+    SELECT * INTO v_quest FROM quests WHERE id = v_user_quest.quest_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Quest not found';
+    END IF;
+
+    IF now() > v_user_quest.deadline_at THEN
+        RAISE EXCEPTION 'Quest deadline has passed';
+    END IF;
+
+    -- Mark quest as completed
+    UPDATE user_completed_quests
+    SET is_active = FALSE, completed_at = now()
+    WHERE id = p_user_quest_id
+    RETURNING * INTO v_user_quest;
+
+    -- Award glory and XP, recalculate level, track lifetime glory
+    v_new_xp := v_user.total_xp + v_quest.xp_reward;
+    UPDATE users
+    SET total_glory = total_glory + v_quest.glory_reward,
+        total_xp = v_new_xp,
+        level = GREATEST(1, (SELECT count(*) FROM unnest(v_level_xp) AS xp WHERE xp <= v_new_xp)),
+        lifetime_glory_gained = lifetime_glory_gained + GREATEST(v_quest.glory_reward, 0)
+    WHERE id = p_user_id;
+
+    -- Award a random item from the quest's tier that the user doesn't own yet
+    SELECT i.* INTO v_item
+    FROM items i
+    WHERE i.rarity_tier = v_quest.tier
+      AND NOT EXISTS (
+          SELECT 1 FROM user_items ui WHERE ui.user_id = p_user_id AND ui.item_id = i.id
+      )
+    ORDER BY random()
+    LIMIT 1;
+
+    IF FOUND THEN
+        INSERT INTO user_items (user_id, item_id, acquired_at, is_featured)
+        VALUES (p_user_id, v_item.id, now(), FALSE)
+        RETURNING * INTO v_user_item;
+
+        v_awarded_item := to_jsonb(v_user_item) || jsonb_build_object('item', to_jsonb(v_item));
+    END IF;
+
+    -- Run the achievement checks; a failure here must not undo the completion
+    SELECT coalesce(array_agg(achievement_id), '{}') INTO v_known_achievements
+    FROM user_achievements WHERE user_id = p_user_id;
+
+    BEGIN
+        PERFORM check_quest_achievement(p_user_id, v_quest.id);
+        PERFORM check_tier_achievement(p_user_id, v_quest.tier);
+        PERFORM check_questline_achievement(p_user_id, v_quest.topic);
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'Error awarding achievements for user %: %', p_user_id, SQLERRM;
+    END;
+
+    SELECT coalesce(jsonb_agg(to_jsonb(a) ORDER BY a.achievement_type, a.tier), '[]'::jsonb)
+    INTO v_awarded_achievements
+    FROM achievements a
+    JOIN user_achievements ua ON ua.achievement_id = a.id
+    WHERE ua.user_id = p_user_id
+      AND NOT (a.id = ANY (v_known_achievements));
+
+    RETURN jsonb_build_object(
+        'user_quest', to_jsonb(v_user_quest),
+        'quest', to_jsonb(v_quest),
+        'awarded_item', v_awarded_item,
+        'awarded_achievements', v_awarded_achievements
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION complete_user_quest(UUID, UUID) TO anon, authenticated;
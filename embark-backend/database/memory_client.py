@@ -0,0 +1,754 @@
+"""
+In-memory stand-in for the async Supabase client
+
+Implements the subset of the supabase-py / postgrest query builder chain the
+services use (select/insert/update/delete, filters, ordering, ranges, embedded
+selects, exact counts and the achievement RPCs) over indexed in-process tables,
+so the full API can be exercised without network access.
+
+Selected with DATABASE_BACKEND=memory; see get_async_supabase_client().
+"""
+import asyncio
+import copy
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from postgrest import APIError, APIResponse
+from postgrest.base_request_builder import SingleAPIResponse
+
+from utils.level_calculator import calculate_level
+from utils.metrics import record_db_call
+from utils.query_budget import record_query
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Column defaults applied on insert (callables are evaluated per row)
+TABLE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "users": {
+        "total_glory": 0,
+        "total_xp": 0,
+        "level": 1,
+        "lifetime_glory_gained": 0,
+        "active_title_id": None,
+        "created_at": _now,
+    },
+    "quests": {
+        "glory_reward": 0,
+        "xp_reward": 0,
+        "time_limit_hours": 24,
+        "reward_item_id": None,
+        "enemy_image_url": None,
+        "created_at": _now,
+    },
+    "items": {"image_url": None, "price": 0, "created_at": _now},
+    "achievements": {
+        "tier": None,
+        "topic": None,
+        "is_rare": False,
+        "quest_id": None,
+        "created_at": _now,
+    },
+    "user_completed_quests": {"started_at": _now, "completed_at": None, "is_active": True},
+    "user_items": {"acquired_at": _now, "is_featured": False},
+    "user_achievements": {"unlocked_at": _now},
+}
+
+# Unique constraints (besides the primary key)
+TABLE_UNIQUE: Dict[str, List[tuple]] = {
+    "users": [("username",), ("email",)],
+    "user_items": [("user_id", "item_id")],
+    "user_achievements": [("user_id", "achievement_id")],
+}
+
+# Columns with a hash index for equality lookups
+TABLE_INDEXES: Dict[str, List[str]] = {
+    "users": ["email", "username"],
+    "quests": ["tier", "topic"],
+    "items": ["rarity_tier"],
+    "achievements": ["achievement_type"],
+    "user_completed_quests": ["user_id"],
+    "user_items": ["user_id"],
+    "user_achievements": ["user_id"],
+}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class MemoryTable:
+    """A single table: rows keyed by id plus secondary hash indexes"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.indexed_columns = TABLE_INDEXES.get(name, [])
+        self.indexes: Dict[str, Dict[Any, set]] = {col: {} for col in self.indexed_columns}
+        self.unique = TABLE_UNIQUE.get(name, [])
+        self.unique_keys: Dict[tuple, set] = {cols: set() for cols in self.unique}
+
+    def _index_add(self, row: Dict[str, Any]) -> None:
+        for col in self.indexed_columns:
+            self.indexes[col].setdefault(row.get(col), set()).add(row["id"])
+        for cols in self.unique:
+            self.unique_keys[cols].add(tuple(row.get(c) for c in cols))
+
+    def _index_remove(self, row: Dict[str, Any]) -> None:
+        for col in self.indexed_columns:
+            ids = self.indexes[col].get(row.get(col))
+            if ids:
+                ids.discard(row["id"])
+        for cols in self.unique:
+            self.unique_keys[cols].discard(tuple(row.get(c) for c in cols))
+
+    def _check_unique(self, row: Dict[str, Any]) -> None:
+        if row["id"] in self.rows:
+            raise APIError(
+                {"message": f'duplicate key value violates unique constraint "{self.name}_pkey"',
+                 "code": "23505"}
+            )
+        for cols in self.unique:
+            key = tuple(row.get(c) for c in cols)
+            if None not in key and key in self.unique_keys[cols]:
+                raise APIError(
+                    {"message": f'duplicate key value violates unique constraint '
+                                f'"{self.name}_{"_".join(cols)}_key"',
+                     "code": "23505"}
+                )
+
+    def insert(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for col, default in TABLE_DEFAULTS.get(self.name, {}).items():
+            row[col] = default() if callable(default) else default
+        row.update({k: _normalize(v) for k, v in data.items()})
+        row.setdefault("id", str(uuid4()))
+        self._check_unique(row)
+        self.rows[row["id"]] = row
+        self._index_add(row)
+        return row
+
+    def update(self, row: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+        self._index_remove(row)
+        updated = {**row, **{k: _normalize(v) for k, v in data.items()}}
+        try:
+            for cols in self.unique:
+                key = tuple(updated.get(c) for c in cols)
+                if None not in key and key in self.unique_keys[cols]:
+                    raise APIError({"message": "duplicate key value violates unique constraint",
+                                    "code": "23505"})
+        except APIError:
+            self._index_add(row)
+            raise
+        row.update(updated)
+        self._index_add(row)
+        return row
+
+    def delete(self, row: Dict[str, Any]) -> None:
+        self._index_remove(row)
+        del self.rows[row["id"]]
+
+    def candidates(self, filters: List[tuple]) -> List[Dict[str, Any]]:
+        """Narrow the scan with the id key or a hash index when an eq filter allows it"""
+        for column, op, value in filters:
+            if op != "eq":
+                continue
+            if column == "id":
+                row = self.rows.get(value)
+                return [row] if row else []
+            if column in self.indexes:
+                return [self.rows[i] for i in self.indexes[column].get(value, ())]
+        for column, op, value in filters:
+            if op == "in" and column == "id":
+                return [self.rows[v] for v in dict.fromkeys(value) if v in self.rows]
+        return list(self.rows.values())
+
+
+def _parse_literal(text: str) -> Any:
+    if text.startswith('"') and text.endswith('"'):
+        return text[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    if text in ("true", "false"):
+        return text == "true"
+    if text == "null":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def _split_logic(expression: str) -> List[str]:
+    """Split a logic tree on top-level commas, respecting quoted values"""
+    parts, depth, quoted, escaped, current = [], 0, False, False, ""
+    for char in expression:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _parse_logic(expression: str) -> List[tuple]:
+    """Parse a PostgREST logic tree (the inside of or=(...)) into filter tuples"""
+    conditions = []
+    for part in _split_logic(expression):
+        for operator in ("and", "or"):
+            if part.startswith(operator + "("):
+                conditions.append(("", operator, _parse_logic(part[len(operator) + 1:-1])))
+                break
+        else:
+            column, op, value = part.split(".", 2)
+            conditions.append((column, op, _parse_literal(value)))
+    return conditions
+
+
+def _matches(row: Dict[str, Any], column: str, op: str, value: Any) -> bool:
+    if op == "or":
+        return any(_matches(row, *condition) for condition in value)
+    if op == "and":
+        return all(_matches(row, *condition) for condition in value)
+    current = row.get(column)
+    if op == "is":
+        return current is None if value in (None, "null") else current is value
+    # Comparisons with NULL are never true in SQL, so neq and in skip NULL columns too
+    if current is None:
+        return False
+    if op == "eq":
+        return current == value
+    if op == "neq":
+        return current != value
+    if op == "in":
+        return current in value
+    if op == "gt":
+        return current > value
+    if op == "gte":
+        return current >= value
+    if op == "lt":
+        return current < value
+    if op == "lte":
+        return current <= value
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def _filter_params(filters: List[tuple]) -> List[tuple]:
+    """Filters as PostgREST query parameters (values dropped) for query accounting"""
+    return [(column or op, f"{op}.") for column, op, _ in filters]
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Split a PostgREST select list on top-level commas"""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class MemoryQueryBuilder:
+    """Chainable query mirroring postgrest's AsyncRequestBuilder family"""
+
+    def __init__(self, client: "MemorySupabaseClient", table: str):
+        self.client = client
+        self.table_name = table
+        self.method = "select"
+        self.columns = "*"
+        self.count_method: Optional[str] = None
+        self.payload: Any = None
+        self.upsert_conflict: Optional[str] = None
+        self.filters: List[tuple] = []
+        self.orders: List[tuple] = []
+        self.offset_value = 0
+        self.limit_value: Optional[int] = None
+        self.single_mode: Optional[str] = None
+
+    # Operations
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None):
+        self.method = "select"
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_method = count
+        return self
+
+    def insert(self, json: Any, *, count: Optional[str] = None, **kwargs):
+        self.method = "insert"
+        self.payload = json
+        self.count_method = count
+        return self
+
+    def upsert(self, json: Any, *, on_conflict: str = "", **kwargs):
+        self.method = "upsert"
+        self.payload = json
+        self.upsert_conflict = on_conflict or None
+        return self
+
+    def update(self, json: Dict[str, Any], *, count: Optional[str] = None, **kwargs):
+        self.method = "update"
+        self.payload = json
+        self.count_method = count
+        return self
+
+    def delete(self, *, count: Optional[str] = None, **kwargs):
+        self.method = "delete"
+        self.count_method = count
+        return self
+
+    # Filters
+    def _filter(self, column: str, op: str, value: Any):
+        self.filters.append((column, op, _normalize(value)))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column: str, value: Any):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None):
+        self.filters.append(("", "or", _parse_logic(filters)))
+        return self
+
+    def in_(self, column: str, values: Any):
+        self.filters.append((column, "in", [_normalize(v) for v in values]))
+        return self
+
+    # Modifiers
+    def order(self, column: str, *, desc: bool = False, nullsfirst: Optional[bool] = None,
+              foreign_table: Optional[str] = None):
+        self.orders.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size: int, *, foreign_table: Optional[str] = None):
+        self.limit_value = size
+        return self
+
+    def offset(self, size: int):
+        self.offset_value = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None):
+        self.offset_value = start
+        self.limit_value = end - start + 1
+        return self
+
+    def single(self):
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_mode = "maybe_single"
+        return self
+
+    # Execution
+    async def execute(self) -> Optional[APIResponse]:
+        operation = "select" if self.method == "select" else self.method
+        record_query(self.table_name, operation, _filter_params(self.filters))
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await self._execute()
+            ok = True
+            return response
+        finally:
+            record_db_call(self.table_name, operation, time.perf_counter() - start, ok=ok)
+
+    def _filtered_rows(self, table: MemoryTable) -> List[Dict[str, Any]]:
+        rows = table.candidates(self.filters)
+        return [
+            row for row in rows
+            if all(_matches(row, column, op, value) for column, op, value in self.filters)
+        ]
+
+    def _sort(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for column, desc, nullsfirst in reversed(self.orders):
+            # Postgres default: NULLS LAST for ASC, NULLS FIRST for DESC
+            nulls_first = desc if nullsfirst is None else nullsfirst
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for part in _split_columns(self.columns):
+            if "(" in part:
+                name, inner = part.split("(", 1)
+                inner = inner.rsplit(")", 1)[0]
+                alias, _, target = name.partition(":")
+                if not target:
+                    alias, target = name, name
+                result[alias.strip()] = self.client._embed(
+                    self.table_name, row, target.strip(), inner
+                )
+            elif part == "*":
+                result.update(row)
+            elif part == "count":
+                continue
+            else:
+                result[part] = row.get(part)
+        return result
+
+    async def _execute(self) -> Optional[APIResponse]:
+        await self.client._simulate_latency()
+        table = self.client._table(self.table_name)
+
+        if self.method in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = []
+            for data in payload:
+                if self.method == "upsert":
+                    existing = self.client._find_conflict(table, data, self.upsert_conflict)
+                    if existing is not None:
+                        inserted.append(table.update(existing, data))
+                        continue
+                inserted.append(table.insert(data))
+            data = [copy.copy(row) for row in inserted]
+            return APIResponse(data=data, count=len(data) if self.count_method else None)
+
+        rows = self._filtered_rows(table)
+
+        if self.method == "update":
+            updated = [copy.copy(table.update(row, self.payload)) for row in rows]
+            return APIResponse(data=updated, count=len(updated) if self.count_method else None)
+
+        if self.method == "delete":
+            deleted = [copy.copy(row) for row in rows]
+            for row in rows:
+                table.delete(row)
+            return APIResponse(data=deleted, count=len(deleted) if self.count_method else None)
+
+        total = len(rows)
+        rows = self._sort(rows)
+        end = None if self.limit_value is None else self.offset_value + self.limit_value
+        rows = rows[self.offset_value:end]
+        data = [self._project(row) for row in rows]
+
+        if self.single_mode:
+            if len(data) == 1:
+                return SingleAPIResponse(data=data[0], count=total if self.count_method else None)
+            if self.single_mode == "maybe_single" and not data:
+                return None
+            raise APIError({
+                "message": "JSON object requested, multiple (or no) rows returned",
+                "code": "PGRST116",
+                "details": f"The result contains {len(data)} rows",
+            })
+
+        return APIResponse(data=data, count=total if self.count_method else None)
+
+
+class MemoryRpcBuilder:
+    """Deferred call of a registered server-side function"""
+
+    def __init__(self, client: "MemorySupabaseClient", fn: str, params: Dict[str, Any]):
+        self.client = client
+        self.fn = fn
+        self.params = {k: _normalize(v) for k, v in (params or {}).items()}
+
+    async def execute(self) -> SingleAPIResponse:
+        record_query(self.fn, "rpc", ())
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await self._execute()
+            ok = True
+            return response
+        finally:
+            record_db_call(self.fn, "rpc", time.perf_counter() - start, ok=ok)
+
+    async def _execute(self) -> SingleAPIResponse:
+        await self.client._simulate_latency()
+        handler = self.client.functions.get(self.fn)
+        if handler is None:
+            raise APIError({
+                "message": f"Could not find the function public.{self.fn}",
+                "code": "PGRST202",
+            })
+        return SingleAPIResponse(data=handler(self.client, **self.params))
+
+
+class MemorySupabaseClient:
+    """Drop-in replacement for the PostgREST client backed by in-memory tables"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables: Dict[str, MemoryTable] = {}
+        self.functions: Dict[str, Callable[..., Any]] = dict(RPC_FUNCTIONS)
+
+    async def _simulate_latency(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            # Still yield to the loop like a real network call would
+            await asyncio.sleep(0)
+
+    def _table(self, name: str) -> MemoryTable:
+        if name not in self.tables:
+            self.tables[name] = MemoryTable(name)
+        return self.tables[name]
+
+    def _find_conflict(self, table: MemoryTable, data: Dict[str, Any],
+                       on_conflict: Optional[str]) -> Optional[Dict[str, Any]]:
+        columns = [c.strip() for c in on_conflict.split(",")] if on_conflict else ["id"]
+        key = [_normalize(data.get(c)) for c in columns]
+        for row in table.rows.values():
+            if [row.get(c) for c in columns] == key:
+                return row
+        return None
+
+    def _embed(self, parent: str, row: Dict[str, Any], target: str, columns: str) -> Any:
+        """Resolve an embedded resource through a `<singular>_id` foreign key"""
+        builder = MemoryQueryBuilder(self, target).select(columns)
+        foreign_key = f"{target[:-1] if target.endswith('s') else target}_id"
+        table = self._table(target)
+        if foreign_key in row:
+            related = table.rows.get(row[foreign_key])
+            return builder._project(related) if related else None
+        # One-to-many: the child table points back at the parent
+        back_key = f"{parent[:-1] if parent.endswith('s') else parent}_id"
+        children = [r for r in table.rows.values() if r.get(back_key) == row.get("id")]
+        return [builder._project(r) for r in children]
+
+    def table(self, table_name: str) -> MemoryQueryBuilder:
+        return MemoryQueryBuilder(self, table_name)
+
+    def from_(self, table_name: str) -> MemoryQueryBuilder:
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> MemoryRpcBuilder:
+        return MemoryRpcBuilder(self, fn, params or {})
+
+    # Seeding helpers
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows directly, bypassing the query builder and simulated latency"""
+        target = self._table(table)
+        return [target.insert(row) for row in rows]
+
+    def load_seed_file(self, path: str) -> None:
+        """Seed tables from a JSON object mapping table names to lists of rows"""
+        with open(path, encoding="utf-8") as f:
+            for table, rows in json.load(f).items():
+                self.seed(table, rows)
+
+
+# Server-side functions -------------------------------------------------------
+
+def _completed_quest_ids(client: MemorySupabaseClient, user_id: str) -> set:
+    rows = client._table("user_completed_quests")
+    return {
+        rows.rows[i]["quest_id"]
+        for i in rows.indexes["user_id"].get(user_id, ())
+        if rows.rows[i].get("completed_at")
+    }
+
+
+def _award(client: MemorySupabaseClient, user_id: str, achievement: Dict[str, Any]) -> bool:
+    user_achievements = client._table("user_achievements")
+    key = (user_id, achievement["id"])
+    if key in user_achievements.unique_keys[("user_id", "achievement_id")]:
+        return False
+    user_achievements.insert({"user_id": user_id, "achievement_id": achievement["id"]})
+    return True
+
+
+def _achievement(client: MemorySupabaseClient, **criteria: Any) -> Optional[Dict[str, Any]]:
+    table = client._table("achievements")
+    for row in table.candidates([("achievement_type", "eq", criteria["achievement_type"])]):
+        if all(row.get(k) == v for k, v in criteria.items()):
+            return row
+    return None
+
+
+def _check_tier_achievement(client: MemorySupabaseClient, p_user_id: str,
+                            p_quest_tier: int) -> bool:
+    quests = client._table("quests")
+    tier_quests = {quests.rows[i]["id"] for i in quests.indexes["tier"].get(p_quest_tier, ())}
+    if not tier_quests or not tier_quests <= _completed_quest_ids(client, p_user_id):
+        return False
+    achievement = _achievement(client, achievement_type="tier", tier=p_quest_tier)
+    return bool(achievement) and _award(client, p_user_id, achievement)
+
+
+def _check_quest_achievement(client: MemorySupabaseClient, p_user_id: str,
+                             p_quest_id: str) -> bool:
+    if p_quest_id not in _completed_quest_ids(client, p_user_id):
+        return False
+    achievement = _achievement(client, achievement_type="quest", quest_id=p_quest_id)
+    return bool(achievement) and _award(client, p_user_id, achievement)
+
+
+def _check_questline_achievement(client: MemorySupabaseClient, p_user_id: str,
+                                 p_topic: str) -> bool:
+    quests = client._table("quests")
+    topic_quests = {quests.rows[i]["id"] for i in quests.indexes["topic"].get(p_topic, ())}
+    if not topic_quests or not topic_quests <= _completed_quest_ids(client, p_user_id):
+        return False
+    achievement = _achievement(client, achievement_type="questline", topic=p_topic)
+    return bool(achievement) and _award(client, p_user_id, achievement)
+
+
+def _complete_user_quest(client: MemorySupabaseClient, p_user_id: str,
+                         p_user_quest_id: str) -> Dict[str, Any]:
+    """Mirror of database/complete_quest_transaction.sql"""
+    users = client._table("users")
+    user = users.rows.get(p_user_id)
+    if user is None:
+        raise APIError({"message": "User not found", "code": "P0002"})
+
+    user_quest = client._table("user_completed_quests").rows.get(p_user_quest_id)
+    if not user_quest or user_quest["user_id"] != p_user_id or not user_quest["is_active"]:
+        raise APIError({"message": "Active quest not found or does not belong to user",
+                        "code": "P0001"})
+    quest = client._table("quests").rows.get(user_quest["quest_id"])
+    if quest is None:
+        raise APIError({"message": "Quest not found", "code": "P0001"})
+    if datetime.now(timezone.utc) > datetime.fromisoformat(user_quest["deadline_at"]):
+        raise APIError({"message": "Quest deadline has passed", "code": "P0001"})
+
+    client._table("user_completed_quests").update(
+        user_quest, {"is_active": False, "completed_at": _now()}
+    )
+    new_xp = user["total_xp"] + quest["xp_reward"]
+    users.update(user, {
+        "total_glory": user["total_glory"] + quest["glory_reward"],
+        "total_xp": new_xp,
+        "level": calculate_level(new_xp),
+        "lifetime_glory_gained": user["lifetime_glory_gained"] + max(quest["glory_reward"], 0),
+    })
+
+    awarded_item = None
+    user_items = client._table("user_items")
+    owned = {
+        user_items.rows[i]["item_id"] for i in user_items.indexes["user_id"].get(p_user_id, ())
+    }
+    items = client._table("items")
+    candidates = [
+        items.rows[i] for i in items.indexes["rarity_tier"].get(quest["tier"], ())
+        if i not in owned
+    ]
+    if candidates:
+        item = random.choice(candidates)
+        user_item = user_items.insert({"user_id": p_user_id, "item_id": item["id"]})
+        awarded_item = {**user_item, "item": copy.copy(item)}
+
+    user_achievements = client._table("user_achievements")
+    known = {user_achievements.rows[i]["achievement_id"]
+             for i in user_achievements.indexes["user_id"].get(p_user_id, ())}
+    _check_quest_achievement(client, p_user_id, quest["id"])
+    _check_tier_achievement(client, p_user_id, quest["tier"])
+    _check_questline_achievement(client, p_user_id, quest["topic"])
+    achievements = client._table("achievements")
+    awarded = [
+        copy.copy(achievements.rows[user_achievements.rows[i]["achievement_id"]])
+        for i in user_achievements.indexes["user_id"].get(p_user_id, ())
+        if user_achievements.rows[i]["achievement_id"] not in known
+    ]
+    # ORDER BY achievement_type, tier (NULLS LAST)
+    awarded.sort(key=lambda a: (a["achievement_type"], a.get("tier") is None, a.get("tier") or 0))
+
+    return {
+        "user_quest": copy.copy(user_quest),
+        "quest": copy.copy(quest),
+        "awarded_item": awarded_item,
+        "awarded_achievements": awarded,
+    }
+
+
+def _purchase_item(client: MemorySupabaseClient, p_user_id: str, p_item_id: str) -> Dict[str, Any]:
+    """Mirror of database/purchase_item_transaction.sql"""
+    item = client._table("items").rows.get(p_item_id)
+    if item is None:
+        raise APIError({"message": "Item not found", "code": "P0001"})
+    users = client._table("users")
+    user = users.rows.get(p_user_id)
+    if user is None:
+        raise APIError({"message": "User not found", "code": "P0001"})
+    if user["total_glory"] < item["price"]:
+        raise APIError({
+            "message": f"Insufficient glory. You need {item['price']} glory "
+                       f"but only have {user['total_glory']}",
+            "code": "P0001",
+        })
+
+    user_items = client._table("user_items")
+    if (p_user_id, p_item_id) in user_items.unique_keys[("user_id", "item_id")]:
+        raise APIError({"message": "You already own this item", "code": "P0001"})
+    users.update(user, {"total_glory": user["total_glory"] - item["price"]})
+    user_item = user_items.insert({"user_id": p_user_id, "item_id": p_item_id})
+
+    awarded = []
+    item_count = len(user_items.indexes["user_id"].get(p_user_id, ()))
+    eligible = [
+        a for a in client._table("achievements").candidates(
+            [("achievement_type", "eq", "collection")])
+        if a.get("tier") is not None and a["tier"] <= item_count
+    ]
+    if eligible:
+        achievement = max(eligible, key=lambda a: a["tier"])
+        if _award(client, p_user_id, achievement):
+            awarded.append(copy.copy(achievement))
+
+    return {
+        "user_item": {**user_item, "item": copy.copy(item)},
+        "new_glory": user["total_glory"],
+        "item_price": item["price"],
+        "awarded_achievements": awarded,
+    }
+
+
+RPC_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "purchase_item": _purchase_item,
+    "check_tier_achievement": _check_tier_achievement,
+    "check_quest_achievement": _check_quest_achievement,
+    "check_questline_achievement": _check_questline_achievement,
+    "complete_user_quest": _complete_user_quest,
+}
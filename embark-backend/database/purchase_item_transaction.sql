@@ -0,0 +1,112 @@
+-- Item Purchase Transaction
+-- Buys a shop item in a single round trip: the glory decrement only succeeds
+-- when the balance covers the price, the user_items insert is guarded by a
+-- unique (user_id, item_id) constraint, and the collection achievement is
+-- checked in the same transaction. Concurrent clicks can't double-spend glory
+-- or grant the same item twice.
+--
+-- Called from the API as: rpc("purchase_item", {p_user_id, p_item_id})
+-- Errors (all P0001 / raise_exception, nothing is changed):
+--   'Item not found', 'User not found', 'Insufficient glory. ...',
+--   'You already own this item'
+
+-- ============================================================================
+-- UNIQUE OWNERSHIP
+-- ============================================================================
+-- Fails if duplicate ownership rows already exist; find them with:
+-- SELECT user_id, item_id, COUNT(*) FROM user_items
+-- GROUP BY user_id, item_id HAVING COUNT(*) > 1;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'user_items_user_id_item_id_key'
+    ) THEN
+        ALTER TABLE user_items
+        ADD CONSTRAINT user_items_user_id_item_id_key UNIQUE (user_id, item_id);
+    END IF;
+END;
+$$;
+
+-- ============================================================================
+-- PURCHASE FUNCTION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION purchase_item(
+    p_user_id UUID,
+    p_item_id UUID
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_item items%ROWTYPE;
+    v_user_item user_items%ROWTYPE;
+    v_achievement achievements%ROWTYPE;
+    v_current_glory INTEGER;
+    v_new_glory INTEGER;
+    v_item_count INTEGER;
+    v_awarded_achievements JSONB := '[]'::jsonb;
+BEGIN
+    SELECT * INTO v_item FROM items WHERE id = p_item_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Item not found';
+    END IF;
+
+    -- Conditional decrement: only applies when the balance is sufficient
+    UPDATE users
+    SET total_glory = total_glory - v_item.price
+    WHERE id = p_user_id AND total_glory >= v_item.price
+    RETURNING total_glory INTO v_new_glory;
+
+    IF NOT FOUND THEN
+        SELECT total_glory INTO v_current_glory FROM users WHERE id = p_user_id;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'User not found';
+        END IF;
+        RAISE EXCEPTION 'Insufficient glory. You need % glory but only have %',
+            v_item.price, v_current_glory;
+    END IF;
+
+    -- The unique constraint makes ownership race-free; raising undoes the decrement
+    INSERT INTO user_items (user_id, item_id, acquired_at, is_featured)
+    VALUES (p_user_id, p_item_id, now(), FALSE)
+    ON CONFLICT (user_id, item_id) DO NOTHING
+    RETURNING * INTO v_user_item;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'You already own this item';
+    END IF;
+
+    -- Collection achievement: highest threshold the new item count reaches
+    SELECT count(*) INTO v_item_count FROM user_items WHERE user_id = p_user_id;
+
+    SELECT * INTO v_achievement
+    FROM achievements
+    WHERE achievement_type = 'collection' AND tier IS NOT NULL AND tier <= v_item_count
+    ORDER BY tier DESC
+    LIMIT 1;
+
+    IF FOUND THEN
+        INSERT INTO user_achievements (user_id, achievement_id, unlocked_at)
+        SELECT p_user_id, v_achievement.id, now()
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_achievements
+            WHERE user_id = p_user_id AND achievement_id = v_achievement.id
+        );
+
+        IF FOUND THEN
+            v_awarded_achievements := jsonb_build_array(to_jsonb(v_achievement));
+        END IF;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'user_item', to_jsonb(v_user_item) || jsonb_build_object('item', to_jsonb(v_item)),
+        'new_glory', v_new_glory,
+        'item_price', v_item.price,
+        'awarded_achievements', v_awarded_achievements
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION purchase_item(UUID, UUID) TO anon, authenticated;
@@ -1,6 +1,20 @@
+import logging
 import os
-from supabase import create_client, Client
+import time
+from typing import TYPE_CHECKING
+
+import httpx
 from dotenv import load_dotenv
+from postgrest import APIError, AsyncPostgrestClient
+
+from config.settings import settings
+from utils.metrics import postgrest_call, record_db_call
+from utils.query_budget import record_query
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -9,37 +23,156 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 
-# Global client instance
-_supabase_client: Client | None = None
+# Error codes: PostgREST's "function not found in schema cache", and
+# Postgres undefined_function / unique_violation
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+UNIQUE_VIOLATION = "23505"
+
+# Global client instances
+_supabase_client: "Client | None" = None
+_async_supabase_client: AsyncPostgrestClient | None = None
+_async_http_client: httpx.AsyncClient | None = None
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that times every PostgREST call and counts it against
+    the current request's query budget
+
+    Every data-layer call (services, BaseService and the catalog/progress
+    caches) goes through the shared client, so this is the one place that
+    sees them all. The body is read here so the timing covers the transfer.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        labels = postgrest_call(
+            request.method, request.url.path, request.headers.get("prefer", "")
+        )
+        if labels:
+            record_query(*labels, request.url.params.multi_items())
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+        except Exception:
+            if labels:
+                record_db_call(*labels, time.perf_counter() - start, ok=False)
+            raise
+        if labels:
+            record_db_call(*labels, time.perf_counter() - start, ok=response.status_code < 400)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class MissingFunctionError(Exception):
+    """Raised when a database function (RPC) hasn't been installed"""
 
 
-def get_supabase_client() -> Client:
+def is_missing_function(error: APIError) -> bool:
+    """Whether an RPC failed because the function doesn't exist in the database"""
+    return error.code in MISSING_FUNCTION_CODES
+
+
+def _require_credentials() -> None:
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError(
+            "SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables"
+        )
+
+
+def get_supabase_client() -> "Client":
     """
-    Get or create Supabase client instance
+    Get or create the synchronous Supabase client instance
+
+    Only used by offline scripts; request handlers use get_async_supabase_client()
     """
     global _supabase_client
-    
+
     if _supabase_client is None:
-        if not SUPABASE_URL or not SUPABASE_KEY:
-            raise ValueError(
-                "SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables"
-            )
-        
+        _require_credentials()
+        # The full SDK pulls in auth, storage, realtime and functions clients
+        from supabase import create_client
+
         _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    
+
     return _supabase_client
 
 
-def test_connection() -> bool:
+def get_async_supabase_client() -> AsyncPostgrestClient:
+    """
+    Get or create the async Supabase (PostgREST) client instance
+
+    All PostgREST calls go through one shared httpx.AsyncClient so connections
+    are pooled and kept alive across requests instead of blocking the event loop.
+    The app only uses tables and RPCs, so this is a PostgREST client rather than
+    the full supabase SDK client, whose import also loads the auth, storage,
+    realtime and functions clients. With DATABASE_BACKEND=memory an in-process
+    MemorySupabaseClient is returned instead.
+    """
+    global _async_supabase_client, _async_http_client
+
+    if _async_supabase_client is None and settings.DATABASE_BACKEND == "memory":
+        # Imported here so the fake is never loaded in normal deployments
+        from database.memory_client import MemorySupabaseClient
+
+        client = MemorySupabaseClient(latency_ms=settings.MEMORY_DB_LATENCY_MS)
+        if settings.MEMORY_DB_SEED_FILE:
+            client.load_seed_file(settings.MEMORY_DB_SEED_FILE)
+        _async_supabase_client = client
+
+    if _async_supabase_client is None:
+        _require_credentials()
+
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            http2=True,
+        )
+        _async_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.SUPABASE_HTTP_TIMEOUT),
+            follow_redirects=True,
+            transport=InstrumentedTransport(transport),
+        )
+        # The anon key is the bearer token (as the supabase client sends it),
+        # so no auth session lookup is needed
+        _async_supabase_client = AsyncPostgrestClient(
+            f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={"apiKey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+            http_client=_async_http_client,
+        )
+
+    return _async_supabase_client
+
+
+async def close_async_supabase_client() -> None:
+    """
+    Close the shared async HTTP connection pool
+    """
+    global _async_supabase_client, _async_http_client
+
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+
+    _async_supabase_client = None
+    _async_http_client = None
+
+
+async def test_connection() -> bool:
     """
     Test the Supabase connection
     """
     try:
-        client = get_supabase_client()
+        client = get_async_supabase_client()
         # Simple query to test connection
-        client.table("users").select("count", count="exact").limit(0).execute()
+        await client.table("users").select("count", count="exact").limit(0).execute()
         return True
     except Exception as e:
-        print(f"Connection test failed: {e}")
+        logger.error(f"Connection test failed: {e}")
         return False
-
@@ -1,38 +1,163 @@
 """
 FastAPI dependency injection setup
+
+Services are built once per app lifespan (see create_services, called from
+main.lifespan) and shared by every request, so the Supabase client, the
+OpenAI client and the caches attached to them have a single owner. Nothing
+is cached at module level: each app (or test) gets its own caches, created
+inside its event loop.
 """
-from typing import Annotated
-from fastapi import Depends
-from supabase import Client
+from dataclasses import dataclass
+from typing import Annotated, Optional
+
+from fastapi import Depends, Request
+from postgrest import AsyncPostgrestClient
 
-from database.supabase_client import get_supabase_client
+from database.supabase_client import close_async_supabase_client, get_async_supabase_client
+from models.achievement import AchievementResponse
+from models.item import ItemResponse
+from models.quest import QuestResponse
+from services.achievement_service import AchievementService
+from services.catalog_cache import (
+    CatalogCache,
+    create_achievement_catalog,
+    create_item_catalog,
+    create_quest_catalog,
+)
+from services.chat_answer_cache import ChatAnswerCache
+from services.chat_context import SystemPromptCache
+from services.item_service import ItemService
+from services.progress_cache import ProgressCache
+from services.quest_helper_service import QuestHelperService
 from services.quest_service import QuestService
 from services.user_service import UserService
-from services.item_service import ItemService
+from utils.http_cache import CatalogResponseCache
+
+
+@dataclass
+class AppServices:
+    """Long-lived services shared by all requests"""
+
+    db: AsyncPostgrestClient
+    quest_catalog: CatalogCache[QuestResponse]
+    item_catalog: CatalogCache[ItemResponse]
+    achievement_catalog: CatalogCache[AchievementResponse]
+    progress: ProgressCache
+    catalog_responses: CatalogResponseCache
+    chat_answers: ChatAnswerCache
+    system_prompts: SystemPromptCache
+    achievement_service: AchievementService
+    quest_service: QuestService
+    user_service: UserService
+    item_service: ItemService
+    quest_helper: QuestHelperService
+
+
+def create_services(db: Optional[AsyncPostgrestClient] = None) -> AppServices:
+    """
+    Build the data client, caches and services once
+
+    Args:
+        db: Data client to use (default: the shared Supabase client)
+
+    Returns:
+        Services wired to one client and one set of caches
+    """
+    db = get_async_supabase_client() if db is None else db
+    quest_catalog = create_quest_catalog()
+    item_catalog = create_item_catalog()
+    achievement_catalog = create_achievement_catalog()
+    progress = ProgressCache()
+    chat_answers = ChatAnswerCache()
+    system_prompts = SystemPromptCache()
+
+    achievement_service = AchievementService(
+        db, catalog=achievement_catalog, progress=progress, quest_catalog=quest_catalog
+    )
+    return AppServices(
+        db=db,
+        quest_catalog=quest_catalog,
+        item_catalog=item_catalog,
+        achievement_catalog=achievement_catalog,
+        progress=progress,
+        catalog_responses=CatalogResponseCache(),
+        chat_answers=chat_answers,
+        system_prompts=system_prompts,
+        achievement_service=achievement_service,
+        quest_service=QuestService(
+            db,
+            catalog=quest_catalog,
+            progress=progress,
+            achievement_service=achievement_service,
+            answers=chat_answers,
+            prompts=system_prompts,
+        ),
+        user_service=UserService(db),
+        item_service=ItemService(
+            db, catalog=item_catalog, progress=progress, achievement_service=achievement_service
+        ),
+        quest_helper=QuestHelperService(answers=chat_answers, prompts=system_prompts),
+    )
+
 
+async def close_services(services: AppServices) -> None:
+    """Release pooled Supabase and OpenAI connections"""
+    await close_async_supabase_client()
+    await services.quest_helper.aclose()
 
-def get_db() -> Client:
-    """Get Supabase client instance"""
-    return get_supabase_client()
 
+def get_services(request: Request) -> AppServices:
+    """Services built by the lifespan (or lazily, when it didn't run)"""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        services = create_services()
+        request.app.state.services = services
+    return services
 
-def get_quest_service(db: Annotated[Client, Depends(get_db)]) -> QuestService:
-    """Get QuestService instance with injected dependencies"""
-    return QuestService(db)
 
+ServicesDep = Annotated[AppServices, Depends(get_services)]
 
-def get_user_service(db: Annotated[Client, Depends(get_db)]) -> UserService:
-    """Get UserService instance with injected dependencies"""
-    return UserService(db)
 
+def get_db(services: ServicesDep) -> AsyncPostgrestClient:
+    """Get the shared async Supabase client instance"""
+    return services.db
 
-def get_item_service(db: Annotated[Client, Depends(get_db)]) -> ItemService:
-    """Get ItemService instance with injected dependencies"""
-    return ItemService(db)
+
+def get_quest_service(services: ServicesDep) -> QuestService:
+    """Get the shared QuestService"""
+    return services.quest_service
+
+
+def get_user_service(services: ServicesDep) -> UserService:
+    """Get the shared UserService"""
+    return services.user_service
+
+
+def get_item_service(services: ServicesDep) -> ItemService:
+    """Get the shared ItemService"""
+    return services.item_service
+
+
+def get_achievement_service(services: ServicesDep) -> AchievementService:
+    """Get the shared AchievementService"""
+    return services.achievement_service
+
+
+def get_quest_helper(services: ServicesDep) -> QuestHelperService:
+    """Get the shared quest chat helper"""
+    return services.quest_helper
+
+
+def get_catalog_responses(services: ServicesDep) -> CatalogResponseCache:
+    """Get the prepared catalog responses"""
+    return services.catalog_responses
 
 
 # Type aliases for cleaner dependency injection
+DbDep = Annotated[AsyncPostgrestClient, Depends(get_db)]
 QuestServiceDep = Annotated[QuestService, Depends(get_quest_service)]
 UserServiceDep = Annotated[UserService, Depends(get_user_service)]
 ItemServiceDep = Annotated[ItemService, Depends(get_item_service)]
-
+AchievementServiceDep = Annotated[AchievementService, Depends(get_achievement_service)]
+QuestHelperDep = Annotated[QuestHelperService, Depends(get_quest_helper)]
+CatalogResponsesDep = Annotated[CatalogResponseCache, Depends(get_catalog_responses)]
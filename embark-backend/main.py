@@ -1,13 +1,22 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from routers import health, users, quests, items, auth, achievements
+from routers import health, users, quests, items, auth, achievements, metrics
 from config.settings import settings
+from dependencies import close_services, create_services
+from services.warmup import warm_up
 from middleware import (
     LoggingMiddleware,
+    MetricsMiddleware,
+    QueryBudgetMiddleware,
     setup_logging,
+    shutdown_logging,
     http_exception_handler,
     validation_exception_handler,
     general_exception_handler,
@@ -16,17 +25,45 @@ from middleware import (
 )
 
 # Setup logging
-setup_logging(settings.LOG_LEVEL)
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown"""
+    # Data client, caches and services are built once and shared by every request
+    app.state.services = create_services()
+    # Open pools, load catalogs and build serializers before taking traffic
+    await warm_up(app.state.services)
+    # openai is only needed for quest chat, so it loads once the app is serving
+    preload = asyncio.create_task(app.state.services.quest_helper.preload())
+    yield
+    preload.cancel()
+    # Release pooled Supabase and OpenAI connections
+    await close_services(app.state.services)
+    app.state.services = None
+    # Flush queued log records
+    shutdown_logging()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
     version=settings.API_VERSION,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# Add logging middleware
-app.add_middleware(LoggingMiddleware)
+# Add logging, metrics and query budget middleware
+app.add_middleware(LoggingMiddleware, sample_rate=settings.LOG_REQUEST_SAMPLE_RATE)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    QueryBudgetMiddleware,
+    budget=settings.DB_QUERY_BUDGET,
+    repeat_limit=settings.DB_QUERY_REPEAT_LIMIT,
+    expose_header=settings.DEBUG,
+)
 
 # CORS Configuration
 app.add_middleware(
@@ -51,6 +88,7 @@ app.include_router(users.router, prefix="/api", tags=["users"])
 app.include_router(quests.router, prefix="/api", tags=["quests"])
 app.include_router(items.router, prefix="/api", tags=["items"])
 app.include_router(achievements.router, prefix="/api", tags=["achievements"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 
 @app.get("/")
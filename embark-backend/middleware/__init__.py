@@ -9,5 +9,7 @@ from .error_handler import (
     UnauthorizedException,
     ForbiddenException,
 )
-from .logging import LoggingMiddleware, setup_logging
+from .logging import LoggingMiddleware, setup_logging, shutdown_logging
+from .metrics import MetricsMiddleware
+from .query_budget import QueryBudgetMiddleware
 
@@ -5,27 +5,26 @@ from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-import logging
 
-logger = logging.getLogger(__name__)
+
+def _record_error(request: Request, detail) -> None:
+    """Attach an error detail to the request's access log line (LoggingMiddleware)"""
+    request.state.error_detail = str(detail)
 
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions"""
-    logger.warning(
-        f"HTTP {exc.status_code} error on {request.method} {request.url.path}: {exc.detail}"
-    )
+    _record_error(request, exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail, "status_code": exc.status_code},
+        headers=getattr(exc, "headers", None),
     )
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors"""
-    logger.warning(
-        f"Validation error on {request.method} {request.url.path}: {exc.errors()}"
-    )
+    _record_error(request, f"Validation error: {exc.errors()}")
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
@@ -37,11 +36,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 
 async def general_exception_handler(request: Request, exc: Exception):
-    """Handle uncaught exceptions"""
-    logger.error(
-        f"Unhandled exception on {request.method} {request.url.path}: {str(exc)}",
-        exc_info=True,
-    )
+    """Handle uncaught exceptions (logged with the traceback by LoggingMiddleware)"""
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -96,9 +91,7 @@ class ForbiddenException(APIException):
 
 async def api_exception_handler(request: Request, exc: APIException):
     """Handle custom API exceptions"""
-    logger.warning(
-        f"API exception on {request.method} {request.url.path}: {exc.detail}"
-    )
+    _record_error(request, exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
@@ -1,56 +1,178 @@
 """
 Request/Response logging middleware
 """
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
+# Fields attached to request log records (logging "extra")
+REQUEST_LOG_FIELDS = ("method", "path", "status", "duration_ms", "client", "detail")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class LoggingMiddleware:
+    """
+    Pure ASGI middleware that logs one structured line per request
+
+    Successful responses are logged for a sample of requests (sample_rate);
+    client and server errors are always logged, with the detail the exception
+    handlers attach (middleware.error_handler) and the traceback of unhandled
+    exceptions, so each request gets a single line. The X-Process-Time header
+    is the time until the response headers were sent.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all requests and responses"""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        # Start timer
-        start_time = time.time()
+        start_time = time.perf_counter()
+        status_code = 500
 
-        # Log request
-        logger.info(f"→ {request.method} {request.url.path}")
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", f"{duration:.6f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
 
-        # Process request
         try:
-            response: Response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            # Log error
-            logger.error(f"✗ {request.method} {request.url.path} - Error: {str(e)}")
+            self._log(scope, 500, start_time, error=e)
             raise
+        self._log(scope, status_code, start_time)
+
+    def _log(self, scope: Scope, status_code: int, start_time: float, error: Exception = None):
+        if error is None and status_code < 400:
+            if self.sample_rate <= 0 or (
+                self.sample_rate < 1 and random.random() >= self.sample_rate
+            ):
+                return
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        client = scope.get("client")
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "client": client[0] if client else None,
+            "detail": scope.get("state", {}).get("error_detail"),
+        }
+
+        if error is not None:
+            logger.error(
+                f"✗ {fields['method']} {fields['path']} - Error: {str(error)}",
+                exc_info=error,
+                extra=fields,
+            )
+            return
+
+        status_emoji = "✓" if status_code < 400 else "✗"
+        logger.log(
+            logging.INFO if status_code < 500 else logging.ERROR,
+            f"{status_emoji} {fields['method']} {fields['path']} - "
+            f"Status: {status_code} - Duration: {duration_ms:.1f}ms",
+            extra=fields,
+        )
 
-        # Calculate duration
-        duration = time.time() - start_time
 
-        # Log response
-        status_code = response.status_code
-        status_emoji = "✓" if 200 <= status_code < 400 else "✗"
-        
-        logger.info(
-            f"{status_emoji} {request.method} {request.url.path} - "
-            f"Status: {status_code} - Duration: {duration:.3f}s"
+class StructuredFormatter(logging.Formatter):
+    """Formats records as text with logfmt-style fields, or as JSON lines"""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__(
+            fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
         )
+        self.json_lines = json_lines
+
+    @staticmethod
+    def _fields(record: logging.LogRecord) -> dict:
+        return {
+            name: getattr(record, name)
+            for name in REQUEST_LOG_FIELDS
+            if getattr(record, name, None) is not None
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not self.json_lines:
+            return super().format(record)
+
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **self._fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        # Text lines: fields go right after the message, before any traceback
+        line = super().formatMessage(record)
+        fields = self._fields(record)
+        if fields:
+            line += " | " + " ".join(f"{name}={value}" for name, value in fields.items())
+        return line
+
 
-        # Add custom headers
-        response.headers["X-Process-Time"] = str(duration)
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted: the listener runs in this process, so the
+    message and any traceback are formatted on its thread"""
 
-        return response
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 
-def setup_logging(log_level: str = "INFO"):
-    """Configure application logging"""
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+def setup_logging(log_level: str = "INFO", log_format: str = "text"):
+    """
+    Configure application logging
+
+    Records are handed to a QueueHandler, so logging from the event loop only
+    enqueues; a QueueListener thread formats and writes them.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter(json_lines=log_format == "json"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
     )
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [_LocalQueueHandler(log_queue)]
+    root.setLevel(getattr(logging, log_level.upper()))
+
 
+def shutdown_logging():
+    """Flush queued records, stop the listener thread and log directly again"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
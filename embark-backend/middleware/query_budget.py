@@ -0,0 +1,71 @@
+"""
+Per-request query budget middleware
+"""
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.query_budget import start_tracking, stop_tracking
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Pure ASGI middleware counting data-layer calls per request
+
+    Logs a warning when a request makes more than `budget` calls, or issues
+    the same table/filter shape more than `repeat_limit` times (the usual
+    sign of an N+1 loop). With `expose_header`, responses carry the count in
+    X-DB-Queries (calls made before the headers were sent).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        budget: int = 20,
+        repeat_limit: int = 5,
+        expose_header: bool = False,
+    ):
+        self.app = app
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.expose_header = expose_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker, token = start_tracking()
+
+        async def send_wrapper(message: Message):
+            if self.expose_header and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(tracker.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_tracking(token)
+            self._check(scope, tracker)
+
+    def _check(self, scope: Scope, tracker):
+        route = getattr(scope.get("route"), "path", scope["path"])
+        fields = {"method": scope["method"], "path": scope["path"]}
+
+        if self.budget > 0 and tracker.count > self.budget:
+            logger.warning(
+                f"⚠ {scope['method']} {route} made {tracker.count} database calls "
+                f"(budget {self.budget})",
+                extra=fields,
+            )
+        if self.repeat_limit > 0:
+            for shape, n in tracker.repeated(self.repeat_limit):
+                logger.warning(
+                    f"⚠ Possible N+1 in {scope['method']} {route}: "
+                    f"'{shape}' issued {n} times",
+                    extra=fields,
+                )
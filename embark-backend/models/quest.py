@@ -3,6 +3,10 @@ from datetime import datetime
 from uuid import UUID
 from typing import Optional, List, TYPE_CHECKING
 
+from utils.batch import MAX_BATCH_IDS
+from .achievement import AchievementResponse
+from .item import UserItemResponse
+
 
 class QuestBase(BaseModel):
     """Base quest model with common attributes"""
@@ -75,6 +79,17 @@ class UserQuestResponse(BaseModel):
         from_attributes = True
 
 
+class UserQuestAbandonBatch(BaseModel):
+    """Model for abandoning several user quests at once"""
+    user_quest_ids: List[UUID] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class UserQuestAbandonBatchResponse(BaseModel):
+    """Model for the result of a bulk abandon"""
+    abandoned: List[UUID]
+    not_found: List[UUID]
+
+
 class ActiveQuestResponse(BaseModel):
     """Model for active quest with full quest details"""
     id: UUID
@@ -105,6 +120,13 @@ class CompletedQuestResponse(BaseModel):
         from_attributes = True
 
 
+class QuestCompletionResponse(BaseModel):
+    """Model for quest completion with the rewards that were granted"""
+    user_quest: UserQuestResponse
+    awarded_item: Optional[UserItemResponse] = None
+    awarded_achievements: List[AchievementResponse] = Field(default_factory=list)
+
+
 class ChatMessage(BaseModel):
     """Model for a chat message"""
     role: str  # "user" or "assistant"
@@ -114,7 +136,7 @@ class ChatMessage(BaseModel):
 class QuestChatRequest(BaseModel):
     """Model for quest chat request"""
     message: str = Field(..., min_length=1, max_length=2000)
-    chat_history: list[ChatMessage] = Field(default_factory=list)
+    chat_history: list[ChatMessage] = Field(default_factory=list, max_length=200)
 
 
 class QuestChatResponse(BaseModel):
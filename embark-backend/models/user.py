@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field, EmailStr
 from datetime import datetime
 from uuid import UUID
-from typing import Optional, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
+
+from utils.batch import MAX_BATCH_IDS
 
 if TYPE_CHECKING:
     from .achievement import AchievementResponse
@@ -42,8 +44,27 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserBatchRequest(BaseModel):
+    """Model for looking up several users at once"""
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
 class UserStatsUpdate(BaseModel):
     """Model for updating user stats after quest completion"""
     glory_delta: int = 0
     xp_delta: int = 0
 
+
+class ActiveQuestProgress(BaseModel):
+    """An in-progress quest within a user's progress snapshot"""
+    quest_id: str
+    deadline_at: datetime
+
+
+class UserProgress(BaseModel):
+    """Snapshot of a user's progress used for validation and award eligibility checks"""
+    user_id: UUID
+    completed_quest_ids: set[str] = Field(default_factory=set)
+    active_quests: dict[str, ActiveQuestProgress] = Field(default_factory=dict)  # by user quest id
+    owned_item_ids: set[str] = Field(default_factory=set)
+    unlocked_achievement_ids: set[str] = Field(default_factory=set)
@@ -1,6 +1,6 @@
 """Router for achievement-related endpoints"""
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from typing import List
 from uuid import UUID
 
@@ -9,18 +9,32 @@ from models.achievement import (
     UserAchievementResponse,
     UpdateActiveTitleRequest,
 )
-from services.achievement_service import AchievementService
+from dependencies import AchievementServiceDep, CatalogResponsesDep
 
 router = APIRouter(prefix="/achievements", tags=["achievements"])
-achievement_service = AchievementService()
 
 
 @router.get("", response_model=List[AchievementResponse])
-async def get_all_achievements():
+async def get_all_achievements(
+    request: Request,
+    response: Response,
+    achievement_service: AchievementServiceDep,
+    catalog_responses: CatalogResponsesDep,
+):
     """Get all available achievements"""
     try:
-        achievements = await achievement_service.get_all_achievements()
-        return achievements
+        async def build():
+            return await achievement_service.get_all_achievements(), {}
+
+        # Served from bytes prepared once per catalog version; revalidations skip the database
+        return await catalog_responses.respond(
+            request,
+            response,
+            await achievement_service.catalog_version(),
+            ("achievements",),
+            AchievementResponse,
+            build,
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -29,7 +43,7 @@ async def get_all_achievements():
 
 
 @router.get("/users/{user_id}", response_model=List[UserAchievementResponse])
-async def get_user_achievements(user_id: UUID):
+async def get_user_achievements(user_id: UUID, achievement_service: AchievementServiceDep):
     """Get all achievements unlocked by a specific user"""
     try:
         user_achievements = await achievement_service.get_user_achievements(user_id)
@@ -42,7 +56,9 @@ async def get_user_achievements(user_id: UUID):
 
 
 @router.patch("/users/{user_id}/active-title", response_model=dict)
-async def set_active_title(user_id: UUID, request: UpdateActiveTitleRequest):
+async def set_active_title(
+    user_id: UUID, request: UpdateActiveTitleRequest, achievement_service: AchievementServiceDep
+):
     """Set user's active title"""
     try:
         success = await achievement_service.set_active_title(
@@ -69,7 +85,7 @@ async def set_active_title(user_id: UUID, request: UpdateActiveTitleRequest):
 
 
 @router.get("/users/{user_id}/active-title", response_model=AchievementResponse | None)
-async def get_active_title(user_id: UUID):
+async def get_active_title(user_id: UUID, achievement_service: AchievementServiceDep):
     """Get user's currently active title"""
     try:
         active_title = await achievement_service.get_active_title(user_id)
@@ -1,20 +1,17 @@
 from fastapi import APIRouter, HTTPException
-from database.supabase_client import get_supabase_client
+from dependencies import DbDep
 
 router = APIRouter()
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(supabase: DbDep):
     """
     Health check endpoint that verifies API and database connectivity
     """
     try:
-        # Test Supabase connection
-        supabase = get_supabase_client()
-        
         # Simple query to verify database connectivity
-        response = supabase.table("users").select("count", count="exact").limit(0).execute()
+        response = await supabase.table("users").select("count", count="exact").limit(0).execute()
         
         return {
             "status": "healthy",
@@ -1,21 +1,17 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from uuid import UUID
 from typing import Optional
 
-from database.supabase_client import get_supabase_client
+from dependencies import CatalogResponsesDep, ItemServiceDep
 from models.item import ItemCreate, ItemUpdate, ItemResponse, UserItemResponse
-from services.item_service import ItemService
+from utils.batch import parse_ids
+from utils.pagination import cursor_headers
 
 router = APIRouter()
 
 
-def get_item_service() -> ItemService:
-    """Dependency to get item service instance"""
-    return ItemService(get_supabase_client())
-
-
 @router.post("/items", response_model=ItemResponse, status_code=201)
-async def create_item(item_data: ItemCreate):
+async def create_item(item_data: ItemCreate, service: ItemServiceDep):
     """
     Create a new item
     
@@ -26,21 +22,19 @@ async def create_item(item_data: ItemCreate):
     - **image_url**: Optional image URL
     """
     try:
-        service = get_item_service()
         return await service.create_item(item_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/items/{item_id}", response_model=ItemResponse)
-async def get_item(item_id: UUID):
+async def get_item(item_id: UUID, service: ItemServiceDep):
     """
     Get an item by ID
     
     - **item_id**: UUID of the item
     """
     try:
-        service = get_item_service()
         item = await service.get_item(item_id)
         
         if not item:
@@ -53,9 +47,15 @@ async def get_item(item_id: UUID):
 
 @router.get("/items", response_model=list[ItemResponse])
 async def list_items(
+    request: Request,
+    response: Response,
+    service: ItemServiceDep,
+    catalog_responses: CatalogResponsesDep,
     rarity_tier: Optional[int] = Query(default=None, ge=1, le=6),
     limit: int = Query(default=500, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    ids: Optional[str] = Query(default=None),
 ):
     """
     List items with optional rarity filter
@@ -63,18 +63,37 @@ async def list_items(
     - **rarity_tier**: Filter by rarity tier (1-6)
     - **limit**: Maximum number of items to return (1-500, default 500)
     - **offset**: Number of items to skip
+    - **cursor**: Opaque cursor for the next page (from the X-Next-Cursor response
+      header); overrides offset
+    - **ids**: Comma-separated item IDs to fetch in one request (at most 100); other
+      parameters are then ignored and unknown IDs are left out
     """
     try:
-        service = get_item_service()
-        return await service.list_items(
-            rarity_tier=rarity_tier, limit=limit, offset=offset
+        batch_ids = parse_ids(ids)
+        if batch_ids is not None:
+            return await service.get_items_by_ids(batch_ids)
+
+        async def build():
+            items = await service.list_items(
+                rarity_tier=rarity_tier, limit=limit, offset=offset, cursor=cursor
+            )
+            return items, cursor_headers(items, limit, service.catalog.order)
+
+        # Served from bytes prepared once per catalog version; revalidations skip the database
+        return await catalog_responses.respond(
+            request,
+            response,
+            await service.catalog_version(),
+            ("items", rarity_tier, limit, offset, cursor),
+            ItemResponse,
+            build,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.patch("/items/{item_id}", response_model=ItemResponse)
-async def update_item(item_id: UUID, item_data: ItemUpdate):
+async def update_item(item_id: UUID, item_data: ItemUpdate, service: ItemServiceDep):
     """
     Update an item
     
@@ -82,21 +101,19 @@ async def update_item(item_id: UUID, item_data: ItemUpdate):
     - **item_data**: Fields to update (all optional)
     """
     try:
-        service = get_item_service()
         return await service.update_item(item_id, item_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/items/{item_id}", status_code=204)
-async def delete_item(item_id: UUID):
+async def delete_item(item_id: UUID, service: ItemServiceDep):
     """
     Delete an item
     
     - **item_id**: UUID of the item
     """
     try:
-        service = get_item_service()
         success = await service.delete_item(item_id)
         
         if not success:
@@ -108,7 +125,7 @@ async def delete_item(item_id: UUID):
 
 
 @router.post("/users/{user_id}/items/{item_id}", response_model=UserItemResponse, status_code=201)
-async def award_item_to_user(user_id: UUID, item_id: UUID):
+async def award_item_to_user(user_id: UUID, item_id: UUID, service: ItemServiceDep):
     """
     Award an item to a user
     
@@ -116,14 +133,13 @@ async def award_item_to_user(user_id: UUID, item_id: UUID):
     - **item_id**: UUID of the item to award
     """
     try:
-        service = get_item_service()
         return await service.award_item_to_user(user_id, item_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/users/{user_id}/items/{item_id}/purchase")
-async def purchase_item(user_id: UUID, item_id: UUID):
+async def purchase_item(user_id: UUID, item_id: UUID, service: ItemServiceDep):
     """
     Purchase an item for a user with glory
     
@@ -133,28 +149,26 @@ async def purchase_item(user_id: UUID, item_id: UUID):
     Returns the purchased item, new glory balance, and item price
     """
     try:
-        service = get_item_service()
         return await service.purchase_item(user_id, item_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/users/{user_id}/items", response_model=list[UserItemResponse])
-async def get_user_items(user_id: UUID):
+async def get_user_items(user_id: UUID, service: ItemServiceDep):
     """
     Get all items owned by a user
     
     - **user_id**: UUID of the user
     """
     try:
-        service = get_item_service()
         return await service.get_user_items(user_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.patch("/users/{user_id}/items/{user_item_id}/feature", response_model=UserItemResponse)
-async def set_featured_item(user_id: UUID, user_item_id: UUID):
+async def set_featured_item(user_id: UUID, user_item_id: UUID, service: ItemServiceDep):
     """
     Set an item as featured for a user
     
@@ -162,7 +176,6 @@ async def set_featured_item(user_id: UUID, user_item_id: UUID):
     - **user_item_id**: UUID of the user_item to feature
     """
     try:
-        service = get_item_service()
         return await service.set_featured_item(user_id, user_item_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
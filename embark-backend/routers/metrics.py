@@ -0,0 +1,39 @@
+"""Router for the Prometheus metrics endpoint"""
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Response
+
+from config.settings import settings
+from middleware.error_handler import NotFoundException, UnauthorizedException
+from utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+async def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """Allow only scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+
+    The endpoint doesn't exist while METRICS_TOKEN is unset.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise NotFoundException("Not Found")
+
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        credentials.strip().encode(), token.encode()
+    ):
+        raise UnauthorizedException("Invalid metrics token")
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)],
+)
+async def metrics():
+    """Request, database and OpenAI metrics in Prometheus text format"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,44 +1,45 @@
-from fastapi import APIRouter, HTTPException, Query
+import json
+import logging
+import random
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from uuid import UUID
 from typing import Optional
 
-from database.supabase_client import get_supabase_client
+from config.settings import settings
+from database.supabase_client import MissingFunctionError
+from dependencies import (
+    CatalogResponsesDep,
+    ItemServiceDep,
+    QuestHelperDep,
+    QuestServiceDep,
+    UserServiceDep,
+)
 from models.quest import (
     QuestCreate,
     QuestUpdate,
     QuestResponse,
     UserQuestCreate,
     UserQuestResponse,
+    UserQuestAbandonBatch,
+    UserQuestAbandonBatchResponse,
     ActiveQuestResponse,
     CompletedQuestResponse,
+    QuestCompletionResponse,
     QuestChatRequest,
     QuestChatResponse,
 )
-from services.quest_service import QuestService
-from services.user_service import UserService
-from services.item_service import ItemService
-from services.quest_helper_service import QuestHelperService
+from services.quest_service import HISTORY_ORDER, QuestService
+from services.quest_helper_service import ChatCapacityError
+from utils.batch import parse_ids
+from utils.pagination import cursor_headers, set_next_cursor
 
 router = APIRouter()
-
-
-def get_quest_service() -> QuestService:
-    """Dependency to get quest service instance"""
-    return QuestService(get_supabase_client())
-
-
-def get_user_service() -> UserService:
-    """Dependency to get user service instance"""
-    return UserService(get_supabase_client())
-
-
-def get_item_service() -> ItemService:
-    """Dependency to get item service instance"""
-    return ItemService(get_supabase_client())
+logger = logging.getLogger(__name__)
 
 
 @router.post("/quests", response_model=QuestResponse, status_code=201)
-async def create_quest(quest_data: QuestCreate):
+async def create_quest(quest_data: QuestCreate, service: QuestServiceDep):
     """
     Create a new quest
     
@@ -51,21 +52,19 @@ async def create_quest(quest_data: QuestCreate):
     - **reward_item_id**: Optional item reward ID
     """
     try:
-        service = get_quest_service()
         return await service.create_quest(quest_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/quests/{quest_id}", response_model=QuestResponse)
-async def get_quest(quest_id: UUID):
+async def get_quest(quest_id: UUID, service: QuestServiceDep):
     """
     Get a quest by ID
     
     - **quest_id**: UUID of the quest
     """
     try:
-        service = get_quest_service()
         quest = await service.get_quest(quest_id)
         
         if not quest:
@@ -78,9 +77,15 @@ async def get_quest(quest_id: UUID):
 
 @router.get("/quests", response_model=list[QuestResponse])
 async def list_quests(
+    request: Request,
+    response: Response,
+    service: QuestServiceDep,
+    catalog_responses: CatalogResponsesDep,
     tier: Optional[int] = Query(default=None, ge=1, le=6),
     limit: int = Query(default=500, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    ids: Optional[str] = Query(default=None),
 ):
     """
     List quests with optional tier filter
@@ -88,16 +93,37 @@ async def list_quests(
     - **tier**: Filter by tier (1-6)
     - **limit**: Maximum number of quests to return (1-500, default 500)
     - **offset**: Number of quests to skip
+    - **cursor**: Opaque cursor for the next page (from the X-Next-Cursor response
+      header); overrides offset
+    - **ids**: Comma-separated quest IDs to fetch in one request (at most 100); other
+      parameters are then ignored and unknown IDs are left out
     """
     try:
-        service = get_quest_service()
-        return await service.list_quests(tier=tier, limit=limit, offset=offset)
+        batch_ids = parse_ids(ids)
+        if batch_ids is not None:
+            return await service.get_quests_by_ids(batch_ids)
+
+        async def build():
+            quests = await service.list_quests(
+                tier=tier, limit=limit, offset=offset, cursor=cursor
+            )
+            return quests, cursor_headers(quests, limit, service.catalog.order)
+
+        # Served from bytes prepared once per catalog version; revalidations skip the database
+        return await catalog_responses.respond(
+            request,
+            response,
+            await service.catalog_version(),
+            ("quests", tier, limit, offset, cursor),
+            QuestResponse,
+            build,
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.patch("/quests/{quest_id}", response_model=QuestResponse)
-async def update_quest(quest_id: UUID, quest_data: QuestUpdate):
+async def update_quest(quest_id: UUID, quest_data: QuestUpdate, service: QuestServiceDep):
     """
     Update a quest
     
@@ -105,21 +131,19 @@ async def update_quest(quest_id: UUID, quest_data: QuestUpdate):
     - **quest_data**: Fields to update (all optional)
     """
     try:
-        service = get_quest_service()
         return await service.update_quest(quest_id, quest_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/quests/{quest_id}", status_code=204)
-async def delete_quest(quest_id: UUID):
+async def delete_quest(quest_id: UUID, service: QuestServiceDep):
     """
     Delete a quest
     
     - **quest_id**: UUID of the quest
     """
     try:
-        service = get_quest_service()
         success = await service.delete_quest(quest_id)
         
         if not success:
@@ -131,7 +155,7 @@ async def delete_quest(quest_id: UUID):
 
 
 @router.post("/users/{user_id}/quests/start", response_model=UserQuestResponse, status_code=201)
-async def start_quest(user_id: UUID, quest_data: UserQuestCreate):
+async def start_quest(user_id: UUID, quest_data: UserQuestCreate, service: QuestServiceDep):
     """
     Start a quest for a user
     
@@ -139,42 +163,54 @@ async def start_quest(user_id: UUID, quest_data: UserQuestCreate):
     - **quest_id**: UUID of the quest to start
     """
     try:
-        service = get_quest_service()
         return await service.start_quest(user_id, quest_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/users/{user_id}/quests/active", response_model=list[ActiveQuestResponse])
-async def get_active_quests(user_id: UUID):
+async def get_active_quests(user_id: UUID, service: QuestServiceDep):
     """
     Get user's active quests (up to 4)
     
     - **user_id**: UUID of the user
     """
     try:
-        service = get_quest_service()
         return await service.get_active_quests(user_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/users/{user_id}/quests/{user_quest_id}/complete")
-async def complete_quest(user_id: UUID, user_quest_id: UUID):
+@router.post(
+    "/users/{user_id}/quests/{user_quest_id}/complete",
+    response_model=QuestCompletionResponse,
+)
+async def complete_quest(
+    user_id: UUID,
+    user_quest_id: UUID,
+    quest_service: QuestServiceDep,
+    user_service: UserServiceDep,
+    item_service: ItemServiceDep,
+):
     """
     Complete a specific user quest and award rewards
     
     - **user_id**: UUID of the user
     - **user_quest_id**: UUID of the user_completed_quest entry to complete
     
-    Returns: { user_quest, awarded_item (or null if already owned) }
+    Returns: { user_quest, awarded_item (or null if already owned), awarded_achievements }
     """
     try:
-        import random
-        
-        quest_service = get_quest_service()
-        user_service = get_user_service()
-        item_service = get_item_service()
+        if quest_service.completion_rpc_enabled:
+            # Single round trip: completion and all rewards in one transaction
+            try:
+                result = await quest_service.complete_quest_with_rewards(user_id, user_quest_id)
+            except MissingFunctionError:
+                pass  # Not installed yet: fall through to the multi-query path
+            else:
+                if result is None:
+                    raise HTTPException(status_code=404, detail="User not found")
+                return result
         
         # Verify user exists before completing quest
         user = await user_service.get_user(user_id)
@@ -193,7 +229,7 @@ async def complete_quest(user_id: UUID, user_quest_id: UUID):
         try:
             await user_service.update_user_stats(user_id, stats_update)
         except Exception as stats_error:
-            print(f"Error updating user stats: {stats_error}")
+            logger.error(f"Error updating user stats: {stats_error}")
             # If stats update fails, log but continue (quest is still completed)
             # This prevents the "User not found" error from breaking the flow
         
@@ -228,11 +264,11 @@ async def complete_quest(user_id: UUID, user_quest_id: UUID):
                 
         except Exception as item_error:
             # Log the error but don't fail the quest completion
-            print(f"Warning: Failed to award item: {item_error}")
+            logger.warning(f"Failed to award item: {item_error}")
         
         # Return quest completion info with awarded item and achievements
-        return {
-            "user_quest": UserQuestResponse(
+        return QuestCompletionResponse(
+            user_quest=UserQuestResponse(
                 id=completed_quest.id,
                 user_id=completed_quest.user_id,
                 quest_id=completed_quest.quest_id,
@@ -241,19 +277,55 @@ async def complete_quest(user_id: UUID, user_quest_id: UUID):
                 deadline_at=completed_quest.deadline_at,
                 is_active=completed_quest.is_active,
             ),
-            "awarded_item": awarded_item,
-            "awarded_achievements": completed_quest.awarded_achievements
-        }
+            awarded_item=awarded_item,
+            awarded_achievements=completed_quest.awarded_achievements,
+        )
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Catch any other unexpected errors
-        print(f"Error completing quest: {e}")
+        logger.exception(f"Error completing quest: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+async def _require_active_quest(
+    service: QuestService, user_id: UUID, user_quest_id: UUID
+) -> ActiveQuestResponse:
+    """Look up one of the user's active quests through the service, or raise 404"""
+    user_quest = await service.get_active_user_quest(user_id, user_quest_id)
+    if not user_quest:
+        raise HTTPException(
+            status_code=404,
+            detail="Active quest not found"
+        )
+    return user_quest
+
+
+def _chat_busy(e: ChatCapacityError) -> HTTPException:
+    """503 for a chat that couldn't get an OpenAI slot in time"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, round(settings.CHAT_QUEUE_TIMEOUT_SECONDS)))},
+    )
+
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
 @router.post("/users/{user_id}/quests/{user_quest_id}/chat", response_model=QuestChatResponse)
-async def quest_chat(user_id: UUID, user_quest_id: UUID, chat_request: QuestChatRequest):
+async def quest_chat(
+    user_id: UUID,
+    user_quest_id: UUID,
+    chat_request: QuestChatRequest,
+    quest_service: QuestServiceDep,
+    helper_service: QuestHelperDep,
+):
     """
     Chat with AI assistant about completing a quest
     
@@ -264,45 +336,107 @@ async def quest_chat(user_id: UUID, user_quest_id: UUID, chat_request: QuestChat
     Returns: AI assistant's response
     """
     try:
-        quest_service = get_quest_service()
-        
-        # Get the active quest details
-        active_quests = await quest_service.get_active_quests(user_id)
-        user_quest = next(
-            (q for q in active_quests if str(q.id) == str(user_quest_id)),
-            None
-        )
-        
-        if not user_quest:
-            raise HTTPException(
-                status_code=404,
-                detail="Active quest not found"
-            )
-        
-        # Initialize quest helper service
-        helper_service = QuestHelperService()
+        user_quest = await _require_active_quest(quest_service, user_id, user_quest_id)
         
         # Get chat response
         response = await helper_service.get_chat_response(
             quest=user_quest.quest,
             user_message=chat_request.message,
-            chat_history=chat_request.chat_history
+            chat_history=chat_request.chat_history,
+            quest_version=await quest_service.catalog_version(),
         )
         
         return QuestChatResponse(response=response)
         
     except HTTPException:
         raise
+    except ChatCapacityError as e:
+        raise _chat_busy(e)
+    except Exception as e:
+        logger.exception(f"Error in quest chat: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to get chat response. Please try again."
+        )
+
+
+@router.post("/users/{user_id}/quests/{user_quest_id}/chat/stream")
+async def quest_chat_stream(
+    request: Request,
+    user_id: UUID,
+    user_quest_id: UUID,
+    chat_request: QuestChatRequest,
+    quest_service: QuestServiceDep,
+    helper_service: QuestHelperDep,
+):
+    """
+    Chat with AI assistant about completing a quest, streamed as Server-Sent Events
+    
+    - **user_id**: UUID of the user
+    - **user_quest_id**: UUID of the user_completed_quest entry
+    - **chat_request**: Contains message and chat history
+    
+    Events: `data: {"delta": "..."}` per piece of the answer, then `event: done`.
+    On failure mid-stream an `event: error` is sent instead of `done`.
+    Returns 503 if too many chats are in progress.
+    """
+    try:
+        user_quest = await _require_active_quest(quest_service, user_id, user_quest_id)
+        chunks = helper_service.stream_chat_response(
+            quest=user_quest.quest,
+            user_message=chat_request.message,
+            chat_history=chat_request.chat_history,
+            quest_version=await quest_service.catalog_version(),
+        )
+        # Wait for the first piece before answering, so a full queue or an
+        # upstream failure is still a proper status code
+        try:
+            first = await anext(chunks)
+        except StopAsyncIteration:
+            first = None
+    except HTTPException:
+        raise
+    except ChatCapacityError as e:
+        raise _chat_busy(e)
     except Exception as e:
-        print(f"Error in quest chat: {e}")
+        logger.exception(f"Error in quest chat: {e}")
         raise HTTPException(
             status_code=500,
             detail="Failed to get chat response. Please try again."
         )
 
+    async def events():
+        try:
+            if first is None:
+                yield _sse_event({}, event="done")
+                return
+            yield _sse_event({"delta": first})
+            async for delta in chunks:
+                if await request.is_disconnected():
+                    # Stop generating for a client that's gone
+                    break
+                yield _sse_event({"delta": delta})
+            else:
+                yield _sse_event({}, event="done")
+        except Exception as e:
+            logger.exception(f"Error in quest chat stream: {e}")
+            yield _sse_event(
+                {"detail": "Failed to get chat response. Please try again."}, event="error"
+            )
+        finally:
+            # Closes the upstream OpenAI response (and frees the chat slot)
+            # if we stopped early
+            await chunks.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.delete("/users/{user_id}/quests/{user_quest_id}/abandon", status_code=204)
-async def abandon_quest(user_id: UUID, user_quest_id: UUID):
+async def abandon_quest(user_id: UUID, user_quest_id: UUID, service: QuestServiceDep):
     """
     Abandon a specific user quest
     
@@ -310,7 +444,6 @@ async def abandon_quest(user_id: UUID, user_quest_id: UUID):
     - **user_quest_id**: UUID of the user_completed_quest entry to abandon
     """
     try:
-        service = get_quest_service()
         success = await service.abandon_quest(user_id, user_quest_id)
         
         if not success:
@@ -321,20 +454,49 @@ async def abandon_quest(user_id: UUID, user_quest_id: UUID):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/users/{user_id}/quests/abandon", response_model=UserQuestAbandonBatchResponse
+)
+async def abandon_quests(user_id: UUID, batch: UserQuestAbandonBatch, service: QuestServiceDep):
+    """
+    Abandon several of a user's active quests at once
+    
+    - **user_id**: UUID of the user
+    - **user_quest_ids**: UUIDs of the user_completed_quest entries to abandon (at most 100)
+    
+    IDs that aren't active quests of this user are returned in not_found.
+    """
+    try:
+        abandoned = await service.abandon_quests(user_id, batch.user_quest_ids)
+        done = set(abandoned)
+        requested = list(dict.fromkeys(batch.user_quest_ids))
+        return UserQuestAbandonBatchResponse(
+            abandoned=[id for id in requested if str(id) in done],
+            not_found=[id for id in requested if str(id) not in done],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/users/{user_id}/quests/history", response_model=list[CompletedQuestResponse])
 async def get_quest_history(
     user_id: UUID,
+    response: Response,
+    service: QuestServiceDep,
     limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
 ):
     """
     Get user's completed quest history with full quest details
     
     - **user_id**: UUID of the user
     - **limit**: Maximum number of quests to return (1-100)
+    - **cursor**: Opaque cursor for the next page (from the X-Next-Cursor response header)
     """
     try:
-        service = get_quest_service()
-        return await service.get_user_quest_history(user_id, limit=limit)
+        history = await service.get_user_quest_history(user_id, limit=limit, cursor=cursor)
+        set_next_cursor(response, history, limit, HISTORY_ORDER)
+        return history
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
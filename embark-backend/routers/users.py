@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from uuid import UUID
+from typing import Optional
 
-from models.user import UserCreate, UserUpdate, UserResponse, UserStatsUpdate
+from models.user import UserBatchRequest, UserCreate, UserUpdate, UserResponse, UserStatsUpdate
 from dependencies import UserServiceDep
+from services.user_service import USER_ORDER
+from utils.pagination import set_next_cursor
 from middleware.error_handler import NotFoundException, BadRequestException
 
 router = APIRouter()
@@ -21,6 +24,21 @@ async def create_user(user_data: UserCreate, service: UserServiceDep):
         raise BadRequestException(str(e))
 
 
+@router.post("/users/batch", response_model=list[UserResponse])
+async def get_users_batch(batch: UserBatchRequest, service: UserServiceDep):
+    """
+    Get several users by ID in one request
+    
+    - **user_ids**: UUIDs of the users (at most 100)
+    
+    Users are returned in the order requested; unknown IDs are left out.
+    """
+    try:
+        return await service.get_users_by_ids(batch.user_ids)
+    except ValueError as e:
+        raise BadRequestException(str(e))
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: UUID, service: UserServiceDep):
     """
@@ -60,17 +78,23 @@ async def get_user_by_username(username: str, service: UserServiceDep):
 @router.get("/users", response_model=list[UserResponse])
 async def list_users(
     service: UserServiceDep,
+    response: Response,
     limit: int = Query(default=100, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
 ):
     """
     List all users with pagination
     
     - **limit**: Maximum number of users to return (1-100)
     - **offset**: Number of users to skip
+    - **cursor**: Opaque cursor for the next page (from the X-Next-Cursor response
+      header); overrides offset
     """
     try:
-        return await service.list_users(limit=limit, offset=offset)
+        users = await service.list_users(limit=limit, offset=offset, cursor=cursor)
+        set_next_cursor(response, users, limit, USER_ORDER)
+        return users
     except ValueError as e:
         raise BadRequestException(str(e))
 
@@ -0,0 +1,78 @@
+"""
+In-memory achievement rules engine
+
+Indexes the achievement catalog so award eligibility can be decided from a
+user's progress without querying achievement definitions or running the
+check_* database functions.
+"""
+from bisect import bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.achievement import AchievementResponse
+from models.quest import QuestResponse
+from models.user import UserProgress
+
+
+class AchievementRules:
+    """Achievement definitions indexed for eligibility checks"""
+
+    def __init__(
+        self,
+        achievements: List[AchievementResponse],
+        quests: List[QuestResponse],
+    ):
+        self.by_type_tier: Dict[Tuple[str, int], AchievementResponse] = {}
+        self.by_type_topic: Dict[Tuple[str, str], AchievementResponse] = {}
+        self.by_type_quest: Dict[Tuple[str, str], AchievementResponse] = {}
+
+        for achievement in achievements:
+            kind = achievement.achievement_type
+            if achievement.tier is not None:
+                self.by_type_tier.setdefault((kind, achievement.tier), achievement)
+            if achievement.topic is not None:
+                self.by_type_topic.setdefault((kind, achievement.topic), achievement)
+            if achievement.quest_id is not None:
+                self.by_type_quest.setdefault((kind, str(achievement.quest_id)), achievement)
+
+        # Collection thresholds (the achievement's tier is the item count), sorted for bisect
+        self.collection = sorted(
+            (a for a in achievements if a.achievement_type == "collection" and a.tier is not None),
+            key=lambda a: a.tier,
+        )
+        self.collection_thresholds = [a.tier for a in self.collection]
+
+        # Quest membership for the "complete every quest in ..." achievements
+        self.quest_ids_by_tier: Dict[int, Set[str]] = {}
+        self.quest_ids_by_topic: Dict[str, Set[str]] = {}
+        for quest in quests:
+            self.quest_ids_by_tier.setdefault(quest.tier, set()).add(str(quest.id))
+            self.quest_ids_by_topic.setdefault(quest.topic, set()).add(str(quest.id))
+
+    def quest_achievement(
+        self, quest_id: str, progress: UserProgress
+    ) -> Optional[AchievementResponse]:
+        """Achievement for completing a specific quest"""
+        if str(quest_id) not in progress.completed_quest_ids:
+            return None
+        return self.by_type_quest.get(("quest", str(quest_id)))
+
+    def tier_achievement(self, tier: int, progress: UserProgress) -> Optional[AchievementResponse]:
+        """Achievement for completing every quest in a tier"""
+        quest_ids = self.quest_ids_by_tier.get(tier)
+        if not quest_ids or not quest_ids <= progress.completed_quest_ids:
+            return None
+        return self.by_type_tier.get(("tier", tier))
+
+    def questline_achievement(
+        self, topic: str, progress: UserProgress
+    ) -> Optional[AchievementResponse]:
+        """Achievement for completing every quest in a topic"""
+        quest_ids = self.quest_ids_by_topic.get(topic)
+        if not quest_ids or not quest_ids <= progress.completed_quest_ids:
+            return None
+        return self.by_type_topic.get(("questline", topic))
+
+    def collection_achievement(self, item_count: int) -> Optional[AchievementResponse]:
+        """Highest collection achievement whose threshold the item count reaches"""
+        index = bisect_right(self.collection_thresholds, item_count)
+        return self.collection[index - 1] if index else None
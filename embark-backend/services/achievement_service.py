@@ -1,28 +1,133 @@
 """Service layer for achievements business logic"""
 
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 from uuid import UUID
 import logging
-from database.supabase_client import get_supabase_client
+from postgrest import APIError, AsyncPostgrestClient
+from database.supabase_client import UNIQUE_VIOLATION, get_async_supabase_client
 from models.achievement import (
     AchievementResponse,
     UserAchievementResponse,
 )
+from models.quest import QuestResponse
+from models.user import UserProgress
+from services.achievement_rules import AchievementRules
+from services.catalog_cache import (
+    CatalogCache,
+    CatalogSnapshot,
+    create_achievement_catalog,
+    create_quest_catalog,
+)
+from services.progress_cache import ProgressCache
 
 
 class AchievementService:
     """Service for managing achievements"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        supabase: Optional[AsyncPostgrestClient] = None,
+        catalog: Optional[CatalogCache[AchievementResponse]] = None,
+        progress: Optional[ProgressCache] = None,
+        quest_catalog: Optional[CatalogCache[QuestResponse]] = None,
+    ):
+        self.supabase = supabase
         self.table = "achievements"
         self.user_achievements_table = "user_achievements"
+        self.catalog = create_achievement_catalog() if catalog is None else catalog
+        self.quest_catalog = create_quest_catalog() if quest_catalog is None else quest_catalog
+        self.progress = ProgressCache() if progress is None else progress
+        # Rules built from the current catalog snapshots
+        self._rules_cache: Optional[
+            Tuple[CatalogSnapshot, CatalogSnapshot, AchievementRules]
+        ] = None
         self.logger = logging.getLogger(__name__)
 
+    def _client(self) -> AsyncPostgrestClient:
+        # Injected client when built by the app, else the shared one
+        return self.supabase or get_async_supabase_client()
+
+    async def get_rules(self, supabase: AsyncPostgrestClient) -> AchievementRules:
+        """Get the achievement rules engine, rebuilt only when a catalog reloads"""
+        achievements = await self.catalog.snapshot(supabase)
+        quests = await self.quest_catalog.snapshot(supabase)
+
+        if achievements is not None and quests is not None:
+            cached = self._rules_cache
+            if cached is not None and cached[0] is achievements and cached[1] is quests:
+                return cached[2]
+            rules = AchievementRules(list(achievements.rows), list(quests.rows))
+            self._rules_cache = (achievements, quests, rules)
+            return rules
+
+        # Catalog cache unavailable: build from the tables directly
+        achievements_response = await supabase.table(self.table).select("*").execute()
+        quests_response = await supabase.table("quests").select("*").execute()
+        return AchievementRules(
+            [AchievementResponse(**achievement) for achievement in achievements_response.data],
+            [QuestResponse(**quest) for quest in quests_response.data],
+        )
+
+    async def get_user_progress(self, user_id: UUID, refresh: bool = False) -> UserProgress:
+        """Get a user's completed quests, owned items and unlocked achievements
+
+        Args:
+            user_id: The user
+            refresh: Reload from the database instead of using the cached snapshot.
+                Award decisions use fresh progress, so that writes made through
+                other workers are counted.
+        """
+        try:
+            supabase = self._client()
+            return await self.progress.get(supabase, user_id, refresh=refresh)
+        except Exception as e:
+            self.logger.error(f"Error loading progress for user {user_id}: {str(e)}")
+            raise
+
+    async def _award(
+        self,
+        supabase: AsyncPostgrestClient,
+        progress: UserProgress,
+        achievement: Optional[AchievementResponse],
+    ) -> Optional[AchievementResponse]:
+        """Insert the user achievement unless already unlocked; returns it only if newly awarded"""
+        if achievement is None or str(achievement.id) in progress.unlocked_achievement_ids:
+            return None
+
+        try:
+            await supabase.table(self.user_achievements_table).insert({
+                "user_id": str(progress.user_id),
+                "achievement_id": str(achievement.id),
+                "unlocked_at": datetime.now(timezone.utc).isoformat()
+            }).execute()
+        except APIError as e:
+            if e.code != UNIQUE_VIOLATION:
+                raise
+            # Unlocked since the progress was loaded: not newly awarded
+            progress.unlocked_achievement_ids.add(str(achievement.id))
+            return None
+        progress.unlocked_achievement_ids.add(str(achievement.id))
+
+        self.logger.info(
+            f"Awarded {achievement.achievement_type} achievement {achievement.id} "
+            f"to user {progress.user_id}"
+        )
+        return achievement
+
+    async def catalog_version(self) -> Optional[str]:
+        """Version of the cached achievement catalog (None when it isn't cached)"""
+        return await self.catalog.version(self._client())
+
     async def get_all_achievements(self) -> List[AchievementResponse]:
         """Get all available achievements"""
         try:
-            supabase = get_supabase_client()
-            response = (
+            supabase = self._client()
+            catalog = await self.catalog.snapshot(supabase)
+            if catalog is not None:
+                return list(catalog.rows)
+
+            response = await (
                 supabase.table(self.table)
                 .select("*")
                 .order("achievement_type", desc=False)
@@ -40,8 +145,8 @@ class AchievementService:
     ) -> List[UserAchievementResponse]:
         """Get all achievements unlocked by a specific user"""
         try:
-            supabase = get_supabase_client()
-            response = (
+            supabase = self._client()
+            response = await (
                 supabase.table(self.user_achievements_table)
                 .select("*, achievement:achievements(*)")
                 .eq("user_id", str(user_id))
@@ -67,50 +172,21 @@ class AchievementService:
             raise
 
     async def check_and_award_tier_achievement(
-        self, user_id: UUID, quest_tier: int
+        self, user_id: UUID, quest_tier: int, progress: Optional[UserProgress] = None
     ) -> Optional[AchievementResponse]:
         """Check and award tier achievement for completing a quest
         
         Returns the achievement if newly awarded, None otherwise
         """
         try:
-            supabase = get_supabase_client()
-            
-            # Call the database function to check and award tier achievement
-            supabase.rpc("check_tier_achievement", {
-                "p_user_id": str(user_id),
-                "p_quest_tier": quest_tier
-            }).execute()
-            
-            # Check if user just got this achievement (fetch their tier achievements)
-            tier_achievement_response = (
-                supabase.table(self.table)
-                .select("*")
-                .eq("achievement_type", "tier")
-                .eq("tier", quest_tier)
-                .single()
-                .execute()
-            )
-            
-            if not tier_achievement_response.data:
-                return None
-                
-            achievement = AchievementResponse(**tier_achievement_response.data)
-            
-            # Check if user has this achievement
-            user_achievement_response = (
-                supabase.table(self.user_achievements_table)
-                .select("*")
-                .eq("user_id", str(user_id))
-                .eq("achievement_id", str(achievement.id))
-                .execute()
-            )
-            
-            # Return achievement only if it exists (was just awarded or already had it)
-            if user_achievement_response.data:
-                return achievement
-                
-            return None
+            supabase = self._client()
+            rules = await self.get_rules(supabase)
+            if progress is None:
+                progress = await self.get_user_progress(user_id, refresh=True)
+
+            # Only awarded once ALL quests in the tier are complete
+            achievement = rules.tier_achievement(quest_tier, progress)
+            return await self._award(supabase, progress, achievement)
         except Exception as e:
             self.logger.error(
                 f"Error checking tier achievement for user {user_id}, tier {quest_tier}: {str(e)}"
@@ -118,35 +194,20 @@ class AchievementService:
             raise
 
     async def check_and_award_quest_achievement(
-        self, user_id: UUID, quest_id: UUID
+        self, user_id: UUID, quest_id: UUID, progress: Optional[UserProgress] = None
     ) -> Optional[AchievementResponse]:
         """Check and award quest-specific achievement for completing a quest
         
         Returns the achievement if newly awarded, None otherwise
         """
         try:
-            supabase = get_supabase_client()
-            
-            # Call the database function to check and award quest achievement
-            supabase.rpc("check_quest_achievement", {
-                "p_user_id": str(user_id),
-                "p_quest_id": str(quest_id)
-            }).execute()
-            
-            # Fetch the quest achievement
-            achievement_response = (
-                supabase.table(self.table)
-                .select("*")
-                .eq("achievement_type", "quest")
-                .eq("quest_id", str(quest_id))
-                .single()
-                .execute()
-            )
-            
-            if achievement_response.data:
-                return AchievementResponse(**achievement_response.data)
-                
-            return None
+            supabase = self._client()
+            rules = await self.get_rules(supabase)
+            if progress is None:
+                progress = await self.get_user_progress(user_id, refresh=True)
+
+            achievement = rules.quest_achievement(str(quest_id), progress)
+            return await self._award(supabase, progress, achievement)
         except Exception as e:
             self.logger.error(
                 f"Error checking quest achievement for user {user_id}, quest {quest_id}: {str(e)}"
@@ -154,39 +215,21 @@ class AchievementService:
             raise
 
     async def check_and_award_questline_achievement(
-        self, user_id: UUID, topic: str
+        self, user_id: UUID, topic: str, progress: Optional[UserProgress] = None
     ) -> Optional[AchievementResponse]:
         """Check and award questline achievement if user completed all quests in topic
         
         Returns the achievement if newly awarded, None otherwise
         """
         try:
-            supabase = get_supabase_client()
-            
-            # Call the database function to check and award questline achievement
-            result = supabase.rpc("check_questline_achievement", {
-                "p_user_id": str(user_id),
-                "p_topic": topic
-            }).execute()
-            
-            # The function returns TRUE if achievement was awarded
-            if not result.data:
-                return None
-                
-            # Fetch the questline achievement for this topic
-            achievement_response = (
-                supabase.table(self.table)
-                .select("*")
-                .eq("achievement_type", "questline")
-                .eq("topic", topic)
-                .single()
-                .execute()
-            )
-            
-            if achievement_response.data:
-                return AchievementResponse(**achievement_response.data)
-                
-            return None
+            supabase = self._client()
+            rules = await self.get_rules(supabase)
+            if progress is None:
+                progress = await self.get_user_progress(user_id, refresh=True)
+
+            # Only awarded once ALL quests in the topic are complete
+            achievement = rules.questline_achievement(topic, progress)
+            return await self._award(supabase, progress, achievement)
         except Exception as e:
             self.logger.error(
                 f"Error checking questline achievement for user {user_id}, topic {topic}: {str(e)}"
@@ -194,75 +237,21 @@ class AchievementService:
             raise
 
     async def check_and_award_collection_achievement(
-        self, user_id: UUID
+        self, user_id: UUID, progress: Optional[UserProgress] = None
     ) -> Optional[AchievementResponse]:
         """Check and award collection achievement based on user's item count
         
         Returns the achievement if newly awarded, None otherwise
         """
         try:
-            supabase = get_supabase_client()
-            
-            # Count user's total items
-            user_items_response = (
-                supabase.table("user_items")
-                .select("id", count="exact")
-                .eq("user_id", str(user_id))
-                .execute()
-            )
-            
-            item_count = user_items_response.count or 0
-            
-            # Get all collection achievements, ordered by tier
-            collection_achievements_response = (
-                supabase.table(self.table)
-                .select("*")
-                .eq("achievement_type", "collection")
-                .order("tier")
-                .execute()
-            )
-            
-            if not collection_achievements_response.data:
-                return None
-            
-            # Find the highest tier achievement that matches the item count
-            matching_achievement = None
-            for ach in collection_achievements_response.data:
-                ach_tier = ach.get("tier")
-                if ach_tier is not None and ach_tier <= item_count:
-                    matching_achievement = ach
-            
-            if not matching_achievement:
-                return None
-            
-            achievement = AchievementResponse(**matching_achievement)
-            
-            # Check if user already has this achievement
-            user_achievement_response = (
-                supabase.table(self.user_achievements_table)
-                .select("*")
-                .eq("user_id", str(user_id))
-                .eq("achievement_id", str(achievement.id))
-                .execute()
-            )
-            
-            if user_achievement_response.data:
-                # User already has this achievement
-                return None
-            
-            # Award the achievement
-            from datetime import datetime, timezone
-            supabase.table(self.user_achievements_table).insert({
-                "user_id": str(user_id),
-                "achievement_id": str(achievement.id),
-                "unlocked_at": datetime.now(timezone.utc).isoformat()
-            }).execute()
-            
-            self.logger.info(
-                f"Awarded collection achievement {achievement.id} to user {user_id} for {item_count} items"
-            )
-            
-            return achievement
+            supabase = self._client()
+            rules = await self.get_rules(supabase)
+            if progress is None:
+                progress = await self.get_user_progress(user_id, refresh=True)
+
+            # Highest tier achievement that the item count reaches
+            achievement = rules.collection_achievement(len(progress.owned_item_ids))
+            return await self._award(supabase, progress, achievement)
         except Exception as e:
             self.logger.error(
                 f"Error checking collection achievement for user {user_id}: {str(e)}"
@@ -277,11 +266,11 @@ class AchievementService:
         Returns True if successful, False otherwise
         """
         try:
-            supabase = get_supabase_client()
+            supabase = self._client()
             
             # If achievement_id is provided, verify user has unlocked it
             if achievement_id is not None:
-                user_achievement_response = (
+                user_achievement_response = await (
                     supabase.table(self.user_achievements_table)
                     .select("*")
                     .eq("user_id", str(user_id))
@@ -291,12 +280,13 @@ class AchievementService:
                 
                 if not user_achievement_response.data:
                     self.logger.warning(
-                        f"User {user_id} tried to set unearned achievement {achievement_id} as active title"
+                        f"User {user_id} tried to set unearned achievement {achievement_id} "
+                        "as active title"
                     )
                     return False
             
             # Update user's active title
-            supabase.table("users").update(
+            await supabase.table("users").update(
                 {"active_title_id": str(achievement_id) if achievement_id else None}
             ).eq("id", str(user_id)).execute()
             
@@ -311,10 +301,10 @@ class AchievementService:
     async def get_active_title(self, user_id: UUID) -> Optional[AchievementResponse]:
         """Get user's currently active title achievement"""
         try:
-            supabase = get_supabase_client()
+            supabase = self._client()
             
             # Get user's active_title_id
-            user_response = (
+            user_response = await (
                 supabase.table("users")
                 .select("active_title_id")
                 .eq("id", str(user_id))
@@ -326,7 +316,11 @@ class AchievementService:
                 return None
             
             # Fetch the achievement
-            achievement_response = (
+            catalog = await self.catalog.snapshot(supabase)
+            if catalog is not None:
+                return catalog.get(user_response.data["active_title_id"])
+
+            achievement_response = await (
                 supabase.table(self.table)
                 .select("*")
                 .eq("id", user_response.data["active_title_id"])
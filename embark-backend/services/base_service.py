@@ -3,13 +3,14 @@ Base service class with common database operations
 """
 from typing import Optional, List, Any, Dict
 from uuid import UUID
-from supabase import Client
+from postgrest import AsyncPostgrestClient
+from utils.pagination import apply_keyset
 
 
 class BaseService:
     """Base service class with common CRUD operations"""
 
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: AsyncPostgrestClient):
         self.supabase = supabase
 
     async def get_by_id(
@@ -27,7 +28,7 @@ class BaseService:
             Record dict or None if not found
         """
         try:
-            response = (
+            response = await (
                 self.supabase.table(table)
                 .select(select)
                 .eq("id", str(id))
@@ -50,6 +51,7 @@ class BaseService:
         limit: int = 100,
         offset: int = 0,
         desc: bool = False,
+        cursor: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         List all records with optional filtering
@@ -60,8 +62,10 @@ class BaseService:
             filters: Dict of column:value filters
             order_by: Column to order by
             limit: Maximum number of records to return
-            offset: Number of records to skip
+            offset: Number of records to skip (ignored when cursor is given)
             desc: Order descending if True
+            cursor: Keyset cursor from utils.pagination.next_cursor with the same
+                order_by/desc; select must include the order_by and id columns
 
         Returns:
             List of record dicts
@@ -74,12 +78,16 @@ class BaseService:
                 for column, value in filters.items():
                     query = query.eq(column, value)
 
-            # Apply ordering
-            if order_by:
-                query = query.order(order_by, desc=desc)
+            # Apply ordering (id breaks ties so cursors are stable)
+            order = [(order_by, desc)] if order_by else []
+            query = apply_keyset(query, order, cursor)
 
             # Apply pagination
-            response = query.range(offset, offset + limit - 1).execute()
+            if cursor:
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            response = await query.execute()
 
             return response.data
         except Exception as e:
@@ -99,7 +107,7 @@ class BaseService:
             Created record dict
         """
         try:
-            response = self.supabase.table(table).insert(data).execute()
+            response = await self.supabase.table(table).insert(data).execute()
 
             if not response.data:
                 raise ValueError(f"Failed to create record in {table}")
@@ -123,7 +131,7 @@ class BaseService:
             Updated record dict
         """
         try:
-            response = (
+            response = await (
                 self.supabase.table(table)
                 .update(data)
                 .eq("id", str(id))
@@ -149,7 +157,7 @@ class BaseService:
             True if deleted, False if not found
         """
         try:
-            response = (
+            response = await (
                 self.supabase.table(table).delete().eq("id", str(id)).execute()
             )
 
@@ -178,7 +186,7 @@ class BaseService:
                 for column, value in filters.items():
                     query = query.eq(column, value)
 
-            response = query.execute()
+            response = await query.execute()
 
             return response.count or 0
         except Exception as e:
@@ -0,0 +1,193 @@
+"""
+In-process read-through cache for admin-authored catalog tables
+
+Quests, items and achievements change rarely, so each table is loaded whole
+into a snapshot that answers lookups by id, by indexed column and in list
+order without a database round trip. Snapshots expire after a TTL (which also
+bounds staleness across workers) and are dropped explicitly whenever the
+owning service writes to the table.
+
+Each snapshot carries a version derived from its contents, so it's the same on
+every worker holding the same data and changes whenever a write changes the
+table. HTTP ETags for catalog responses are built from it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from postgrest import AsyncPostgrestClient
+
+from config.settings import settings
+from models.achievement import AchievementResponse
+from models.item import ItemResponse
+from models.quest import QuestResponse
+from utils.pagination import with_tiebreaker
+
+T = TypeVar("T", bound=BaseModel)
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot(Generic[T]):
+    """Immutable view of a whole catalog table, in list order"""
+
+    def __init__(
+        self,
+        rows: List[T],
+        indexes: Dict[str, Callable[[T], Hashable]],
+        version: str = "",
+    ):
+        self.rows = rows
+        self.version = version
+        self.by_id: Dict[str, T] = {str(row.id): row for row in rows}
+        self.indexes: Dict[str, Dict[Hashable, List[T]]] = {}
+        for name, key_func in indexes.items():
+            index: Dict[Hashable, List[T]] = {}
+            for row in rows:
+                index.setdefault(key_func(row), []).append(row)
+            self.indexes[name] = index
+        self.loaded_at = time.monotonic()
+
+    def get(self, id: Any) -> Optional[T]:
+        """Get a row by ID"""
+        return self.by_id.get(str(id))
+
+    def lookup(self, index: str, key: Hashable) -> List[T]:
+        """Get the rows matching an index key, in list order"""
+        return self.indexes[index].get(key, [])
+
+
+class CatalogCache(Generic[T]):
+    """Read-through cache holding one CatalogSnapshot per table"""
+
+    def __init__(
+        self,
+        table: str,
+        model: Type[T],
+        order: List[Tuple[str, bool]],
+        indexes: Optional[Dict[str, Callable[[T], Hashable]]] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        """
+        Args:
+            table: Table name
+            model: Response model each row is parsed into
+            order: (column, desc) pairs defining list order (id is appended as tie-breaker)
+            indexes: Named key functions to group rows by
+            ttl_seconds: Snapshot lifetime (default: settings)
+            max_entries: Tables larger than this are not cached (default: settings)
+        """
+        self.table = table
+        self.model = model
+        self.order = with_tiebreaker(order)
+        self.index_funcs = indexes or {}
+        self.ttl_seconds = (
+            settings.CATALOG_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.max_entries = (
+            settings.CATALOG_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self._snapshot: Optional[CatalogSnapshot[T]] = None
+        self._oversized_until: float = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._snapshot.loaded_at < self.ttl_seconds
+        )
+
+    async def snapshot(self, supabase: AsyncPostgrestClient) -> Optional[CatalogSnapshot[T]]:
+        """
+        Get the current snapshot, loading it if missing or expired
+
+        Returns:
+            The snapshot, or None when caching is disabled or the table exceeds
+            max_entries (callers then query the database directly)
+        """
+        if not settings.CATALOG_CACHE_ENABLED:
+            return None
+        if self._is_fresh():
+            return self._snapshot
+        if time.monotonic() < self._oversized_until:
+            return None
+
+        async with self._lock:
+            # Another request may have loaded it while we waited
+            if self._is_fresh():
+                return self._snapshot
+
+            generation = self._generation
+            query = supabase.table(self.table).select("*", count="exact")
+            for column, desc in self.order:
+                query = query.order(column, desc=desc)
+            response = await query.limit(self.max_entries).execute()
+
+            # The exact count also catches truncation by PostgREST's max-rows
+            total = response.count if response.count is not None else len(response.data)
+            if total > len(response.data):
+                logger.warning(
+                    f"Catalog {self.table} has {total} rows, more than one "
+                    f"load returns; not caching"
+                )
+                self._oversized_until = time.monotonic() + self.ttl_seconds
+                return None
+
+            snapshot = CatalogSnapshot(
+                [self.model(**row) for row in response.data],
+                self.index_funcs,
+                version=self._content_version(response.data),
+            )
+            # Don't publish a snapshot that raced with a write
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    def _content_version(self, data: List[Dict[str, Any]]) -> str:
+        payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{self.table}:{payload}".encode()).hexdigest()[:20]
+
+    async def version(self, supabase: AsyncPostgrestClient) -> Optional[str]:
+        """Version of the current snapshot, or None when the table isn't cached"""
+        snapshot = await self.snapshot(supabase)
+        return snapshot.version if snapshot is not None else None
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next read reloads it"""
+        self._generation += 1
+        self._snapshot = None
+        self._oversized_until = 0.0
+
+
+# One cache per catalog is built for the app in dependencies.create_services
+def create_quest_catalog() -> CatalogCache[QuestResponse]:
+    return CatalogCache(
+        "quests",
+        QuestResponse,
+        order=[("tier", False), ("created_at", True)],
+        indexes={"tier": lambda quest: quest.tier, "topic": lambda quest: quest.topic},
+    )
+
+
+def create_item_catalog() -> CatalogCache[ItemResponse]:
+    return CatalogCache(
+        "items",
+        ItemResponse,
+        order=[("rarity_tier", True), ("rarity_stars", True)],
+        indexes={"rarity_tier": lambda item: item.rarity_tier},
+    )
+
+
+def create_achievement_catalog() -> CatalogCache[AchievementResponse]:
+    return CatalogCache(
+        "achievements",
+        AchievementResponse,
+        order=[("achievement_type", False), ("tier", False)],
+        indexes={"achievement_type": lambda achievement: achievement.achievement_type},
+    )
@@ -0,0 +1,87 @@
+"""
+In-process cache of quest chat answers
+
+Many users on the same quest open with nearly the same question ("how do I
+start?", "give me tips"). Answers to history-free or short-history chats are
+cached per quest and normalized conversation, so repeats are served without
+an OpenAI call. Entries expire after a TTL and are dropped when their quest
+is updated or deleted.
+"""
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+from uuid import UUID
+
+from config.settings import settings
+from models.quest import ChatMessage
+from utils.metrics import CHAT_CACHE_LOOKUPS
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " .!?…"
+
+
+def normalize_message(text: str) -> str:
+    """Fold case, Unicode forms, whitespace and trailing punctuation"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+class ChatAnswerCache:
+    """LRU cache of chat answers keyed by quest id and normalized conversation"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_history: Optional[int] = None,
+    ):
+        """
+        Args:
+            ttl_seconds: Answer lifetime (default: settings)
+            max_entries: Number of answers kept before evicting the least recent (default: settings)
+            max_history: Longest chat history that is still cached (default: settings)
+        """
+        self.ttl_seconds = settings.CHAT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.CHAT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_history = settings.CHAT_CACHE_MAX_HISTORY if max_history is None else max_history
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+
+    def key(
+        self, quest_id: UUID, message: str, chat_history: List[ChatMessage]
+    ) -> Optional[Hashable]:
+        """Cache key for a chat, or None if it isn't cacheable"""
+        if not settings.CHAT_CACHE_ENABLED or len(chat_history) > self.max_history:
+            CHAT_CACHE_LOOKUPS.labels("bypass").inc()
+            return None
+        history = tuple((msg.role, normalize_message(msg.content)) for msg in chat_history)
+        return (str(quest_id), history, normalize_message(message))
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Cached answer for a key, if present and fresh"""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            CHAT_CACHE_LOOKUPS.labels("hit").inc()
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        CHAT_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def put(self, key: Hashable, answer: str) -> None:
+        """Store an answer, evicting the least recently used beyond the bound"""
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, quest_id: Optional[UUID] = None) -> None:
+        """Drop answers for one quest, or everything"""
+        if quest_id is None:
+            self._entries.clear()
+            return
+        quest_key = str(quest_id)
+        for key in [key for key in self._entries if key[0] == quest_key]:
+            del self._entries[key]
@@ -0,0 +1,165 @@
+"""
+Prompt context for quest chat: cached system prompts and token-budgeted history
+
+Clients send the whole chat history every turn, so long chats would get
+slower and more expensive with each message. The history is trimmed to the
+most recent messages that fit a token budget, and older messages are replaced
+by a short summary of what the user asked. The summary quotes client-sent text,
+so it goes out as a user message, never as a system one. The rendered system prompt is
+cached per quest and quest catalog version, and dropped when the quest is
+updated or deleted.
+"""
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from uuid import UUID
+
+from config.settings import settings
+from models.quest import ChatMessage, QuestResponse
+
+# Per-message framing tokens added by the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Longest excerpt of one earlier question kept in the summary
+SUMMARY_EXCERPT_CHARS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text
+
+    BPE tokenizers average about four bytes of English per token; counting
+    UTF-8 bytes rather than characters keeps the estimate on the high side
+    for non-Latin scripts, so the budget errs towards trimming.
+    """
+    return (len(text.encode("utf-8")) + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def _summarize(dropped: List[ChatMessage], max_tokens: int) -> Optional[str]:
+    """Compact, extractive summary of trimmed messages (the user's questions, quoted)"""
+    questions = [msg.content for msg in dropped if msg.role == "user"]
+    header = (
+        f"(Summary of {len(dropped)} earlier messages in this conversation. "
+        "My earlier questions, quoted:)"
+    )
+    lines: List[str] = []
+    used = estimate_tokens(header)
+    # Most recent questions are the most relevant, so they're kept first
+    for question in reversed(questions):
+        excerpt = " ".join(question.split())
+        if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+            excerpt = excerpt[:SUMMARY_EXCERPT_CHARS].rstrip() + "…"
+        line = f"> {excerpt}"
+        cost = estimate_tokens(line) - MESSAGE_OVERHEAD_TOKENS
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return None
+    return "\n".join([header, *reversed(lines)])
+
+
+def budget_history(
+    system_prompt: str,
+    chat_history: List[ChatMessage],
+    user_message: str,
+    max_tokens: Optional[int] = None,
+    summary_tokens: Optional[int] = None,
+) -> List[dict]:
+    """
+    Build the messages array within a token budget
+
+    Args:
+        system_prompt: Rendered system prompt (always kept)
+        chat_history: Previous chat messages, oldest first
+        user_message: The new user message (always kept)
+        max_tokens: Budget for the whole prompt (default: settings)
+        summary_tokens: Budget for the summary of trimmed messages (default: settings)
+
+    Returns:
+        System prompt, optional summary of the trimmed messages (a user message),
+        the most recent history that fits, then the new message
+    """
+    max_tokens = settings.CHAT_HISTORY_TOKEN_BUDGET if max_tokens is None else max_tokens
+    summary_tokens = (
+        settings.CHAT_SUMMARY_TOKEN_BUDGET if summary_tokens is None else summary_tokens
+    )
+
+    available = max_tokens - estimate_tokens(system_prompt) - estimate_tokens(user_message)
+    costs = [estimate_tokens(msg.content) for msg in chat_history]
+
+    kept = len(chat_history)
+    if sum(costs) > available:
+        # Leave room for the summary, then keep the newest messages that fit
+        available -= summary_tokens
+        used = 0
+        kept = 0
+        for cost in reversed(costs):
+            if used + cost > available:
+                break
+            used += cost
+            kept += 1
+
+    dropped = chat_history[: len(chat_history) - kept]
+    recent = chat_history[len(chat_history) - kept:]
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if dropped:
+        summary = _summarize(dropped, summary_tokens)
+        if summary:
+            messages.append({"role": "user", "content": summary})
+    messages.extend({"role": msg.role, "content": msg.content} for msg in recent)
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+class SystemPromptCache:
+    """LRU cache of rendered system prompts keyed by quest id and catalog version"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Number of quests kept before evicting the least recent (default: settings)
+        """
+        self.max_entries = (
+            settings.CHAT_PROMPT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+    def get(
+        self,
+        quest: QuestResponse,
+        render: Callable[[QuestResponse], str],
+        version: Optional[str],
+    ) -> str:
+        """
+        Cached system prompt for a quest, rendering it on a miss
+
+        Args:
+            quest: Quest the prompt is rendered from
+            render: Builds the prompt
+            version: Quest catalog version; a quest changed by another worker
+                gets a new version once the catalog reloads. None (catalog not
+                cached) renders without caching.
+        """
+        if version is None:
+            return render(quest)
+
+        key = str(quest.id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        prompt = render(quest)
+        self._entries[key] = (version, prompt)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return prompt
+
+    def invalidate(self, quest_id: Optional[UUID] = None) -> None:
+        """Drop one quest's prompt, or all of them"""
+        if quest_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(quest_id), None)
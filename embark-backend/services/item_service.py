@@ -1,22 +1,55 @@
+import logging
 from uuid import UUID
 from typing import Optional, List
 from datetime import datetime, timezone
-from supabase import Client
+from postgrest import APIError, AsyncPostgrestClient
+from config.settings import settings
+from database.supabase_client import UNIQUE_VIOLATION, MissingFunctionError, is_missing_function
+from models.achievement import AchievementResponse
 from models.item import ItemCreate, ItemUpdate, ItemResponse, UserItemResponse
 from services.achievement_service import AchievementService
+from services.catalog_cache import CatalogCache, create_item_catalog
+from services.progress_cache import ProgressCache
+from utils.batch import unique_ids
+from utils.pagination import apply_keyset, keyset_slice
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-set attempts for a glory update racing other writers
+GLORY_UPDATE_ATTEMPTS = 5
 
 
 class ItemService:
     """Service for item-related operations"""
 
-    def __init__(self, supabase: Client):
+    def __init__(
+        self,
+        supabase: AsyncPostgrestClient,
+        catalog: Optional[CatalogCache[ItemResponse]] = None,
+        progress: Optional[ProgressCache] = None,
+        achievement_service: Optional[AchievementService] = None,
+    ):
         self.supabase = supabase
-        self.achievement_service = AchievementService()
+        self.catalog = create_item_catalog() if catalog is None else catalog
+        self.progress = ProgressCache() if progress is None else progress
+        self.achievement_service = achievement_service or AchievementService(
+            supabase, progress=self.progress
+        )
+        self._purchase_rpc_missing = False
+
+    @property
+    def purchase_rpc_enabled(self) -> bool:
+        """Whether purchases use the purchase_item database function"""
+        return settings.ITEM_PURCHASE_USE_RPC and not self._purchase_rpc_missing
+
+    async def catalog_version(self) -> Optional[str]:
+        """Version of the cached item catalog (None when it isn't cached)"""
+        return await self.catalog.version(self.supabase)
 
     async def create_item(self, item_data: ItemCreate) -> ItemResponse:
         """Create a new item"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("items")
                 .insert(item_data.model_dump())
                 .execute()
@@ -25,6 +58,7 @@ class ItemService:
             if not response.data:
                 raise ValueError("Failed to create item")
 
+            self.catalog.invalidate()
             return ItemResponse(**response.data[0])
         except Exception as e:
             raise ValueError(f"Error creating item: {str(e)}")
@@ -32,7 +66,13 @@ class ItemService:
     async def get_item(self, item_id: UUID) -> Optional[ItemResponse]:
         """Get an item by ID"""
         try:
-            response = (
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                item = catalog.get(item_id)
+                if item:
+                    return item
+
+            response = await (
                 self.supabase.table("items")
                 .select("*")
                 .eq("id", str(item_id))
@@ -46,31 +86,71 @@ class ItemService:
         except Exception as e:
             raise ValueError(f"Error fetching item: {str(e)}")
 
+    async def get_items_by_ids(self, item_ids: List[UUID]) -> list[ItemResponse]:
+        """Get several items in one query, in the order of the given IDs"""
+        try:
+            ids = unique_ids(item_ids)
+            if not ids:
+                return []
+
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                cached = [catalog.get(item_id) for item_id in ids]
+                if all(cached):
+                    return cached
+
+            response = await (
+                self.supabase.table("items")
+                .select("*")
+                .in_("id", ids)
+                .execute()
+            )
+
+            items_by_id = {item["id"]: item for item in response.data}
+            return [
+                ItemResponse(**items_by_id[item_id])
+                for item_id in ids
+                if item_id in items_by_id
+            ]
+        except Exception as e:
+            raise ValueError(f"Error fetching items: {str(e)}")
+
     async def list_items(
         self,
         rarity_tier: Optional[int] = None,
         limit: int = 500,
         offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> list[ItemResponse]:
-        """List items with optional rarity filter"""
+        """List items with optional rarity filter
+
+        Pages by cursor (see utils.pagination) when one is given, otherwise by offset.
+        """
         try:
             # Validate limit to prevent excessive queries
             if limit > 500:
                 limit = 500
             if limit < 1:
                 limit = 1
-                
+
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                items = catalog.lookup("rarity_tier", rarity_tier) if rarity_tier else catalog.rows
+                if cursor:
+                    return keyset_slice(items, self.catalog.order, cursor, limit)
+                return items[offset:offset + limit]
+
             query = self.supabase.table("items").select("*")
 
             if rarity_tier:
                 query = query.eq("rarity_tier", rarity_tier)
 
-            response = (
-                query.order("rarity_tier", desc=True)
-                .order("rarity_stars", desc=True)
-                .range(offset, offset + limit - 1)
-                .execute()
-            )
+            query = apply_keyset(query, self.catalog.order, cursor)
+            if cursor:
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            response = await query.execute()
 
             return [ItemResponse(**item) for item in response.data]
         except Exception as e:
@@ -86,7 +166,7 @@ class ItemService:
             if not update_data:
                 raise ValueError("No data to update")
 
-            response = (
+            response = await (
                 self.supabase.table("items")
                 .update(update_data)
                 .eq("id", str(item_id))
@@ -96,6 +176,7 @@ class ItemService:
             if not response.data:
                 raise ValueError("Item not found")
 
+            self.catalog.invalidate()
             return ItemResponse(**response.data[0])
         except Exception as e:
             raise ValueError(f"Error updating item: {str(e)}")
@@ -103,13 +184,14 @@ class ItemService:
     async def delete_item(self, item_id: UUID) -> bool:
         """Delete an item"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("items")
                 .delete()
                 .eq("id", str(item_id))
                 .execute()
             )
 
+            self.catalog.invalidate()
             return len(response.data) > 0
         except Exception as e:
             raise ValueError(f"Error deleting item: {str(e)}")
@@ -128,15 +210,8 @@ class ItemService:
                 raise ValueError("Item not found")
 
             # Check if user already owns this item
-            existing_item = (
-                self.supabase.table("user_items")
-                .select("id")
-                .eq("user_id", str(user_id))
-                .eq("item_id", str(item_id))
-                .execute()
-            )
-            
-            if existing_item.data:
+            progress = await self.progress.get(self.supabase, user_id)
+            if str(item_id) in progress.owned_item_ids:
                 # User already owns this item, return None to indicate it wasn't awarded
                 return None
 
@@ -148,14 +223,23 @@ class ItemService:
                 "is_featured": False,
             }
 
-            response = (
-                self.supabase.table("user_items").insert(insert_data).execute()
-            )
+            try:
+                response = await (
+                    self.supabase.table("user_items").insert(insert_data).execute()
+                )
+            except APIError as e:
+                if e.code != UNIQUE_VIOLATION:
+                    raise
+                # The progress snapshot was stale and the (user_id, item_id)
+                # constraint caught the duplicate: already owned
+                self.progress.record_item_owned(user_id, item_id)
+                return None
 
             if not response.data:
                 raise ValueError("Failed to award item")
 
             user_item = response.data[0]
+            self.progress.record_item_owned(user_id, item_id)
             return UserItemResponse(**user_item, item=item)
         except Exception as e:
             raise ValueError(f"Error awarding item: {str(e)}")
@@ -163,9 +247,10 @@ class ItemService:
     async def get_user_items(self, user_id: UUID) -> list[UserItemResponse]:
         """Get all items owned by a user"""
         try:
-            response = (
+            # Embed the item in the same request instead of one lookup per row
+            response = await (
                 self.supabase.table("user_items")
-                .select("*")
+                .select("*, items(*)")
                 .eq("user_id", str(user_id))
                 .order("acquired_at", desc=True)
                 .execute()
@@ -173,11 +258,10 @@ class ItemService:
 
             result = []
             for user_item in response.data:
-                # Fetch the item details separately
-                item = await self.get_item(UUID(user_item["item_id"]))
-                if item:
+                item_details = user_item.pop("items", None)
+                if item_details:
                     result.append(
-                        UserItemResponse(**user_item, item=item)
+                        UserItemResponse(**user_item, item=ItemResponse(**item_details))
                     )
 
             return result
@@ -190,12 +274,12 @@ class ItemService:
         """Set an item as featured for a user"""
         try:
             # First, unfeatured all items for this user
-            self.supabase.table("user_items").update({"is_featured": False}).eq(
+            await self.supabase.table("user_items").update({"is_featured": False}).eq(
                 "user_id", str(user_id)
             ).execute()
 
             # Then feature the selected item
-            response = (
+            response = await (
                 self.supabase.table("user_items")
                 .update({"is_featured": True})
                 .eq("id", str(user_item_id))
@@ -221,26 +305,68 @@ class ItemService:
         self, user_id: UUID, item_id: UUID
     ) -> dict:
         """Purchase an item for a user"""
+        if self.purchase_rpc_enabled:
+            try:
+                return await self._purchase_item_atomic(user_id, item_id)
+            except MissingFunctionError:
+                pass  # Not installed yet: use the multi-query path below
+
         try:
             # 1. Check if item exists
             item = await self.get_item(item_id)
             if not item:
                 raise ValueError("Item not found")
 
-            # 2. Check if user already owns the item
-            user_items_response = (
-                self.supabase.table("user_items")
-                .select("id")
-                .eq("user_id", str(user_id))
-                .eq("item_id", str(item_id))
-                .execute()
-            )
-            
-            if user_items_response.data:
+            # 2. Check if user already owns the item (fresh, before any glory moves)
+            progress = await self.progress.get(self.supabase, user_id, refresh=True)
+            if str(item_id) in progress.owned_item_ids:
                 raise ValueError("You already own this item")
 
-            # 3. Get user's current glory
-            user_response = (
+            # 3. Deduct the price if the balance covers it (conditional update)
+            new_glory = await self._deduct_glory(user_id, item.price)
+
+            # 4. Award item to user
+            user_item = await self.award_item_to_user(user_id, item_id)
+            if user_item is None:
+                # Bought concurrently since the ownership check; give the price back
+                await self._refund_glory(user_id, item.price, new_glory)
+                raise ValueError("You already own this item")
+
+            # 5. Check and award achievements
+            awarded_achievements = []
+            try:
+                # Check for collection achievement
+                collection_achievement = await self.achievement_service.check_and_award_collection_achievement(
+                    user_id
+                )
+                if collection_achievement:
+                    awarded_achievements.append(collection_achievement)
+            except Exception as achievement_error:
+                # Log the error but don't fail the purchase
+                logger.warning(f"Failed to check achievements: {achievement_error}")
+
+            return {
+                "user_item": user_item,
+                "new_glory": new_glory,
+                "item_price": item.price,
+                "awarded_achievements": awarded_achievements
+            }
+        except Exception as e:
+            raise ValueError(f"Error purchasing item: {str(e)}")
+
+    async def _deduct_glory(self, user_id: UUID, price: int) -> int:
+        """
+        Deduct a price from a user's glory if the balance covers it
+
+        The update only applies while total_glory still has the value that was
+        checked, so concurrent purchases can't both spend the same glory. On a
+        concurrent change the balance is re-read and checked again.
+
+        Returns:
+            The new balance
+        """
+        for _ in range(GLORY_UPDATE_ATTEMPTS):
+            user_response = await (
                 self.supabase.table("users")
                 .select("total_glory")
                 .eq("id", str(user_id))
@@ -251,45 +377,92 @@ class ItemService:
                 raise ValueError("User not found")
 
             user_glory = user_response.data[0]["total_glory"]
+            if user_glory < price:
+                raise ValueError(
+                    f"Insufficient glory. You need {price} glory but only have {user_glory}"
+                )
 
-            # 4. Check if user has enough glory
-            if user_glory < item.price:
-                raise ValueError(f"Insufficient glory. You need {item.price} glory but only have {user_glory}")
+            update_response = await (
+                self.supabase.table("users")
+                .update({"total_glory": user_glory - price})
+                .eq("id", str(user_id))
+                .eq("total_glory", user_glory)
+                .execute()
+            )
+            if update_response.data:
+                return user_glory - price
+
+        raise ValueError("Glory changed during the purchase, please try again")
+
+    async def _refund_glory(self, user_id: UUID, amount: int, expected_glory: int) -> None:
+        """
+        Add glory back to a user without overwriting concurrent changes
+
+        Each attempt only applies while total_glory still has the value it was
+        computed from, and re-reads the balance when it doesn't.
+        """
+        for _ in range(GLORY_UPDATE_ATTEMPTS):
+            response = await (
+                self.supabase.table("users")
+                .update({"total_glory": expected_glory + amount})
+                .eq("id", str(user_id))
+                .eq("total_glory", expected_glory)
+                .execute()
+            )
+            if response.data:
+                return
 
-            # 5. Deduct glory from user
-            new_glory = user_glory - item.price
-            update_response = (
+            current = await (
                 self.supabase.table("users")
-                .update({"total_glory": new_glory})
+                .select("total_glory")
                 .eq("id", str(user_id))
                 .execute()
             )
+            if not current.data:
+                break
+            expected_glory = current.data[0]["total_glory"]
 
-            if not update_response.data:
-                raise ValueError("Failed to update user glory")
+        logger.error(f"Could not refund {amount} glory to user {user_id}")
 
-            # 6. Award item to user
-            user_item = await self.award_item_to_user(user_id, item_id)
+    async def _purchase_item_atomic(self, user_id: UUID, item_id: UUID) -> dict:
+        """
+        Purchase an item with one conditional database operation
 
-            # 7. Check and award achievements
-            awarded_achievements = []
-            try:
-                # Check for collection achievement
-                collection_achievement = await self.achievement_service.check_and_award_collection_achievement(
-                    user_id
-                )
-                if collection_achievement:
-                    awarded_achievements.append(collection_achievement)
-            except Exception as achievement_error:
-                # Log the error but don't fail the purchase
-                print(f"Warning: Failed to check achievements: {achievement_error}")
+        Runs the purchase_item function (database/purchase_item_transaction.sql):
+        glory is only deducted when the balance covers the price, ownership is
+        guarded by a unique constraint and the collection achievement is checked
+        in the same transaction.
+        """
+        try:
+            response = await self.supabase.rpc(
+                "purchase_item",
+                {"p_user_id": str(user_id), "p_item_id": str(item_id)},
+            ).execute()
 
+            result = response.data
+            self.progress.record_item_owned(user_id, item_id)
+            self.progress.record_achievements_unlocked(
+                user_id,
+                [achievement["id"] for achievement in result["awarded_achievements"]],
+            )
             return {
-                "user_item": user_item,
-                "new_glory": new_glory,
-                "item_price": item.price,
-                "awarded_achievements": awarded_achievements
+                "user_item": UserItemResponse(**result["user_item"]),
+                "new_glory": result["new_glory"],
+                "item_price": result["item_price"],
+                "awarded_achievements": [
+                    AchievementResponse(**achievement)
+                    for achievement in result["awarded_achievements"]
+                ],
             }
+        except APIError as e:
+            if is_missing_function(e):
+                # Nothing ran, so the caller can safely use the multi-query path
+                self._purchase_rpc_missing = True
+                logger.error(
+                    "purchase_item is not installed (apply "
+                    "database/purchase_item_transaction.sql); using the multi-query path"
+                )
+                raise MissingFunctionError("purchase_item")
+            raise ValueError(f"Error purchasing item: {e.message}")
         except Exception as e:
             raise ValueError(f"Error purchasing item: {str(e)}")
-
@@ -0,0 +1,159 @@
+"""
+In-process cache of per-user progress snapshots
+
+A snapshot holds the ids a user's actions are validated against (completed
+quests, active quests with deadlines, owned items, unlocked achievements), so
+starting, completing and abandoning quests or awarding items can be checked in
+memory. It's loaded in one embedded select and kept current by write-through
+from the services that change it. Entries expire after a TTL, which bounds
+staleness from writes made by other workers.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
+from uuid import UUID
+from weakref import WeakValueDictionary
+
+from postgrest import AsyncPostgrestClient
+
+from config.settings import settings
+from models.user import ActiveQuestProgress, UserProgress
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class ProgressCache:
+    """LRU cache of UserProgress snapshots keyed by user id"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_users: Optional[int] = None,
+    ):
+        """
+        Args:
+            ttl_seconds: Snapshot lifetime (default: settings)
+            max_users: Number of users kept before evicting the least recent (default: settings)
+        """
+        self.ttl_seconds = (
+            settings.PROGRESS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.max_users = (
+            settings.PROGRESS_CACHE_MAX_USERS if max_users is None else max_users
+        )
+        self._entries: "OrderedDict[str, Tuple[float, UserProgress]]" = OrderedDict()
+        self._locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+
+    async def get(
+        self, supabase: AsyncPostgrestClient, user_id: UUID, refresh: bool = False
+    ) -> UserProgress:
+        """Get a user's progress, loading it if missing, expired or refresh is set"""
+        key = str(user_id)
+        if settings.PROGRESS_CACHE_ENABLED and not refresh:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        progress = await self.load(supabase, user_id)
+        if settings.PROGRESS_CACHE_ENABLED:
+            self._entries[key] = (time.monotonic(), progress)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return progress
+
+    async def load(self, supabase: AsyncPostgrestClient, user_id: UUID) -> UserProgress:
+        """Load a user's progress from the database in one query"""
+        response = await (
+            supabase.table("users")
+            .select(
+                "id, user_completed_quests(id, quest_id, is_active, completed_at, deadline_at), "
+                "user_items(item_id), user_achievements(achievement_id)"
+            )
+            .eq("id", str(user_id))
+            .execute()
+        )
+
+        progress = UserProgress(user_id=user_id)
+        if not response.data:
+            return progress
+
+        row = response.data[0]
+        for user_quest in row.get("user_completed_quests") or []:
+            if user_quest.get("completed_at"):
+                progress.completed_quest_ids.add(str(user_quest["quest_id"]))
+            elif user_quest.get("is_active"):
+                progress.active_quests[str(user_quest["id"])] = ActiveQuestProgress(
+                    quest_id=str(user_quest["quest_id"]),
+                    deadline_at=_parse_timestamp(user_quest["deadline_at"]),
+                )
+        progress.owned_item_ids = {
+            str(user_item["item_id"]) for user_item in row.get("user_items") or []
+        }
+        progress.unlocked_achievement_ids = {
+            str(user_achievement["achievement_id"])
+            for user_achievement in row.get("user_achievements") or []
+        }
+        return progress
+
+    def lock(self, user_id: UUID) -> asyncio.Lock:
+        """Per-user lock for check-then-write sequences within this process"""
+        key = str(user_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def _cached(self, user_id: UUID) -> Optional[UserProgress]:
+        entry = self._entries.get(str(user_id))
+        return entry[1] if entry is not None else None
+
+    def record_quest_started(
+        self, user_id: UUID, user_quest_id: Any, quest_id: Any, deadline_at: Any
+    ) -> None:
+        """Write through a newly started quest"""
+        progress = self._cached(user_id)
+        if progress is not None:
+            progress.active_quests[str(user_quest_id)] = ActiveQuestProgress(
+                quest_id=str(quest_id), deadline_at=_parse_timestamp(deadline_at)
+            )
+
+    def record_quest_completed(self, user_id: UUID, user_quest_id: Any, quest_id: Any) -> None:
+        """Write through a completed quest"""
+        progress = self._cached(user_id)
+        if progress is not None:
+            progress.active_quests.pop(str(user_quest_id), None)
+            progress.completed_quest_ids.add(str(quest_id))
+
+    def record_quest_abandoned(self, user_id: UUID, user_quest_id: Any) -> None:
+        """Write through an abandoned quest"""
+        progress = self._cached(user_id)
+        if progress is not None:
+            progress.active_quests.pop(str(user_quest_id), None)
+
+    def record_item_owned(self, user_id: UUID, item_id: Any) -> None:
+        """Write through a newly owned item"""
+        progress = self._cached(user_id)
+        if progress is not None:
+            progress.owned_item_ids.add(str(item_id))
+
+    def record_achievements_unlocked(self, user_id: UUID, achievement_ids: Iterable[Any]) -> None:
+        """Write through newly unlocked achievements"""
+        progress = self._cached(user_id)
+        if progress is not None:
+            progress.unlocked_achievement_ids.update(str(a) for a in achievement_ids)
+
+    def invalidate(self, user_id: Optional[UUID] = None) -> None:
+        """Drop one user's snapshot, or every snapshot when no user is given"""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(user_id), None)
@@ -1,19 +1,130 @@
 """
 Quest Helper Service for ChatGPT-powered quest assistance
 """
-from typing import List
-from openai import OpenAI, OpenAIError
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional
+import anyio
+import httpx
 from config.settings import settings
 from models.quest import ChatMessage, QuestResponse
+from services.chat_answer_cache import ChatAnswerCache
+from services.chat_context import SystemPromptCache, budget_history
+from utils.metrics import CHAT_IN_FLIGHT, CHAT_QUEUED, CHAT_REJECTED, time_openai_call
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+class ChatCapacityError(Exception):
+    """Raised when no chat slot frees up before the queue deadline"""
+
+
+def _openai_error() -> type:
+    # Only evaluated once a call has failed, by which point openai is loaded
+    from openai import OpenAIError
+
+    return OpenAIError
 
 
 class QuestHelperService:
     """Service for providing quest assistance using ChatGPT"""
     
-    def __init__(self):
-        """Initialize the OpenAI client"""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        answers: Optional[ChatAnswerCache] = None,
+        prompts: Optional[SystemPromptCache] = None,
+    ):
+        """
+        Initialize the OpenAI client
+
+        One instance is shared for the app's lifetime (see
+        dependencies.create_services), so chats reuse pooled keep-alive connections.
+        """
+        timeout = httpx.Timeout(
+            settings.OPENAI_TIMEOUT_SECONDS,
+            connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS,
+        )
+        self.http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        self._timeout = timeout
+        self._client: Optional["AsyncOpenAI"] = None
         self.model = "gpt-4o-mini"  # Using cost-effective model
+        self.queue_timeout = (
+            settings.CHAT_QUEUE_TIMEOUT_SECONDS if queue_timeout is None else queue_timeout
+        )
+        self._slots = asyncio.Semaphore(
+            settings.CHAT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        )
+        self.answers = ChatAnswerCache() if answers is None else answers
+        self.prompts = SystemPromptCache() if prompts is None else prompts
+
+    async def open_connection(self) -> None:
+        """Open a pooled connection to the API so the first chat skips the TLS handshake"""
+        if not settings.OPENAI_API_KEY:
+            return
+        # Any response will do; the connection stays in the keep-alive pool
+        await self.http_client.head(settings.OPENAI_BASE_URL)
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """
+        OpenAI client, created on first use
+
+        Importing the openai package takes a few hundred milliseconds, so it
+        is left out of app startup.
+        """
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=self.http_client,
+                timeout=self._timeout,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+            )
+        return self._client
+
+    async def preload(self) -> None:
+        """Create the OpenAI client in a worker thread, keeping the import off the event loop"""
+        await asyncio.to_thread(lambda: self.client)
+
+    async def aclose(self) -> None:
+        """Close the pooled OpenAI connections"""
+        await self.http_client.aclose()
+
+    @asynccontextmanager
+    async def _chat_slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the limited OpenAI call slots
+
+        Raises:
+            ChatCapacityError: If no slot frees up within the queue timeout
+        """
+        CHAT_QUEUED.inc()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._slots.acquire()
+        except TimeoutError:
+            CHAT_REJECTED.inc()
+            raise ChatCapacityError("Quest chat is busy, please try again shortly")
+        finally:
+            CHAT_QUEUED.dec()
+
+        CHAT_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            CHAT_IN_FLIGHT.dec()
+            self._slots.release()
     
     def _build_system_prompt(self, quest: QuestResponse) -> str:
         """
@@ -63,11 +174,26 @@ STRICT RULES YOU MUST FOLLOW:
 
 Remember: Your ONLY job is to help with {quest.topic}. Be strict about this restriction."""
 
+    def _build_messages(
+        self,
+        quest: QuestResponse,
+        user_message: str,
+        chat_history: List[ChatMessage],
+        quest_version: Optional[str],
+    ) -> List[dict]:
+        """
+        Build the messages array: system prompt (cached per quest), chat history
+        trimmed to the token budget, then the new message
+        """
+        system_prompt = self.prompts.get(quest, self._build_system_prompt, quest_version)
+        return budget_history(system_prompt, chat_history, user_message)
+
     async def get_chat_response(
         self,
         quest: QuestResponse,
         user_message: str,
-        chat_history: List[ChatMessage]
+        chat_history: List[ChatMessage],
+        quest_version: Optional[str] = None,
     ) -> str:
         """
         Get a chat response from ChatGPT based on quest context
@@ -76,50 +202,108 @@ Remember: Your ONLY job is to help with {quest.topic}. Be strict about this rest
             quest: The quest object for context
             user_message: The user's message
             chat_history: Previous chat messages
+            quest_version: Quest catalog version, for the system prompt cache
             
         Returns:
             AI assistant's response
             
         Raises:
+            ChatCapacityError: If too many chats are already in progress
             Exception: If OpenAI API call fails
         """
+        # Common opening questions are answered from the cache
+        cache_key = self.answers.key(quest.id, user_message, chat_history)
+        if cache_key is not None:
+            cached = self.answers.get(cache_key)
+            if cached is not None:
+                return cached
+
+        messages = self._build_messages(quest, user_message, chat_history, quest_version)
         try:
-            # Build system prompt with quest context
-            system_prompt = self._build_system_prompt(quest)
-            
-            # Build messages array
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Add chat history
-            for msg in chat_history:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
             # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=500,  # Keep responses concise
-                temperature=0.7,  # Balanced creativity
-            )
+            async with self._chat_slot():
+                with time_openai_call(self.model):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=500,  # Keep responses concise
+                        temperature=0.7,  # Balanced creativity
+                    )
             
             # Extract response
             assistant_message = response.choices[0].message.content
+            if assistant_message and cache_key is not None:
+                self.answers.put(cache_key, assistant_message)
             
             return assistant_message or "I apologize, but I couldn't generate a response. Please try asking your question again."
             
-        except OpenAIError as e:
+        except ChatCapacityError:
+            raise
+        except _openai_error() as e:
             raise Exception(f"OpenAI API error: {str(e)}")
         except Exception as e:
             raise Exception(f"Failed to get chat response: {str(e)}")
 
+
+    async def stream_chat_response(
+        self,
+        quest: QuestResponse,
+        user_message: str,
+        chat_history: List[ChatMessage],
+        quest_version: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat response from ChatGPT as it is generated
+
+        Args:
+            quest: The quest object for context
+            user_message: The user's message
+            chat_history: Previous chat messages
+            quest_version: Quest catalog version, for the system prompt cache
+
+        Yields:
+            Pieces of the assistant's response, in order
+
+        Raises:
+            ChatCapacityError: If too many chats are already in progress
+            Exception: If OpenAI API call fails
+
+        Closing the generator early (e.g. the client disconnected) closes the
+        upstream response, so OpenAI stops generating. The chat slot is held
+        until the stream ends. A cached answer is yielded in one piece.
+        """
+        cache_key = self.answers.key(quest.id, user_message, chat_history)
+        if cache_key is not None:
+            cached = self.answers.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        messages = self._build_messages(quest, user_message, chat_history, quest_version)
+        parts: List[str] = []
+        try:
+            async with self._chat_slot():
+                with time_openai_call(self.model):
+                    stream = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=500,
+                        temperature=0.7,
+                        stream=True,
+                    )
+                    try:
+                        async for chunk in stream:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                parts.append(chunk.choices[0].delta.content)
+                                yield parts[-1]
+                    finally:
+                        # Shielded so a cancelled request still releases the connection
+                        with anyio.CancelScope(shield=True):
+                            await stream.close()
+        except _openai_error() as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+
+        # Only complete answers are cached
+        if parts and cache_key is not None:
+            self.answers.put(cache_key, "".join(parts))
+
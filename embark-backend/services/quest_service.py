@@ -1,7 +1,10 @@
+import asyncio
+import logging
+import time
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timedelta, timezone
-from supabase import Client
+from postgrest import APIError, AsyncPostgrestClient
 from models.quest import (
     QuestCreate,
     QuestUpdate,
@@ -10,16 +13,66 @@ from models.quest import (
     UserQuestResponse,
     ActiveQuestResponse,
     CompletedQuestResponse,
+    QuestCompletionResponse,
 )
 from services.achievement_service import AchievementService
+from config.settings import settings
+from database.supabase_client import MissingFunctionError, is_missing_function
+from services.catalog_cache import CatalogCache, create_quest_catalog
+from services.chat_answer_cache import ChatAnswerCache
+from services.chat_context import SystemPromptCache
+from services.progress_cache import ProgressCache
+from utils.batch import unique_ids
+from utils.pagination import apply_keyset, keyset_slice
+
+logger = logging.getLogger(__name__)
+
+# Quest history order (utils.pagination appends id as tie-breaker)
+HISTORY_ORDER = [("completed_at", True)]
 
 
 class QuestService:
     """Service for quest-related operations"""
 
-    def __init__(self, supabase: Client):
+    def __init__(
+        self,
+        supabase: AsyncPostgrestClient,
+        catalog: Optional[CatalogCache[QuestResponse]] = None,
+        progress: Optional[ProgressCache] = None,
+        achievement_service: Optional[AchievementService] = None,
+        answers: Optional[ChatAnswerCache] = None,
+        prompts: Optional[SystemPromptCache] = None,
+    ):
+        """
+        Args:
+            answers: Chat answer cache to invalidate when a quest changes
+            prompts: System prompt cache to invalidate when a quest changes
+        """
         self.supabase = supabase
-        self.achievement_service = AchievementService()
+        self.catalog = create_quest_catalog() if catalog is None else catalog
+        self.progress = ProgressCache() if progress is None else progress
+        self.achievement_service = achievement_service or AchievementService(
+            supabase, progress=self.progress, quest_catalog=self.catalog
+        )
+        self.answers = answers
+        self.prompts = prompts
+        self._completion_rpc_missing = False
+
+    @property
+    def completion_rpc_enabled(self) -> bool:
+        """Whether completions use the complete_user_quest database function"""
+        return settings.QUEST_COMPLETION_USE_RPC and not self._completion_rpc_missing
+
+    def _invalidate_quest(self, quest_id: UUID) -> None:
+        """Drop everything cached from a quest's definition"""
+        self.catalog.invalidate()
+        for cache in (self.answers, self.prompts):
+            if cache is not None:
+                cache.invalidate(quest_id)
+
+    async def catalog_version(self) -> Optional[str]:
+        """Version of the cached quest catalog (None when it isn't cached)"""
+        return await self.catalog.version(self.supabase)
 
     async def create_quest(self, quest_data: QuestCreate) -> QuestResponse:
         """Create a new quest"""
@@ -28,11 +81,12 @@ class QuestService:
             if insert_data.get("reward_item_id"):
                 insert_data["reward_item_id"] = str(insert_data["reward_item_id"])
 
-            response = self.supabase.table("quests").insert(insert_data).execute()
+            response = await self.supabase.table("quests").insert(insert_data).execute()
 
             if not response.data:
                 raise ValueError("Failed to create quest")
 
+            self.catalog.invalidate()
             return QuestResponse(**response.data[0])
         except Exception as e:
             raise ValueError(f"Error creating quest: {str(e)}")
@@ -40,7 +94,13 @@ class QuestService:
     async def get_quest(self, quest_id: UUID) -> Optional[QuestResponse]:
         """Get a quest by ID"""
         try:
-            response = (
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                quest = catalog.get(quest_id)
+                if quest:
+                    return quest
+
+            response = await (
                 self.supabase.table("quests")
                 .select("*")
                 .eq("id", str(quest_id))
@@ -54,28 +114,71 @@ class QuestService:
         except Exception as e:
             raise ValueError(f"Error fetching quest: {str(e)}")
 
+    async def get_quests_by_ids(self, quest_ids: List[UUID]) -> list[QuestResponse]:
+        """Get several quests in one query, in the order of the given IDs"""
+        try:
+            ids = unique_ids(quest_ids)
+            if not ids:
+                return []
+
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                cached = [catalog.get(quest_id) for quest_id in ids]
+                if all(cached):
+                    return cached
+
+            response = await (
+                self.supabase.table("quests")
+                .select("*")
+                .in_("id", ids)
+                .execute()
+            )
+
+            quests_by_id = {quest["id"]: quest for quest in response.data}
+            return [
+                QuestResponse(**quests_by_id[quest_id])
+                for quest_id in ids
+                if quest_id in quests_by_id
+            ]
+        except Exception as e:
+            raise ValueError(f"Error fetching quests: {str(e)}")
+
     async def list_quests(
-        self, tier: Optional[int] = None, limit: int = 500, offset: int = 0
+        self,
+        tier: Optional[int] = None,
+        limit: int = 500,
+        offset: int = 0,
+        cursor: Optional[str] = None,
     ) -> list[QuestResponse]:
-        """List quests with optional tier filter"""
+        """List quests with optional tier filter
+
+        Pages by cursor (see utils.pagination) when one is given, otherwise by offset.
+        """
         try:
             # Validate limit to prevent excessive queries
             if limit > 500:
                 limit = 500
             if limit < 1:
                 limit = 1
-                
+
+            catalog = await self.catalog.snapshot(self.supabase)
+            if catalog is not None:
+                quests = catalog.lookup("tier", tier) if tier else catalog.rows
+                if cursor:
+                    return keyset_slice(quests, self.catalog.order, cursor, limit)
+                return quests[offset:offset + limit]
+
             query = self.supabase.table("quests").select("*")
 
             if tier:
                 query = query.eq("tier", tier)
 
-            response = (
-                query.order("tier", desc=False)
-                .order("created_at", desc=True)
-                .range(offset, offset + limit - 1)
-                .execute()
-            )
+            query = apply_keyset(query, self.catalog.order, cursor)
+            if cursor:
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            response = await query.execute()
 
             return [QuestResponse(**quest) for quest in response.data]
         except Exception as e:
@@ -92,7 +195,7 @@ class QuestService:
             if "reward_item_id" in update_data and update_data["reward_item_id"]:
                 update_data["reward_item_id"] = str(update_data["reward_item_id"])
 
-            response = (
+            response = await (
                 self.supabase.table("quests")
                 .update(update_data)
                 .eq("id", str(quest_id))
@@ -102,6 +205,7 @@ class QuestService:
             if not response.data:
                 raise ValueError("Quest not found")
 
+            self._invalidate_quest(quest_id)
             return QuestResponse(**response.data[0])
         except Exception as e:
             raise ValueError(f"Error updating quest: {str(e)}")
@@ -109,10 +213,11 @@ class QuestService:
     async def delete_quest(self, quest_id: UUID) -> bool:
         """Delete a quest"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("quests").delete().eq("id", str(quest_id)).execute()
             )
 
+            self._invalidate_quest(quest_id)
             return len(response.data) > 0
         except Exception as e:
             raise ValueError(f"Error deleting quest: {str(e)}")
@@ -120,61 +225,60 @@ class QuestService:
     async def start_quest(self, user_id: UUID, quest_data: UserQuestCreate) -> UserQuestResponse:
         """Start a quest for a user"""
         try:
-            # Check if user has already completed this quest (quests are one-time only)
-            quest_history = (
-                self.supabase.table("user_completed_quests")
-                .select("id, completed_at")
-                .eq("user_id", str(user_id))
-                .eq("quest_id", str(quest_data.quest_id))
-                .execute()
-            )
-            
-            if quest_history.data:
-                # Check if any record has a completed_at timestamp
-                for record in quest_history.data:
-                    if record.get("completed_at"):
-                        raise ValueError("This quest has already been completed and cannot be repeated")
-            
-            # Check if user already has 4 active quests (maximum)
-            active_quests = await self.get_active_quests(user_id)
-            if len(active_quests) >= 4:
-                raise ValueError("User already has maximum number of active quests (4)")
-
-            # Get quest to determine time limit
-            quest = await self.get_quest(quest_data.quest_id)
-            if not quest:
-                raise ValueError("Quest not found")
-
-            # Calculate deadline (extended: 5x original quest time limit)
-            started_at = datetime.now(timezone.utc)
-            deadline_at = started_at + timedelta(hours=quest.time_limit_hours * 5)
-
-            # Create user quest entry
-            insert_data = {
-                "user_id": str(user_id),
-                "quest_id": str(quest_data.quest_id),
-                "started_at": started_at.isoformat(),
-                "deadline_at": deadline_at.isoformat(),
-                "is_active": True,
-            }
-
-            response = (
-                self.supabase.table("user_completed_quests").insert(insert_data).execute()
-            )
+            # Validate against a freshly loaded snapshot (one query): the cached
+            # one may be stale after writes by other workers. The lock keeps two
+            # concurrent starts in this process from both passing the limit
+            async with self.progress.lock(user_id):
+                progress = await self.progress.get(self.supabase, user_id, refresh=True)
+
+                # Quests are one-time only
+                if str(quest_data.quest_id) in progress.completed_quest_ids:
+                    raise ValueError("This quest has already been completed and cannot be repeated")
+
+                # Check if user already has 4 active quests (maximum)
+                if len(progress.active_quests) >= 4:
+                    raise ValueError("User already has maximum number of active quests (4)")
+
+                # Get quest to determine time limit
+                quest = await self.get_quest(quest_data.quest_id)
+                if not quest:
+                    raise ValueError("Quest not found")
+
+                # Calculate deadline (extended: 5x original quest time limit)
+                started_at = datetime.now(timezone.utc)
+                deadline_at = started_at + timedelta(hours=quest.time_limit_hours * 5)
+
+                # Create user quest entry
+                insert_data = {
+                    "user_id": str(user_id),
+                    "quest_id": str(quest_data.quest_id),
+                    "started_at": started_at.isoformat(),
+                    "deadline_at": deadline_at.isoformat(),
+                    "is_active": True,
+                }
+
+                response = await (
+                    self.supabase.table("user_completed_quests").insert(insert_data).execute()
+                )
 
-            if not response.data:
-                raise ValueError("Failed to start quest")
+                if not response.data:
+                    raise ValueError("Failed to start quest")
 
-            return UserQuestResponse(**response.data[0])
+                user_quest = UserQuestResponse(**response.data[0])
+                self.progress.record_quest_started(
+                    user_id, user_quest.id, user_quest.quest_id, user_quest.deadline_at
+                )
+                return user_quest
         except Exception as e:
             raise ValueError(f"Error starting quest: {str(e)}")
 
     async def get_active_quests(self, user_id: UUID) -> list[ActiveQuestResponse]:
         """Get user's active quests with full quest details"""
         try:
-            response = (
+            # Embed the quest in the same request instead of one lookup per row
+            response = await (
                 self.supabase.table("user_completed_quests")
-                .select("*")
+                .select("*, quests(*)")
                 .eq("user_id", str(user_id))
                 .eq("is_active", True)
                 .execute()
@@ -185,10 +289,9 @@ class QuestService:
 
             active_quests = []
             for user_quest in response.data:
-                # Fetch quest details separately
-                quest = await self.get_quest(UUID(user_quest["quest_id"]))
-                
-                if quest:
+                quest_details = user_quest.pop("quests", None)
+                if quest_details:
+                    quest = QuestResponse(**quest_details)
                     active_quests.append(ActiveQuestResponse(**user_quest, quest=quest))
 
             return active_quests
@@ -203,13 +306,25 @@ class QuestService:
         except Exception as e:
             raise ValueError(f"Error fetching active quest: {str(e)}")
 
-    async def complete_quest(self, user_id: UUID, user_quest_id: UUID) -> CompletedQuestResponse:
-        """Complete a specific user quest and return full details including quest data"""
+    async def get_active_user_quest(
+        self, user_id: UUID, user_quest_id: UUID
+    ) -> Optional[ActiveQuestResponse]:
+        """
+        Get one of the user's active quests with full quest details
+
+        Checked against the progress snapshot like completing and abandoning,
+        then loaded with its quest in one request. Returns None if the quest
+        isn't active or doesn't belong to the user.
+        """
         try:
-            # Get the specific user quest to verify it exists and is active
-            response = (
+            try:
+                await self._get_active_user_quest(user_id, user_quest_id)
+            except ValueError:
+                return None
+
+            response = await (
                 self.supabase.table("user_completed_quests")
-                .select("*")
+                .select("*, quests(*)")
                 .eq("id", str(user_quest_id))
                 .eq("user_id", str(user_id))
                 .eq("is_active", True)
@@ -217,60 +332,66 @@ class QuestService:
             )
 
             if not response.data:
-                raise ValueError("Active quest not found or does not belong to user")
+                # Finished through another worker since the snapshot was loaded
+                self.progress.invalidate(user_id)
+                return None
 
             user_quest = response.data[0]
+            quest_details = user_quest.pop("quests", None)
+            if not quest_details:
+                return None
+            return ActiveQuestResponse(**user_quest, quest=QuestResponse(**quest_details))
+        except Exception as e:
+            raise ValueError(f"Error fetching active quest: {str(e)}")
+
+    async def _get_active_user_quest(self, user_id: UUID, user_quest_id: UUID):
+        """Find an active quest in the user's progress, reloading once on a miss"""
+        progress = await self.progress.get(self.supabase, user_id)
+        active_quest = progress.active_quests.get(str(user_quest_id))
+        if active_quest is None:
+            # The quest may have been started through another worker
+            progress = await self.progress.get(self.supabase, user_id, refresh=True)
+            active_quest = progress.active_quests.get(str(user_quest_id))
+        if active_quest is None:
+            raise ValueError("Active quest not found or does not belong to user")
+        return active_quest
+
+    async def complete_quest(self, user_id: UUID, user_quest_id: UUID) -> CompletedQuestResponse:
+        """Complete a specific user quest and return full details including quest data"""
+        try:
+            # Verify the user quest exists and is active
+            active_quest = await self._get_active_user_quest(user_id, user_quest_id)
 
             # Get quest details before completing
-            quest = await self.get_quest(UUID(user_quest["quest_id"]))
+            quest = await self.get_quest(UUID(active_quest.quest_id))
             if not quest:
                 raise ValueError("Quest not found")
 
             # Check if deadline has passed
-            deadline = datetime.fromisoformat(user_quest["deadline_at"].replace('Z', '+00:00'))
-            if datetime.now(timezone.utc) > deadline:
+            if datetime.now(timezone.utc) > active_quest.deadline_at:
                 raise ValueError("Quest deadline has passed")
 
-            # Mark quest as completed
+            # Mark quest as completed (only if it is still active)
             completed_at = datetime.now(timezone.utc)
-            update_response = (
+            update_response = await (
                 self.supabase.table("user_completed_quests")
                 .update(
                     {"is_active": False, "completed_at": completed_at.isoformat()}
                 )
                 .eq("id", str(user_quest_id))
+                .eq("user_id", str(user_id))
+                .eq("is_active", True)
                 .execute()
             )
 
             if not update_response.data:
-                raise ValueError("Failed to complete quest")
+                self.progress.invalidate(user_id)
+                raise ValueError("Active quest not found or does not belong to user")
 
-            # Check and award achievements
-            awarded_achievements = []
-            try:
-                # Award quest-specific achievement (instant)
-                quest_achievement = await self.achievement_service.check_and_award_quest_achievement(
-                    user_id, quest.id
-                )
-                if quest_achievement:
-                    awarded_achievements.append(quest_achievement)
-                
-                # Award tier achievement (only if ALL quests in tier are complete)
-                tier_achievement = await self.achievement_service.check_and_award_tier_achievement(
-                    user_id, quest.tier
-                )
-                if tier_achievement:
-                    awarded_achievements.append(tier_achievement)
-                
-                # Check for questline achievement (only if ALL quests in topic are complete)
-                questline_achievement = await self.achievement_service.check_and_award_questline_achievement(
-                    user_id, quest.topic
-                )
-                if questline_achievement:
-                    awarded_achievements.append(questline_achievement)
-            except Exception as achievement_error:
-                # Log the error but don't fail the quest completion
-                print(f"Error awarding achievements: {str(achievement_error)}")
+            self.progress.record_quest_completed(user_id, user_quest_id, quest.id)
+
+            # Check and award achievements (quest-specific, whole tier, whole questline)
+            awarded_achievements = await self._check_quest_achievements(user_id, quest)
 
             # Return full quest details for reward processing along with achievements
             completed_quest_response = CompletedQuestResponse(**update_response.data[0], quest=quest)
@@ -279,45 +400,172 @@ class QuestService:
         except Exception as e:
             raise ValueError(f"Error completing quest: {str(e)}")
 
+    async def _check_quest_achievements(
+        self, user_id: UUID, quest: QuestResponse
+    ) -> list:
+        """
+        Run the independent achievement checks for a completed quest concurrently
+
+        Each check is isolated: a failure is logged and skipped without affecting
+        the others or the quest completion. At most ACHIEVEMENT_CHECK_CONCURRENCY
+        checks run at once.
+        """
+        # One fresh progress load shared by all checks; eligibility is decided in
+        # memory, counting quests completed through other workers
+        progress = await self.achievement_service.get_user_progress(user_id, refresh=True)
+        achievements = self.achievement_service
+        checks = [
+            # Award quest-specific achievement (instant)
+            ("quest", achievements.check_and_award_quest_achievement, quest.id),
+            # Award tier achievement (only if ALL quests in tier are complete)
+            ("tier", achievements.check_and_award_tier_achievement, quest.tier),
+            # Award questline achievement (only if ALL quests in topic are complete)
+            ("questline", achievements.check_and_award_questline_achievement, quest.topic),
+        ]
+        semaphore = asyncio.Semaphore(max(1, settings.ACHIEVEMENT_CHECK_CONCURRENCY))
+
+        async def run_check(name, check, arg):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await check(user_id, arg, progress)
+                except Exception as e:
+                    logger.error(f"Error awarding {name} achievement for user {user_id}: {str(e)}")
+                    return None
+                finally:
+                    logger.debug(
+                        f"{name} achievement check took "
+                        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+                    )
+
+        results = await asyncio.gather(*(run_check(*check) for check in checks))
+        return [achievement for achievement in results if achievement]
+
+    async def complete_quest_with_rewards(
+        self, user_id: UUID, user_quest_id: UUID
+    ) -> Optional[QuestCompletionResponse]:
+        """
+        Complete a user quest and grant all of its rewards in one database transaction
+
+        Runs the complete_user_quest function (database/complete_quest_transaction.sql),
+        which validates the deadline, applies glory/XP/level, awards an unowned item
+        from the quest's tier and runs the achievement checks atomically.
+
+        Returns:
+            The completion result, or None if the user does not exist
+
+        Raises:
+            MissingFunctionError: If the function isn't installed (nothing was changed)
+        """
+        try:
+            response = await self.supabase.rpc(
+                "complete_user_quest",
+                {"p_user_id": str(user_id), "p_user_quest_id": str(user_quest_id)},
+            ).execute()
+
+            result = QuestCompletionResponse(**response.data)
+            self.progress.record_quest_completed(
+                user_id, user_quest_id, result.user_quest.quest_id
+            )
+            if result.awarded_item:
+                self.progress.record_item_owned(user_id, result.awarded_item.item_id)
+            self.progress.record_achievements_unlocked(
+                user_id, [achievement.id for achievement in result.awarded_achievements]
+            )
+            return result
+        except APIError as e:
+            # no_data_found is raised when the user doesn't exist
+            if e.code == "P0002":
+                return None
+            if is_missing_function(e):
+                # Nothing ran, so the caller can safely use the multi-query path
+                self._completion_rpc_missing = True
+                logger.error(
+                    "complete_user_quest is not installed (apply "
+                    "database/complete_quest_transaction.sql); using the multi-query path"
+                )
+                raise MissingFunctionError("complete_user_quest")
+            raise ValueError(f"Error completing quest: {e.message}")
+        except Exception as e:
+            raise ValueError(f"Error completing quest: {str(e)}")
+
     async def abandon_quest(self, user_id: UUID, user_quest_id: UUID) -> bool:
         """Abandon a specific user quest"""
         try:
             # Verify the quest exists, belongs to user, and is active
-            response = (
+            await self._get_active_user_quest(user_id, user_quest_id)
+
+            # Delete the quest entry
+            delete_response = await (
                 self.supabase.table("user_completed_quests")
-                .select("*")
+                .delete()
                 .eq("id", str(user_quest_id))
                 .eq("user_id", str(user_id))
                 .eq("is_active", True)
                 .execute()
             )
 
-            if not response.data:
-                raise ValueError("Active quest not found or does not belong to user")
+            if not delete_response.data:
+                # Completed or abandoned elsewhere since the snapshot was taken
+                self.progress.invalidate(user_id)
+                return False
 
-            # Delete the quest entry
-            delete_response = (
+            self.progress.record_quest_abandoned(user_id, user_quest_id)
+            return True
+        except Exception as e:
+            raise ValueError(f"Error abandoning quest: {str(e)}")
+
+    async def abandon_quests(self, user_id: UUID, user_quest_ids: List[UUID]) -> list[str]:
+        """
+        Abandon several of a user's active quests in one query
+
+        Args:
+            user_id: UUID of the user
+            user_quest_ids: user_completed_quests entries to abandon
+
+        Returns:
+            IDs of the entries that were abandoned; the others weren't active
+            quests of this user
+        """
+        try:
+            ids = unique_ids(user_quest_ids)
+            if not ids:
+                return []
+
+            # The filters enforce ownership and activeness, so no lookup is needed first
+            delete_response = await (
                 self.supabase.table("user_completed_quests")
                 .delete()
-                .eq("id", str(user_quest_id))
+                .in_("id", ids)
+                .eq("user_id", str(user_id))
+                .eq("is_active", True)
                 .execute()
             )
 
-            return len(delete_response.data) > 0
+            abandoned = [str(row["id"]) for row in delete_response.data]
+            if len(abandoned) < len(ids):
+                # Some may have been completed or abandoned elsewhere
+                self.progress.invalidate(user_id)
+            else:
+                for user_quest_id in abandoned:
+                    self.progress.record_quest_abandoned(user_id, user_quest_id)
+            return abandoned
         except Exception as e:
-            raise ValueError(f"Error abandoning quest: {str(e)}")
+            raise ValueError(f"Error abandoning quests: {str(e)}")
 
     async def get_user_quest_history(
-        self, user_id: UUID, limit: int = 50
+        self, user_id: UUID, limit: int = 50, cursor: Optional[str] = None
     ) -> list[CompletedQuestResponse]:
         """Get user's completed quest history with full quest details"""
         try:
-            response = (
+            query = (
                 self.supabase.table("user_completed_quests")
                 .select("*, quests(*)")
                 .eq("user_id", str(user_id))
                 .eq("is_active", False)
-                .order("completed_at", desc=True)
+            )
+            response = await (
+                apply_keyset(query, HISTORY_ORDER, cursor)
                 .limit(limit)
                 .execute()
             )
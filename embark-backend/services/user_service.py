@@ -1,20 +1,25 @@
 from uuid import UUID
-from typing import Optional
-from supabase import Client
+from typing import List, Optional
+from postgrest import AsyncPostgrestClient
 from models.user import UserCreate, UserUpdate, UserResponse, UserStatsUpdate
 from utils.level_calculator import calculate_level
+from utils.batch import unique_ids
+from utils.pagination import apply_keyset
+
+# User list order (utils.pagination appends id as tie-breaker)
+USER_ORDER = [("created_at", True)]
 
 
 class UserService:
     """Service for user-related operations"""
 
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: AsyncPostgrestClient):
         self.supabase = supabase
 
     async def create_user(self, user_data: UserCreate) -> UserResponse:
         """Create a new user"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .insert({
                     "username": user_data.username,
@@ -33,7 +38,7 @@ class UserService:
     async def get_user(self, user_id: UUID) -> Optional[UserResponse]:
         """Get a user by ID"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .select("*")
                 .eq("id", str(user_id))
@@ -47,10 +52,33 @@ class UserService:
         except Exception as e:
             raise ValueError(f"Error fetching user: {str(e)}")
 
+    async def get_users_by_ids(self, user_ids: List[UUID]) -> list[UserResponse]:
+        """Get several users in one query, in the order of the given IDs"""
+        try:
+            ids = unique_ids(user_ids)
+            if not ids:
+                return []
+
+            response = await (
+                self.supabase.table("users")
+                .select("*")
+                .in_("id", ids)
+                .execute()
+            )
+
+            users_by_id = {user["id"]: user for user in response.data}
+            return [
+                UserResponse(**users_by_id[user_id])
+                for user_id in ids
+                if user_id in users_by_id
+            ]
+        except Exception as e:
+            raise ValueError(f"Error fetching users: {str(e)}")
+
     async def get_user_by_username(self, username: str) -> Optional[UserResponse]:
         """Get a user by username"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .select("*")
                 .eq("username", username)
@@ -67,7 +95,7 @@ class UserService:
     async def get_user_by_email(self, email: str) -> Optional[UserResponse]:
         """Get a user by email"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .select("*")
                 .eq("email", email)
@@ -81,16 +109,19 @@ class UserService:
         except Exception as e:
             raise ValueError(f"Error fetching user: {str(e)}")
 
-    async def list_users(self, limit: int = 100, offset: int = 0) -> list[UserResponse]:
-        """List all users with pagination"""
+    async def list_users(
+        self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None
+    ) -> list[UserResponse]:
+        """List all users with pagination (by cursor when given, otherwise by offset)"""
         try:
-            response = (
-                self.supabase.table("users")
-                .select("*")
-                .order("created_at", desc=True)
-                .range(offset, offset + limit - 1)
-                .execute()
+            query = apply_keyset(
+                self.supabase.table("users").select("*"), USER_ORDER, cursor
             )
+            if cursor:
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            response = await query.execute()
 
             return [UserResponse(**user) for user in response.data]
         except Exception as e:
@@ -105,7 +136,7 @@ class UserService:
             if not update_data:
                 raise ValueError("No data to update")
 
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .update(update_data)
                 .eq("id", str(user_id))
@@ -150,7 +181,7 @@ class UserService:
                 update_data["lifetime_glory_gained"] = current_lifetime + stats_update.glory_delta
 
             # Update user
-            response = (
+            response = await (
                 self.supabase.table("users")
                 .update(update_data)
                 .eq("id", str(user_id))
@@ -167,7 +198,7 @@ class UserService:
     async def delete_user(self, user_id: UUID) -> bool:
         """Delete a user"""
         try:
-            response = (
+            response = await (
                 self.supabase.table("users").delete().eq("id", str(user_id)).execute()
             )
 
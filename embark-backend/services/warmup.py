@@ -0,0 +1,118 @@
+"""
+Startup warm-up, run by the app lifespan before it accepts traffic
+
+Without it the first requests after a restart pay for TLS handshakes to
+Supabase and OpenAI, catalog loads and serializer construction. Each phase
+is timed and logged; a failing phase is logged and skipped, since every
+step here would otherwise happen lazily on first use anyway.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+import models.achievement
+import models.item
+import models.quest
+import models.user
+from config.settings import settings
+from services.catalog_cache import CatalogSnapshot
+from utils.metrics import STARTUP_WARMUP_DURATION
+
+if TYPE_CHECKING:
+    from dependencies import AppServices
+
+logger = logging.getLogger(__name__)
+
+MODEL_MODULES = (models.achievement, models.item, models.quest, models.user)
+
+
+async def _open_connections(services: "AppServices") -> None:
+    # One round trip opens the pooled HTTP/2 connection (TLS included);
+    # concurrent requests are multiplexed over it
+    results = await asyncio.gather(
+        services.db.table("users").select("count", count="exact").limit(0).execute(),
+        services.quest_helper.open_connection(),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+async def _load_catalogs(services: "AppServices") -> None:
+    db = services.db
+    await asyncio.gather(
+        services.quest_catalog.snapshot(db),
+        services.item_catalog.snapshot(db),
+        services.achievement_catalog.snapshot(db),
+    )
+    # Built from the two catalogs above, so this is a cache fill, not a query
+    await services.achievement_service.get_rules(db)
+
+
+def _pydantic_models() -> List[type]:
+    found = []
+    for module in MODEL_MODULES:
+        for _, obj in inspect.getmembers(module, inspect.isclass):
+            if issubclass(obj, BaseModel) and obj.__module__ == module.__name__:
+                found.append(obj)
+    return found
+
+
+async def _build_serializers(services: "AppServices") -> None:
+    for model in _pydantic_models():
+        if not model.__pydantic_complete__:
+            model.model_rebuild()
+
+    db = services.db
+    for catalog in (services.quest_catalog, services.item_catalog, services.achievement_catalog):
+        snapshot: Optional[CatalogSnapshot] = await catalog.snapshot(db)
+        if snapshot is None or not snapshot.rows:
+            continue
+        # Round-trip one row so validation and both serialization paths have run
+        row = snapshot.rows[0]
+        catalog.model.model_validate(row.model_dump(mode="json"))
+        services.catalog_responses.prime(catalog.model, [row])
+
+
+PHASES: List[tuple[str, Callable[["AppServices"], Awaitable[None]]]] = [
+    ("connections", _open_connections),
+    ("catalogs", _load_catalogs),
+    ("serializers", _build_serializers),
+]
+
+
+async def warm_up(services: "AppServices") -> Dict[str, float]:
+    """
+    Run every warm-up phase in order
+
+    Args:
+        services: Services built for the app lifespan
+
+    Returns:
+        Seconds spent per phase (and in total)
+    """
+    timings: Dict[str, float] = {}
+    if not settings.STARTUP_WARMUP_ENABLED:
+        return timings
+
+    start = time.perf_counter()
+    for name, phase in PHASES:
+        phase_start = time.perf_counter()
+        try:
+            async with asyncio.timeout(settings.STARTUP_WARMUP_TIMEOUT_SECONDS):
+                await phase(services)
+        except Exception as e:
+            logger.warning(f"Warm-up phase {name} failed, continuing: {e!r}")
+        elapsed = time.perf_counter() - phase_start
+        timings[name] = elapsed
+        STARTUP_WARMUP_DURATION.labels(name).set(elapsed)
+        logger.info(f"Warm-up phase {name} took {elapsed * 1000:.1f}ms")
+
+    timings["total"] = time.perf_counter() - start
+    logger.info(f"Warm-up finished in {timings['total'] * 1000:.1f}ms")
+    return timings
@@ -0,0 +1,10 @@
+import pytest
+
+from database.memory_client import MemorySupabaseClient
+
+
+@pytest.fixture
+def db() -> MemorySupabaseClient:
+    """An empty in-memory database"""
+    return MemorySupabaseClient()
+
@@ -0,0 +1,60 @@
+"""Rows for seeding the in-memory database in tests"""
+from datetime import datetime, timedelta, timezone
+
+from database.memory_client import MemorySupabaseClient
+
+
+def seed_quest(db: MemorySupabaseClient, **fields) -> dict:
+    row = {
+        "title": "Slay the dragon",
+        "description": "A quest",
+        "topic": "fitness",
+        "tier": 1,
+        "glory_reward": 100,
+        "xp_reward": 50,
+        "enemy_name": "Dragon",
+        "enemy_type": "beast",
+        "enemy_description": "Big",
+    }
+    row.update(fields)
+    return db.seed("quests", [row])[0]
+
+
+def seed_user(db: MemorySupabaseClient, **fields) -> dict:
+    row = {"username": "alice", "email": "alice@example.com"}
+    row.update(fields)
+    return db.seed("users", [row])[0]
+
+
+def seed_item(db: MemorySupabaseClient, **fields) -> dict:
+    row = {
+        "name": "Sword",
+        "description": "An item",
+        "rarity_tier": 1,
+        "rarity_stars": 1,
+        "price": 100,
+    }
+    row.update(fields)
+    return db.seed("items", [row])[0]
+
+
+def seed_achievement(db: MemorySupabaseClient, achievement_type: str, **fields) -> dict:
+    row = {
+        "title": f"{achievement_type} achievement",
+        "description": "An achievement",
+        "achievement_type": achievement_type,
+        "color_tier": 1,
+    }
+    row.update(fields)
+    return db.seed("achievements", [row])[0]
+
+
+def seed_user_quest(db: MemorySupabaseClient, user: dict, quest: dict, **fields) -> dict:
+    deadline = datetime.now(timezone.utc) + timedelta(hours=24)
+    row = {
+        "user_id": user["id"],
+        "quest_id": quest["id"],
+        "deadline_at": deadline.isoformat(),
+    }
+    row.update(fields)
+    return db.seed("user_completed_quests", [row])[0]
@@ -0,0 +1,169 @@
+"""
+AchievementRules must award exactly what the database checks awarded before
+it: the check_*_achievement functions (mirrored by the in-memory backend)
+and the highest reached collection threshold.
+"""
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from database.memory_client import MemorySupabaseClient
+from models.achievement import AchievementResponse
+from models.quest import QuestResponse
+from models.user import UserProgress
+from services.achievement_rules import AchievementRules
+from tests.factories import seed_achievement, seed_quest, seed_user, seed_user_quest
+
+# title: (tier, topic)
+QUESTS = {
+    "Run": (1, "fitness"),
+    "Read": (1, "reading"),
+    "Lift": (2, "fitness"),
+    "Swim": (2, "fitness"),
+}
+
+# (title, achievement_type, criteria); quest criteria name a quest title
+ACHIEVEMENTS = [
+    ("Tier 1", "tier", {"tier": 1}),
+    ("Tier 2", "tier", {"tier": 2}),
+    ("Tier 3", "tier", {"tier": 3}),
+    ("Athlete", "questline", {"topic": "fitness"}),
+    ("Reader", "questline", {"topic": "reading"}),
+    ("Chef", "questline", {"topic": "cooking"}),
+    ("First run", "quest", {"quest": "Run"}),
+    ("First swim", "quest", {"quest": "Swim"}),
+    ("Collector 1", "collection", {"tier": 1}),
+    ("Collector 3", "collection", {"tier": 3}),
+    ("Collector 6", "collection", {"tier": 6}),
+    ("Collector", "collection", {}),
+]
+
+
+@pytest.fixture
+def catalog(db):
+    quests = {
+        title: seed_quest(db, title=title, tier=tier, topic=topic)
+        for title, (tier, topic) in QUESTS.items()
+    }
+    for title, kind, criteria in ACHIEVEMENTS:
+        criteria = dict(criteria)
+        if "quest" in criteria:
+            criteria["quest_id"] = quests[criteria.pop("quest")]["id"]
+        seed_achievement(db, kind, title=title, **criteria)
+    return quests
+
+
+def achievement_catalog(db: MemorySupabaseClient) -> list[AchievementResponse]:
+    """Achievements in catalog order (achievement_type, tier, id)"""
+    rows = sorted(
+        db.tables["achievements"].rows.values(),
+        key=lambda a: (a["achievement_type"], a["tier"] is None, a["tier"] or 0, a["id"]),
+    )
+    return [AchievementResponse(**row) for row in rows]
+
+
+def build_rules(db: MemorySupabaseClient) -> AchievementRules:
+    return AchievementRules(
+        achievement_catalog(db),
+        [QuestResponse(**q) for q in db.tables["quests"].rows.values()],
+    )
+
+
+def title(achievement):
+    return achievement.title if achievement else None
+
+
+@pytest.mark.parametrize(
+    "completed, tiers, questlines, quest_achievements",
+    [
+        ([], {}, {}, {}),
+        (["Run"], {}, {}, {"Run": "First run"}),
+        (["Read"], {}, {"reading": "Reader"}, {}),
+        (["Run", "Read"], {1: "Tier 1"}, {"reading": "Reader"}, {"Run": "First run"}),
+        (["Lift", "Swim"], {2: "Tier 2"}, {}, {"Swim": "First swim"}),
+        (
+            ["Run", "Lift", "Swim"],
+            {2: "Tier 2"},
+            {"fitness": "Athlete"},
+            {"Run": "First run", "Swim": "First swim"},
+        ),
+        (
+            list(QUESTS),
+            {1: "Tier 1", 2: "Tier 2"},
+            {"fitness": "Athlete", "reading": "Reader"},
+            {"Run": "First run", "Swim": "First swim"},
+        ),
+    ],
+)
+def test_quest_achievements_match_the_database_checks(
+    db, catalog, completed, tiers, questlines, quest_achievements
+):
+    user = seed_user(db)
+    for quest_title in completed:
+        seed_user_quest(
+            db,
+            user,
+            catalog[quest_title],
+            is_active=False,
+            completed_at=datetime.now(timezone.utc),
+        )
+    rules = build_rules(db)
+    progress = UserProgress(
+        user_id=UUID(user["id"]),
+        completed_quest_ids={catalog[quest_title]["id"] for quest_title in completed},
+    )
+
+    def check(fn, **params):
+        return asyncio.run(db.rpc(fn, {"p_user_id": user["id"], **params}).execute()).data
+
+    for tier in (1, 2, 3, 4):
+        awarded = rules.tier_achievement(tier, progress)
+        assert title(awarded) == tiers.get(tier)
+        assert check("check_tier_achievement", p_quest_tier=tier) == (awarded is not None)
+
+    for topic in ("fitness", "reading", "cooking", "unknown"):
+        awarded = rules.questline_achievement(topic, progress)
+        assert title(awarded) == questlines.get(topic)
+        assert check("check_questline_achievement", p_topic=topic) == (awarded is not None)
+
+    for quest_title, quest in catalog.items():
+        awarded = rules.quest_achievement(quest["id"], progress)
+        assert title(awarded) == quest_achievements.get(quest_title)
+        assert check("check_quest_achievement", p_quest_id=quest["id"]) == (awarded is not None)
+
+
+def legacy_collection_achievement(achievements, item_count):
+    """The pre-rules scan: last achievement in catalog order whose tier is reached"""
+    achievement = None
+    for candidate in achievements:
+        if candidate.tier is not None and candidate.tier <= item_count:
+            achievement = candidate
+    return achievement
+
+
+@pytest.mark.parametrize(
+    "item_count, expected",
+    [
+        (0, None),
+        (1, "Collector 1"),
+        (2, "Collector 1"),
+        (3, "Collector 3"),
+        (5, "Collector 3"),
+        (6, "Collector 6"),
+        (500, "Collector 6"),
+    ],
+)
+def test_collection_threshold(db, catalog, item_count, expected):
+    collection = [a for a in achievement_catalog(db) if a.achievement_type == "collection"]
+
+    assert title(build_rules(db).collection_achievement(item_count)) == expected
+    assert title(legacy_collection_achievement(collection, item_count)) == expected
+
+
+def test_collection_without_thresholds():
+    rules = AchievementRules([], [])
+
+    assert rules.collection_achievement(3) is None
+
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from models.quest import ChatMessage, QuestResponse
+from services.chat_context import SystemPromptCache, budget_history
+
+
+def make_quest(**fields) -> QuestResponse:
+    quest = {
+        "id": uuid4(),
+        "created_at": datetime.now(timezone.utc),
+        "title": "Slay the dragon",
+        "description": "A quest",
+        "topic": "fitness",
+        "tier": 1,
+        "enemy_name": "Dragon",
+        "enemy_type": "beast",
+        "enemy_description": "Big",
+    }
+    quest.update(fields)
+    return QuestResponse(**quest)
+
+
+class Renderer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, quest: QuestResponse) -> str:
+        self.calls += 1
+        return f"Help with {quest.topic}"
+
+
+def test_prompt_is_rendered_once_per_quest_and_catalog_version():
+    cache, render = SystemPromptCache(), Renderer()
+    quest = make_quest()
+
+    first = cache.get(quest, render, "v1")
+    again = cache.get(quest.model_copy(), render, "v1")
+
+    assert first == again == "Help with fitness"
+    assert render.calls == 1
+
+
+def test_new_catalog_version_renders_again():
+    cache, render = SystemPromptCache(), Renderer()
+    quest = make_quest()
+    cache.get(quest, render, "v1")
+
+    prompt = cache.get(quest.model_copy(update={"topic": "reading"}), render, "v2")
+
+    assert prompt == "Help with reading"
+    assert render.calls == 2
+
+
+def test_without_a_catalog_version_nothing_is_cached():
+    cache, render = SystemPromptCache(), Renderer()
+    quest = make_quest()
+
+    cache.get(quest, render, None)
+    cache.get(quest, render, None)
+
+    assert render.calls == 2
+
+
+def test_invalidate_drops_one_quest():
+    cache, render = SystemPromptCache(), Renderer()
+    kept, dropped = make_quest(), make_quest()
+    cache.get(kept, render, "v1")
+    cache.get(dropped, render, "v1")
+
+    cache.invalidate(dropped.id)
+    cache.get(kept, render, "v1")
+    cache.get(dropped, render, "v1")
+
+    assert render.calls == 3
+
+
+def test_least_recent_quest_is_evicted():
+    cache, render = SystemPromptCache(max_entries=2), Renderer()
+    a, b, c = make_quest(), make_quest(), make_quest()
+    for quest in (a, b, a, c):
+        cache.get(quest, render, "v1")
+
+    cache.get(a, render, "v1")
+    cache.get(b, render, "v1")
+
+    assert render.calls == 4
+
+
+def test_summary_of_trimmed_history_is_not_a_system_message():
+    history = [
+        ChatMessage(role=role, content=f"{role} {n} " + "word " * 50)
+        for n in range(20)
+        for role in ("user", "assistant")
+    ]
+
+    messages = budget_history("Help with fitness", history, "new", max_tokens=600)
+
+    assert [m for m in messages if m["role"] == "system"] == [
+        {"role": "system", "content": "Help with fitness"}
+    ]
+    summary = messages[1]
+    assert summary["role"] == "user"
+    quoted = summary["content"].splitlines()[1:]
+    assert quoted and all(line.startswith("> user ") for line in quoted)
+    assert len(messages) < len(history) + 2
+    assert messages[-1] == {"role": "user", "content": "new"}
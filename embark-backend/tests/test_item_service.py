@@ -0,0 +1,95 @@
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+
+from database.memory_client import MemorySupabaseClient
+from services.item_service import ItemService
+from tests.factories import seed_item, seed_user
+from utils.query_budget import start_tracking, stop_tracking
+
+
+def test_get_items_by_ids_dedupes_keeps_order_and_skips_unknown(db):
+    first, second = seed_item(db, name="First"), seed_item(db, name="Second")
+    ids = [UUID(second["id"]), uuid4(), UUID(first["id"]), UUID(second["id"])]
+
+    async def run():
+        service = ItemService(db)
+        await service.catalog.snapshot(db)  # Warm; the unknown id still needs the database
+        tracker, token = start_tracking()
+        try:
+            return await service.get_items_by_ids(ids), tracker.count
+        finally:
+            stop_tracking(token)
+
+    items, queries = asyncio.run(run())
+
+    assert [item.name for item in items] == ["Second", "First"]
+    assert queries == 1
+
+
+def test_get_items_by_ids_without_ids_makes_no_query(db):
+    async def run():
+        tracker, token = start_tracking()
+        try:
+            return await ItemService(db).get_items_by_ids([]), tracker.count
+        finally:
+            stop_tracking(token)
+
+    assert asyncio.run(run()) == ([], 0)
+
+
+def glory(db, user) -> int:
+    return db.tables["users"].rows[user["id"]]["total_glory"]
+
+
+def test_purchase_checks_fresh_ownership_before_taking_glory(db):
+    user = seed_user(db, total_glory=500)
+    item = seed_item(db, price=100)
+    service = ItemService(db)
+    asyncio.run(service.progress.get(db, UUID(user["id"])))
+
+    # Bought through another worker; the cached snapshot doesn't show it
+    db.seed("user_items", [{"user_id": user["id"], "item_id": item["id"]}])
+
+    async def run():
+        tracker, token = start_tracking()
+        try:
+            with pytest.raises(ValueError, match="already own"):
+                await service.purchase_item(UUID(user["id"]), UUID(item["id"]))
+            return tracker.shapes
+        finally:
+            stop_tracking(token)
+
+    shapes = asyncio.run(run())
+
+    assert not [shape for shape in shapes if shape.startswith("update users")]
+    assert glory(db, user) == 500
+
+
+def test_refund_keeps_concurrent_glory_changes(db):
+    # 500 was deducted down to 400, then a quest reward of 100 landed
+    user = seed_user(db, total_glory=500)
+
+    asyncio.run(ItemService(db)._refund_glory(UUID(user["id"]), 100, 400))
+
+    assert glory(db, user) == 600
+
+
+def test_concurrent_purchases_cannot_spend_the_same_glory():
+    db = MemorySupabaseClient(latency_ms=1)  # Calls yield, so the purchases interleave
+    user = seed_user(db, total_glory=150)
+    items = [seed_item(db, name=name, price=100) for name in ("Sword", "Shield")]
+    service = ItemService(db)
+
+    async def run():
+        return await asyncio.gather(
+            *(service.purchase_item(UUID(user["id"]), UUID(item["id"])) for item in items),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert sum(isinstance(result, dict) for result in results) == 1
+    assert glory(db, user) == 50
+    assert len(db.tables["user_items"].rows) == 1
@@ -0,0 +1,463 @@
+"""
+The in-memory backend must behave like PostgREST over the real schema and
+SQL functions (database/*.sql), or the benchmarks and tests measure
+something the API never does in production.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import pytest
+from postgrest import APIError
+
+from tests.factories import (
+    seed_achievement,
+    seed_item,
+    seed_quest,
+    seed_user,
+    seed_user_quest,
+)
+
+MISSING_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def run(query):
+    return asyncio.run(query.execute())
+
+
+def titles(response):
+    return [row["title"] for row in response.data]
+
+
+@pytest.fixture
+def quests(db):
+    return [
+        seed_quest(db, title="A", tier=1, topic="fitness", enemy_image_url="a.png"),
+        seed_quest(db, title="B", tier=2, topic="fitness"),
+        seed_quest(db, title="C", tier=3, topic=None),
+    ]
+
+
+# Filters ---------------------------------------------------------------------
+
+def test_eq_and_range_filters(db, quests):
+    assert titles(run(db.table("quests").select("*").eq("tier", 2))) == ["B"]
+    assert titles(run(db.table("quests").select("*").gte("tier", 2).order("tier"))) == ["B", "C"]
+    assert titles(run(db.table("quests").select("*").lt("tier", 2))) == ["A"]
+
+
+def test_comparisons_never_match_null(db, quests):
+    # topic <> 'fitness' and topic IN (...) are NULL, not true, for a NULL topic
+    assert titles(run(db.table("quests").select("*").neq("topic", "fitness"))) == []
+    assert titles(run(db.table("quests").select("*").in_("topic", ["fitness", None]))) == [
+        "A",
+        "B",
+    ]
+    assert titles(run(db.table("quests").select("*").neq("enemy_image_url", "a.png"))) == []
+
+
+def test_is_null(db, quests):
+    assert titles(run(db.table("quests").select("*").is_("topic", "null"))) == ["C"]
+
+
+def test_in_filter_matches_uuids_as_strings(db, quests):
+    ids = [UUID(quests[2]["id"]), UUID(quests[0]["id"])]
+
+    response = run(db.table("quests").select("*").in_("id", ids).order("title"))
+
+    assert titles(response) == ["A", "C"]
+
+
+def test_or_filter_with_nested_and(db, quests):
+    query = db.table("quests").select("*").or_("tier.gt.2,and(tier.eq.1,topic.eq.fitness)")
+
+    assert sorted(titles(run(query))) == ["A", "C"]
+
+
+def test_or_filter_quoted_values_may_contain_syntax(db):
+    seed_quest(db, title="plain")
+    seed_quest(db, title='a,b.c("x")')
+
+    query = db.table("quests").select("*").or_('title.eq."a,b.c(\\"x\\")"')
+
+    assert titles(run(query)) == ['a,b.c("x")']
+
+
+# Ordering and ranges ---------------------------------------------------------
+
+def test_nulls_sort_last_ascending_and_first_descending(db, quests):
+    ascending = run(db.table("quests").select("*").order("topic").order("title"))
+    descending = run(db.table("quests").select("*").order("topic", desc=True).order("title"))
+
+    assert titles(ascending) == ["A", "B", "C"]
+    assert titles(descending) == ["C", "A", "B"]
+
+
+def test_exact_count_ignores_the_range(db, quests):
+    response = run(db.table("quests").select("*", count="exact").order("tier").range(1, 1))
+
+    assert titles(response) == ["B"]
+    assert response.count == 3
+
+
+def test_count_only_when_requested(db, quests):
+    assert run(db.table("quests").select("*")).count is None
+
+
+def test_single_requires_exactly_one_row(db, quests):
+    assert run(db.table("quests").select("*").eq("tier", 1).single()).data["title"] == "A"
+    assert run(db.table("quests").select("*").eq("tier", 9).maybe_single()) is None
+
+    with pytest.raises(APIError) as error:
+        run(db.table("quests").select("*").single())
+    assert error.value.code == "PGRST116"
+
+
+# Writes ----------------------------------------------------------------------
+
+def test_insert_applies_column_defaults(db):
+    row = run(db.table("users").insert({"username": "alice", "email": "a@example.com"})).data[0]
+
+    assert row["total_glory"] == 0
+    assert row["level"] == 1
+    assert row["id"]
+
+
+@pytest.mark.parametrize("duplicate", [{"username": "alice"}, {"email": "alice@example.com"}])
+def test_unique_columns_raise_23505(db, duplicate):
+    seed_user(db)
+    row = {"username": "bob", "email": "bob@example.com", **duplicate}
+
+    with pytest.raises(APIError) as error:
+        run(db.table("users").insert(row))
+    assert error.value.code == "23505"
+
+
+def test_item_ownership_is_unique(db):
+    user = seed_user(db)
+    item = seed_item(db)
+    ownership = {"user_id": user["id"], "item_id": item["id"]}
+    run(db.table("user_items").insert(ownership))
+
+    with pytest.raises(APIError) as error:
+        run(db.table("user_items").insert(ownership))
+    assert error.value.code == "23505"
+
+
+def test_update_into_a_unique_value_raises_and_keeps_the_row(db):
+    seed_user(db)
+    bob = seed_user(db, username="bob", email="bob@example.com")
+
+    with pytest.raises(APIError):
+        run(db.table("users").update({"username": "alice"}).eq("id", bob["id"]))
+
+    row = run(db.table("users").select("*").eq("username", "bob")).data
+    assert [r["id"] for r in row] == [bob["id"]]
+
+
+def test_upsert_updates_on_conflict(db):
+    user = seed_user(db)
+
+    run(db.table("users").upsert({"id": user["id"], "total_glory": 50}))
+    run(
+        db.table("users").upsert(
+            {"username": "alice", "email": "alice@example.com", "total_xp": 7},
+            on_conflict="username",
+        )
+    )
+
+    rows = run(db.table("users").select("*")).data
+    assert len(rows) == 1
+    assert (rows[0]["total_glory"], rows[0]["total_xp"]) == (50, 7)
+
+
+def test_delete_returns_the_deleted_rows(db, quests):
+    response = run(db.table("quests").delete().eq("tier", 1))
+
+    assert titles(response) == ["A"]
+    assert titles(run(db.table("quests").select("*").order("tier"))) == ["B", "C"]
+
+
+# Embedded resources ----------------------------------------------------------
+
+def test_many_to_one_embed_through_the_foreign_key(db, quests):
+    user = seed_user(db)
+    seed_user_quest(db, user, quests[1])
+
+    row = run(db.table("user_completed_quests").select("*, quests(title, tier)")).data[0]
+
+    assert row["quests"] == {"title": "B", "tier": 2}
+    assert row["quest_id"] == quests[1]["id"]
+
+
+def test_aliased_embed(db):
+    user = seed_user(db)
+    achievement = seed_achievement(db, "quest", title="First blood")
+    db.seed("user_achievements", [{"user_id": user["id"], "achievement_id": achievement["id"]}])
+
+    row = run(db.table("user_achievements").select("*, achievement:achievements(*)")).data[0]
+
+    assert row["achievement"]["title"] == "First blood"
+    assert "achievements" not in row
+
+
+def test_embed_of_a_missing_row_is_null(db):
+    user = seed_user(db)
+    db.seed("user_items", [{"user_id": user["id"], "item_id": MISSING_ID}])
+
+    assert run(db.table("user_items").select("*, items(*)")).data[0]["items"] is None
+
+
+def test_one_to_many_embed_is_a_list(db, quests):
+    user = seed_user(db)
+    seed_user(db, username="bob", email="bob@example.com")
+    seed_user_quest(db, user, quests[0])
+    seed_user_quest(db, user, quests[1])
+
+    rows = run(
+        db.table("users").select("id, user_completed_quests(quest_id), user_items(item_id)")
+    ).data
+    by_id = {row["id"]: row for row in rows}
+
+    assert sorted(q["quest_id"] for q in by_id[user["id"]]["user_completed_quests"]) == sorted(
+        [quests[0]["id"], quests[1]["id"]]
+    )
+    assert by_id[user["id"]]["user_items"] == []
+    assert set(by_id[user["id"]]) == {"id", "user_completed_quests", "user_items"}
+
+
+# RPCs ------------------------------------------------------------------------
+
+def rpc(db, fn, **params):
+    return asyncio.run(db.rpc(fn, params).execute()).data
+
+
+def rpc_error(db, fn, **params) -> APIError:
+    with pytest.raises(APIError) as error:
+        rpc(db, fn, **params)
+    return error.value
+
+
+def test_unknown_function_is_pgrst202(db):
+    assert rpc_error(db, "does_not_exist").code == "PGRST202"
+
+
+def test_tier_achievement_needs_every_quest_of_the_tier(db):
+    user = seed_user(db)
+    first, second = seed_quest(db, tier=2), seed_quest(db, tier=2)
+    achievement = seed_achievement(db, "tier", tier=2)
+    seed_user_quest(db, user, first, is_active=False, completed_at=datetime.now(timezone.utc))
+    seed_user_quest(db, user, second)
+
+    assert rpc(db, "check_tier_achievement", p_user_id=user["id"], p_quest_tier=2) is False
+
+    run(
+        db.table("user_completed_quests")
+        .update({"is_active": False, "completed_at": datetime.now(timezone.utc)})
+        .eq("quest_id", second["id"])
+    )
+
+    assert rpc(db, "check_tier_achievement", p_user_id=user["id"], p_quest_tier=2) is True
+    # Already unlocked: no second award
+    assert rpc(db, "check_tier_achievement", p_user_id=user["id"], p_quest_tier=2) is False
+    unlocked = run(db.table("user_achievements").select("*")).data
+    assert [row["achievement_id"] for row in unlocked] == [achievement["id"]]
+
+
+def test_questline_and_quest_achievements(db):
+    user = seed_user(db)
+    quest = seed_quest(db, topic="reading")
+    seed_quest(db, topic="reading")
+    seed_achievement(db, "questline", topic="reading")
+    seed_achievement(db, "quest", quest_id=quest["id"])
+    seed_user_quest(db, user, quest, is_active=False, completed_at=datetime.now(timezone.utc))
+
+    assert rpc(db, "check_quest_achievement", p_user_id=user["id"], p_quest_id=quest["id"])
+    assert not rpc(db, "check_questline_achievement", p_user_id=user["id"], p_topic="reading")
+
+
+@pytest.fixture
+def shop(db):
+    user = seed_user(db, total_glory=1000)
+    items = [seed_item(db, name=f"Item {n}", price=100) for n in range(3)]
+    for threshold in (1, 2, 5):
+        seed_achievement(db, "collection", tier=threshold, title=f"Own {threshold}")
+    seed_achievement(db, "collection", tier=None, title="Untiered")
+    return user, items
+
+
+def test_purchase_deducts_glory_and_awards_the_reached_collection_tier(db, shop):
+    user, items = shop
+    db.seed("user_items", [{"user_id": user["id"], "item_id": items[0]["id"]}])
+
+    result = rpc(db, "purchase_item", p_user_id=user["id"], p_item_id=items[1]["id"])
+
+    assert result["new_glory"] == 900
+    assert result["item_price"] == 100
+    assert result["user_item"]["item"]["id"] == items[1]["id"]
+    # Two items owned: the highest threshold reached is 2, not 1
+    assert [a["title"] for a in result["awarded_achievements"]] == ["Own 2"]
+
+
+def test_purchase_awards_a_collection_tier_once(db, shop):
+    user, items = shop
+    rpc(db, "purchase_item", p_user_id=user["id"], p_item_id=items[0]["id"])
+    db.tables["user_items"].delete(next(iter(db.tables["user_items"].rows.values())))
+
+    result = rpc(db, "purchase_item", p_user_id=user["id"], p_item_id=items[1]["id"])
+
+    assert result["awarded_achievements"] == []
+
+
+def assert_purchase_fails(db, user_id, item_id, message):
+    users = db.tables["users"].rows
+    glory_before = {id: row["total_glory"] for id, row in users.items()}
+    owned_before = len(db._table("user_items").rows)
+
+    error = rpc_error(db, "purchase_item", p_user_id=user_id, p_item_id=item_id)
+
+    assert (error.code, error.message) == ("P0001", message)
+    assert {id: row["total_glory"] for id, row in users.items()} == glory_before
+    assert len(db._table("user_items").rows) == owned_before
+
+
+def test_purchase_of_a_missing_item(db, shop):
+    user, _ = shop
+    assert_purchase_fails(db, user["id"], MISSING_ID, "Item not found")
+
+
+def test_purchase_by_a_missing_user(db, shop):
+    _, items = shop
+    assert_purchase_fails(db, MISSING_ID, items[0]["id"], "User not found")
+
+
+def test_purchase_with_insufficient_glory(db, shop):
+    user, items = shop
+    db.tables["users"].rows[user["id"]]["total_glory"] = 99
+    assert_purchase_fails(
+        db, user["id"], items[0]["id"], "Insufficient glory. You need 100 glory but only have 99"
+    )
+
+
+def test_purchase_of_an_owned_item(db, shop):
+    user, items = shop
+    db.seed("user_items", [{"user_id": user["id"], "item_id": items[0]["id"]}])
+    assert_purchase_fails(db, user["id"], items[0]["id"], "You already own this item")
+
+
+def test_insufficient_glory_is_reported_before_ownership(db, shop):
+    user, items = shop
+    db.seed("user_items", [{"user_id": user["id"], "item_id": items[0]["id"]}])
+    db.tables["users"].rows[user["id"]]["total_glory"] = 0
+
+    error = rpc_error(db, "purchase_item", p_user_id=user["id"], p_item_id=items[0]["id"])
+
+    assert error.message.startswith("Insufficient glory")
+
+
+@pytest.fixture
+def completion(db):
+    user = seed_user(db, total_glory=10, total_xp=250, lifetime_glory_gained=10)
+    quest = seed_quest(db, tier=2, topic="reading", glory_reward=100, xp_reward=60)
+    user_quest = seed_user_quest(db, user, quest)
+    return user, quest, user_quest
+
+
+def complete(db, user, user_quest):
+    return rpc(db, "complete_user_quest", p_user_id=user["id"], p_user_quest_id=user_quest["id"])
+
+
+def test_completion_applies_rewards(db, completion):
+    user, quest, user_quest = completion
+    owned = seed_item(db, rarity_tier=2)
+    unowned = seed_item(db, rarity_tier=2)
+    seed_item(db, rarity_tier=3)
+    db.seed("user_items", [{"user_id": user["id"], "item_id": owned["id"]}])
+
+    result = complete(db, user, user_quest)
+
+    assert result["user_quest"]["is_active"] is False
+    assert result["user_quest"]["completed_at"]
+    assert result["quest"]["id"] == quest["id"]
+    assert result["awarded_item"]["item_id"] == unowned["id"]
+    assert result["awarded_item"]["item"]["id"] == unowned["id"]
+    stored = db.tables["users"].rows[user["id"]]
+    assert stored["total_glory"] == 110
+    assert stored["total_xp"] == 310
+    assert stored["level"] == 2
+    assert stored["lifetime_glory_gained"] == 110
+
+
+def test_completion_without_unowned_items_awards_none(db, completion):
+    user, _, user_quest = completion
+
+    assert complete(db, user, user_quest)["awarded_item"] is None
+
+
+def test_negative_glory_does_not_count_towards_lifetime_glory(db, completion):
+    user, quest, user_quest = completion
+    quest_row = db.tables["quests"].rows[quest["id"]]
+    quest_row["glory_reward"] = -5
+
+    complete(db, user, user_quest)
+
+    stored = db.tables["users"].rows[user["id"]]
+    assert (stored["total_glory"], stored["lifetime_glory_gained"]) == (5, 10)
+
+
+def test_completion_returns_new_achievements_by_type_then_tier(db, completion):
+    user, quest, user_quest = completion
+    seed_achievement(db, "tier", tier=2, title="Tier 2")
+    seed_achievement(db, "questline", topic="reading", title="Reader")
+    seed_achievement(db, "quest", quest_id=quest["id"], title="Quest")
+
+    result = complete(db, user, user_quest)
+
+    assert [a["title"] for a in result["awarded_achievements"]] == ["Quest", "Reader", "Tier 2"]
+
+
+def test_completion_only_returns_achievements_unlocked_by_it(db, completion):
+    user, quest, user_quest = completion
+    earlier = seed_achievement(db, "quest", quest_id=quest["id"], title="Earlier")
+    db.seed("user_achievements", [{"user_id": user["id"], "achievement_id": earlier["id"]}])
+
+    assert complete(db, user, user_quest)["awarded_achievements"] == []
+
+
+def test_completion_errors(db, completion):
+    user, quest, user_quest = completion
+    other = seed_user(db, username="bob", email="bob@example.com")
+    expired = seed_user_quest(
+        db, user, quest, deadline_at=datetime.now(timezone.utc) - timedelta(minutes=1)
+    )
+
+    missing_user = rpc_error(
+        db,
+        "complete_user_quest",
+        p_user_id=MISSING_ID,
+        p_user_quest_id=user_quest["id"],
+    )
+    not_owner = rpc_error(
+        db, "complete_user_quest", p_user_id=other["id"], p_user_quest_id=user_quest["id"]
+    )
+    late = rpc_error(
+        db, "complete_user_quest", p_user_id=user["id"], p_user_quest_id=expired["id"]
+    )
+
+    assert (missing_user.code, missing_user.message) == ("P0002", "User not found")
+    assert not_owner.code == "P0001"
+    assert not_owner.message == "Active quest not found or does not belong to user"
+    assert (late.code, late.message) == ("P0001", "Quest deadline has passed")
+    assert db.tables["users"].rows[user["id"]]["total_glory"] == 10
+
+
+def test_a_quest_completes_once(db, completion):
+    user, _, user_quest = completion
+    complete(db, user, user_quest)
+
+    error = rpc_error(
+        db, "complete_user_quest", p_user_id=user["id"], p_user_quest_id=user_quest["id"]
+    )
+
+    assert error.message == "Active quest not found or does not belong to user"
+    assert db.tables["users"].rows[user["id"]]["total_glory"] == 110
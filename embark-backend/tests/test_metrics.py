@@ -0,0 +1,51 @@
+"""GET /api/metrics is only served to scrapers holding METRICS_TOKEN"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from middleware.error_handler import APIException, api_exception_handler
+from routers import metrics
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_exception_handler(APIException, api_exception_handler)
+    app.include_router(metrics.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_metrics_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+
+    assert client.get("/api/metrics").status_code == 404
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        {"Authorization": "Bearer wrong"},
+        {"Authorization": "Basic s3cret"},
+        {"Authorization": "s3cret"},
+    ],
+)
+def test_metrics_rejects_missing_or_wrong_token(client, monkeypatch, headers):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+
+    response = client.get("/api/metrics", headers=headers)
+
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_metrics_served_with_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer s3cret"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "embark_http_request_duration_seconds" in response.text
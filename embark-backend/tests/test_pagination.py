@@ -0,0 +1,170 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from tests.factories import seed_item
+from utils.pagination import (
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    keyset_slice,
+    next_cursor,
+)
+
+ASC = [("tier", False)]
+DESC = [("tier", True)]
+TIER_DESC_STARS_ASC = [("tier", True), ("stars", False)]
+
+
+def make_rows(order):
+    """Rows with many ties on the sort columns, sorted by order + id"""
+    rows = [
+        {"id": f"{n:02d}", "tier": n % 3, "stars": n % 2}
+        for n in range(12)
+    ]
+    for column, desc in reversed(order + [("id", False)]):
+        rows.sort(key=lambda row: row[column], reverse=desc)
+    return rows
+
+
+def all_pages(rows, order, limit):
+    pages = []
+    cursor = None
+    while True:
+        page = keyset_slice(rows, order, cursor, limit)
+        pages.append(page)
+        cursor = next_cursor(page, limit, order)
+        if cursor is None:
+            return pages
+
+
+def encode(values) -> str:
+    payload = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("order", [ASC, DESC, TIER_DESC_STARS_ASC])
+@pytest.mark.parametrize("limit", [1, 2, 5, 12, 20])
+def test_pages_concatenate_to_the_full_list(order, limit):
+    rows = make_rows(order)
+
+    pages = all_pages(rows, order, limit)
+
+    assert [row for page in pages for row in page] == rows
+    assert all(len(page) <= limit for page in pages)
+
+
+def test_ties_on_the_sort_key_are_broken_by_id():
+    rows = make_rows(ASC)
+    tier_zero = [row for row in rows if row["tier"] == 0]
+
+    page = keyset_slice(rows, ASC, encode_cursor(tier_zero[0], ASC), 2)
+
+    assert page == tier_zero[1:3]
+
+
+def test_descending_order_continues_below_the_cursor():
+    rows = make_rows(DESC)
+    first = keyset_slice(rows, DESC, None, 5)
+
+    second = keyset_slice(rows, DESC, encode_cursor(first[-1], DESC), 5)
+
+    assert [row["tier"] for row in first] == [2, 2, 2, 2, 1]
+    assert [row["tier"] for row in second] == [1, 1, 1, 0, 0]
+
+
+def test_cursor_round_trips():
+    row = {"id": "7", "tier": 2, "stars": 1}
+
+    cursor = encode_cursor(row, TIER_DESC_STARS_ASC)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, TIER_DESC_STARS_ASC) == [2, 1, "7"]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        "",
+        encode("not a list")[:-1],
+        encode({"tier": 1}),
+        encode([1]),
+        encode([1, 2, "id"]),
+    ],
+    ids=["garbage", "empty", "truncated", "object", "too-short", "too-long"],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, ASC)
+
+
+def test_cursor_for_another_order_is_rejected():
+    cursor = encode_cursor({"id": "1", "tier": 1, "stars": 0}, TIER_DESC_STARS_ASC)
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, ASC)
+
+
+def test_tampered_cursor_values_are_rejected():
+    rows = make_rows(ASC)
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_slice(rows, ASC, encode(["two", "01"]), 5)
+
+
+def test_tampered_cursor_values_are_quoted_in_the_filter():
+    injected = 'x",id.gt.0,tier.eq."'
+
+    assert keyset_filter(ASC, [injected, "1"]) == (
+        'tier.gt."x\\",id.gt.0,tier.eq.\\"",'
+        'and(tier.eq."x\\",id.gt.0,tier.eq.\\"",id.gt."1")'
+    )
+
+
+def test_keyset_filter_for_mixed_directions():
+    assert keyset_filter(TIER_DESC_STARS_ASC, [2, 1, "abc"]) == (
+        "tier.lt.2,"
+        "and(tier.eq.2,stars.gt.1),"
+        'and(tier.eq.2,stars.eq.1,id.gt."abc")'
+    )
+
+
+def test_keyset_filter_literals():
+    assert keyset_filter([("active", False)], [True, "a,b"]) == (
+        'active.gt.true,and(active.eq.true,id.gt."a,b")'
+    )
+
+
+@pytest.mark.parametrize(
+    "order",
+    [
+        [("rarity_tier", True), ("rarity_stars", True)],
+        [("rarity_tier", False), ("price", True)],
+        [("price", False)],
+    ],
+)
+def test_query_pages_concatenate_to_the_full_list(db, order):
+    for n in range(11):
+        seed_item(db, name=f"Item {n}", rarity_tier=n % 3, rarity_stars=n % 2, price=n % 4)
+
+    def query(cursor=None):
+        return apply_keyset(db.table("items").select("*"), order, cursor)
+
+    async def run():
+        everything = (await query().execute()).data
+        pages, cursor = [], None
+        while True:
+            page = (await query(cursor).limit(3).execute()).data
+            pages.extend(page)
+            cursor = next_cursor(page, 3, order)
+            if cursor is None:
+                return everything, pages
+
+    everything, pages = asyncio.run(run())
+
+    assert [row["id"] for row in pages] == [row["id"] for row in everything]
+    assert len(everything) == 11
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID
+
+from models.user import UserProgress
+from services.progress_cache import ProgressCache
+from services.quest_service import QuestService
+from tests.factories import seed_achievement, seed_quest, seed_user, seed_user_quest
+from utils.query_budget import start_tracking, stop_tracking
+
+
+def make_service(db) -> QuestService:
+    return QuestService(db, progress=ProgressCache())
+
+
+def active_quests_with_count(service: QuestService, user_id: UUID):
+    async def run():
+        tracker, token = start_tracking()
+        try:
+            return await service.get_active_quests(user_id), tracker.count
+        finally:
+            stop_tracking(token)
+
+    return asyncio.run(run())
+
+
+def test_get_active_quests_makes_one_query(db):
+    user = seed_user(db)
+    quests = [seed_quest(db, title=f"Quest {n}") for n in range(3)]
+    for quest in quests:
+        seed_user_quest(db, user, quest)
+
+    active, queries = active_quests_with_count(make_service(db), UUID(user["id"]))
+
+    assert queries == 1
+    assert sorted(q.quest.title for q in active) == ["Quest 0", "Quest 1", "Quest 2"]
+
+
+def test_get_active_quests_skips_finished_and_other_users(db):
+    user = seed_user(db)
+    other = seed_user(db, username="bob", email="bob@example.com")
+    active_quest = seed_quest(db, title="Active")
+    done_quest = seed_quest(db, title="Done")
+    seed_user_quest(db, user, active_quest)
+    seed_user_quest(db, user, done_quest, is_active=False)
+    seed_user_quest(db, other, active_quest)
+
+    active, queries = active_quests_with_count(make_service(db), UUID(user["id"]))
+
+    assert queries == 1
+    assert [q.quest.title for q in active] == ["Active"]
+    assert active[0].quest_id == UUID(active_quest["id"])
+
+
+def test_get_active_quests_without_any_is_one_query(db):
+    user = seed_user(db)
+
+    active, queries = active_quests_with_count(make_service(db), UUID(user["id"]))
+
+    assert active == []
+    assert queries == 1
+
+
+def test_completion_awards_count_quests_completed_elsewhere(db):
+    user = seed_user(db)
+    user_id = UUID(user["id"])
+    first, last = seed_quest(db, title="First", tier=1), seed_quest(db, title="Last", tier=1)
+    seed_achievement(db, "tier", title="Tier 1", tier=1)
+    first_user_quest = seed_user_quest(db, user, first)
+    last_user_quest = seed_user_quest(db, user, last)
+    service = make_service(db)
+    asyncio.run(service.progress.get(db, user_id))
+
+    # Another worker completes the first quest; this worker's snapshot misses it
+    first_user_quest.update(is_active=False, completed_at=datetime.now(timezone.utc).isoformat())
+    completed = asyncio.run(service.complete_quest(user_id, UUID(last_user_quest["id"])))
+
+    assert [a.title for a in completed.awarded_achievements] == ["Tier 1"]
+
+
+def test_award_already_unlocked_elsewhere_is_not_new(db):
+    user = seed_user(db)
+    quest = seed_quest(db)
+    achievement = seed_achievement(db, "quest", quest_id=quest["id"])
+    db.seed("user_achievements", [{"user_id": user["id"], "achievement_id": achievement["id"]}])
+    stale = UserProgress(user_id=UUID(user["id"]), completed_quest_ids={quest["id"]})
+    achievements = make_service(db).achievement_service
+
+    awarded = asyncio.run(
+        achievements.check_and_award_quest_achievement(UUID(user["id"]), quest["id"], stale)
+    )
+
+    assert awarded is None
+    assert achievement["id"] in stale.unlocked_achievement_ids
+    assert len(db.tables["user_achievements"].rows) == 1
+
+
+def test_get_active_user_quest_only_for_its_active_owner(db):
+    user = seed_user(db)
+    other = seed_user(db, username="bob", email="bob@example.com")
+    quest = seed_quest(db, title="Active")
+    active = seed_user_quest(db, user, quest)
+    finished = seed_user_quest(db, user, seed_quest(db, title="Done"), is_active=False)
+    service = make_service(db)
+
+    def lookup(owner, user_quest):
+        return asyncio.run(
+            service.get_active_user_quest(UUID(owner["id"]), UUID(user_quest["id"]))
+        )
+
+    found = lookup(user, active)
+    assert found.id == UUID(active["id"])
+    assert found.quest.title == "Active"
+    assert lookup(other, active) is None
+    assert lookup(user, finished) is None
@@ -0,0 +1,100 @@
+"""Each request is logged once, by LoggingMiddleware, including error responses"""
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from middleware.error_handler import (
+    APIException,
+    NotFoundException,
+    api_exception_handler,
+    general_exception_handler,
+    http_exception_handler,
+)
+from middleware.logging import LoggingMiddleware, StructuredFormatter
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(APIException, api_exception_handler)
+    app.add_exception_handler(Exception, general_exception_handler)
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/busy")
+    async def busy():
+        raise HTTPException(status_code=503, detail="Chat is busy", headers={"Retry-After": "5"})
+
+    @app.get("/missing")
+    async def missing():
+        raise NotFoundException("Quest not found")
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def request_logs(caplog, client, path):
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG):
+        response = client.get(path)
+    records = [r for r in caplog.records if r.name.startswith("middleware")]
+    return response, records
+
+
+@pytest.mark.parametrize(
+    "path, status, level, detail",
+    [
+        ("/ok", 200, logging.INFO, None),
+        ("/busy", 503, logging.ERROR, "Chat is busy"),
+        ("/missing", 404, logging.INFO, "Quest not found"),
+        ("/nope", 404, logging.INFO, "Not Found"),
+    ],
+)
+def test_one_line_per_request(caplog, client, path, status, level, detail):
+    response, records = request_logs(caplog, client, path)
+
+    assert response.status_code == status
+    assert len(records) == 1
+    assert records[0].levelno == level
+    assert records[0].status == status
+    assert getattr(records[0], "detail", None) == detail
+
+
+def test_unhandled_exception_logged_once_with_traceback(caplog, client):
+    response, records = request_logs(caplog, client, "/broken")
+
+    assert response.status_code == 500
+    assert len(records) == 1
+    assert records[0].levelno == logging.ERROR
+    assert records[0].exc_info[0] is RuntimeError
+
+
+def test_text_fields_precede_traceback(caplog, client):
+    _, records = request_logs(caplog, client, "/broken")
+
+    first_line = StructuredFormatter().format(records[0]).splitlines()[0]
+
+    assert "Error: boom | method=GET path=/broken status=500" in first_line
+
+
+def test_json_lines_include_detail_and_traceback(caplog, client):
+    _, records = request_logs(caplog, client, "/busy")
+    busy = json.loads(StructuredFormatter(json_lines=True).format(records[0]))
+    _, records = request_logs(caplog, client, "/broken")
+    broken = json.loads(StructuredFormatter(json_lines=True).format(records[0]))
+
+    assert busy["status"] == 503
+    assert busy["detail"] == "Chat is busy"
+    assert "exc_info" not in busy
+    assert "RuntimeError: boom" in broken["exc_info"]
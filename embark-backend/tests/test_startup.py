@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_startup_benchmark(runs: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--runs", str(runs)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    # Exits 1 when a target is missed; the report is printed either way
+    assert result.stdout, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_deferred_dependencies_not_imported_with_the_app():
+    """openai and the full supabase SDK stay unloaded until first use"""
+    report = run_startup_benchmark(runs=1)
+
+    assert report["deferred_loaded"] == []
+
+
+@pytest.mark.skipif(
+    not os.environ.get("EMBARK_TIMING_TESTS"),
+    reason="wall-clock targets; set EMBARK_TIMING_TESTS=1 to run",
+)
+def test_startup_within_time_targets():
+    """Import and startup stay within the benchmark's default targets"""
+    report = run_startup_benchmark(runs=3)
+
+    assert report["failures"] == []
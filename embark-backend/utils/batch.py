@@ -0,0 +1,40 @@
+"""
+Helpers for batch endpoints that look up or change several rows by id.
+
+Batch requests are answered with one `in_` query, so the id list is bounded
+to keep the query string within PostgREST and proxy URL limits.
+"""
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+# Most ids accepted by one batch request
+MAX_BATCH_IDS = 100
+
+
+def parse_ids(raw: Optional[str]) -> Optional[List[UUID]]:
+    """
+    Parse a comma-separated id list from a query parameter
+
+    Args:
+        raw: Query parameter value, e.g. "id1,id2"
+
+    Returns:
+        The ids in the given order, or None when the parameter wasn't sent
+
+    Raises:
+        ValueError: If an id isn't a UUID or there are too many
+    """
+    if raw is None:
+        return None
+    parts = [part.strip() for part in raw.split(",") if part.strip()]
+    if len(parts) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids can be requested at once")
+    try:
+        return [UUID(part) for part in parts]
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of UUIDs")
+
+
+def unique_ids(ids: Iterable[UUID]) -> List[str]:
+    """Ids as strings with duplicates removed, keeping the first occurrence"""
+    return list(dict.fromkeys(str(id) for id in ids))
@@ -0,0 +1,184 @@
+"""
+HTTP caching helpers: conditional requests (ETag / If-None-Match) and
+pre-serialized, pre-compressed responses for catalog endpoints.
+"""
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Type
+
+import brotli
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+from config.settings import settings
+
+# Clients may store responses but must revalidate them before reuse
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Content codings we pre-compress, in order of preference
+ENCODINGS = ("br", "gzip")
+
+
+def make_etag(version: str, *parts: Any) -> str:
+    """Strong ETag for one representation of a versioned resource
+
+    Args:
+        version: Version of the underlying data (e.g. a catalog snapshot version)
+        parts: Everything else that shapes the response body (query parameters)
+    """
+    key = "|".join([version, *(str(part) for part in parts)])
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, *etags: str) -> bool:
+    """Check ETags against the request's If-None-Match header"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Empty 304 response for a matching ETag"""
+    return Response(
+        status_code=304,
+        headers={**(headers or {}), "ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL},
+    )
+
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    """Add validator headers to a response when an ETag is available"""
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+
+
+def accepted_encodings(request: Request) -> set[str]:
+    """Content codings the client accepts (q=0 entries excluded)"""
+    accepted = set()
+    for token in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = token.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PreparedResponse:
+    """A JSON body serialized once, with its compressed variants and ETags"""
+
+    def __init__(self, version: str, body: bytes, etag: str, headers: Dict[str, str]):
+        self.version = version
+        self.headers = headers
+        self.bodies: Dict[Optional[str], bytes] = {None: body}
+        self.etags: Dict[Optional[str], str] = {None: etag}
+
+        # Small bodies aren't worth the framing overhead of compression
+        if len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+            self.bodies["br"] = brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+            for encoding in ENCODINGS:
+                # Each coding is a different representation, so it gets its own strong ETag
+                self.etags[encoding] = etag[:-1] + f'-{encoding}"'
+
+    def render(self, request: Request) -> Response:
+        """Pick the best encoding for the request; 304 if the client's copy is current"""
+        accepted = accepted_encodings(request)
+        encoding = next((e for e in ENCODINGS if e in accepted and e in self.bodies), None)
+
+        headers = {
+            **self.headers,
+            "ETag": self.etags[encoding],
+            "Cache-Control": REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request, *self.etags.values()):
+            return not_modified(self.etags[encoding], headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.bodies[encoding], media_type="application/json", headers=headers
+        )
+
+
+class CatalogResponseCache:
+    """
+    Prepared catalog responses keyed by query shape, rebuilt only when the
+    catalog version changes
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = (
+            settings.CATALOG_RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self._entries: "OrderedDict[Hashable, PreparedResponse]" = OrderedDict()
+        self._adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+    def _adapter(self, model: Type[BaseModel]) -> TypeAdapter:
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(List[model])
+        return adapter
+
+    def prime(self, model: Type[BaseModel], rows: Sequence[BaseModel]) -> None:
+        """Build a model's list serializer ahead of the first request"""
+        self._adapter(model).dump_json(list(rows))
+
+    async def respond(
+        self,
+        request: Request,
+        response: Response,
+        version: Optional[str],
+        key: Tuple[Hashable, ...],
+        model: Type[BaseModel],
+        build: Callable[[], Awaitable[Tuple[Sequence[BaseModel], Dict[str, str]]]],
+    ) -> Any:
+        """
+        Serve a catalog listing from its prepared response
+
+        Args:
+            request: Incoming request (for If-None-Match and Accept-Encoding)
+            response: Endpoint response, used when the catalog isn't cached
+            version: Catalog version, or None when the catalog isn't cached
+            key: Everything that shapes the body (resource name and query parameters)
+            model: Row model, serialized exactly as FastAPI would
+            build: Loads the rows and any extra response headers
+
+        Returns:
+            A ready Response, or the rows themselves when there's no version
+        """
+        if version is None:
+            rows, headers = await build()
+            response.headers.update(headers)
+            return rows
+
+        prepared = self._entries.get(key)
+        if prepared is None or prepared.version != version:
+            rows, headers = await build()
+            body = self._adapter(model).dump_json(list(rows))
+            # Compression is CPU-bound; keep it off the event loop
+            prepared = await asyncio.to_thread(
+                PreparedResponse, version, body, make_etag(version, *key), headers
+            )
+            self._entries[key] = prepared
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+
+        return prepared.render(request)
+
+    def clear(self) -> None:
+        """Drop every prepared response"""
+        self._entries.clear()
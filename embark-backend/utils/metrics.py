@@ -0,0 +1,117 @@
+"""
+Prometheus metrics for HTTP requests, PostgREST calls and OpenAI calls.
+
+Exposed in text format at /api/metrics.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Request latencies are mostly a few ms (cached) to a few s (OpenAI)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "embark_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "embark_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method"],
+)
+DB_REQUEST_DURATION = Histogram(
+    "embark_db_request_duration_seconds",
+    "PostgREST call latency by table or RPC and operation",
+    ["target", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "embark_openai_request_duration_seconds",
+    "OpenAI API call latency",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_QUEUED = Gauge(
+    "embark_chat_queued",
+    "Quest chats waiting for a free OpenAI slot",
+)
+CHAT_IN_FLIGHT = Gauge(
+    "embark_chat_in_flight",
+    "Quest chats currently calling OpenAI",
+)
+CHAT_REJECTED = Counter(
+    "embark_chat_rejected",
+    "Quest chats rejected because no slot freed up before the queue deadline",
+)
+CHAT_CACHE_LOOKUPS = Counter(
+    "embark_chat_cache_lookups",
+    "Quest chat answer cache lookups by result (hit, miss, bypass)",
+    ["result"],
+)
+STARTUP_WARMUP_DURATION = Gauge(
+    "embark_startup_warmup_seconds",
+    "Time spent in each startup warm-up phase",
+    ["phase"],
+)
+
+REST_PREFIX = "/rest/v1/"
+
+
+def postgrest_call(method: str, path: str, prefer: str = "") -> Optional[Tuple[str, str]]:
+    """
+    Classify a PostgREST request as (table or RPC name, operation)
+
+    Returns:
+        The labels, or None if the path isn't a PostgREST endpoint
+    """
+    _, _, resource = path.partition(REST_PREFIX)
+    if not resource:
+        return None
+    if resource.startswith("rpc/"):
+        return resource[4:], "rpc"
+
+    method = method.upper()
+    if method in ("GET", "HEAD"):
+        operation = "select"
+    elif method == "POST":
+        operation = "upsert" if "resolution=merge-duplicates" in prefer else "insert"
+    elif method == "PATCH":
+        operation = "update"
+    elif method == "DELETE":
+        operation = "delete"
+    else:
+        operation = method.lower()
+    return resource.split("?", 1)[0], operation
+
+
+def record_db_call(target: str, operation: str, seconds: float, ok: bool = True) -> None:
+    """Record one data-layer call"""
+    DB_REQUEST_DURATION.labels(target, operation, "ok" if ok else "error").observe(seconds)
+
+
+@contextmanager
+def time_openai_call(model: str) -> Iterator[None]:
+    """Time an OpenAI API call, labelled by model and outcome"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (GeneratorExit, asyncio.CancelledError):
+        # A stream closed early because the client went away
+        outcome = "cancelled"
+        raise
+    finally:
+        OPENAI_REQUEST_DURATION.labels(model, outcome).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in Prometheus text format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
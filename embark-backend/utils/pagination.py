@@ -0,0 +1,163 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort column values and id
+of the last row on a page. The next page is every row ordered after it, so a
+deep page costs the same as the first and rows don't shift when data changes
+between requests. The row id is always the final tie-breaker so the order is
+total.
+"""
+import base64
+import json
+from bisect import bisect_right
+from datetime import datetime
+from functools import cmp_to_key
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (column, desc) pairs; the id tie-breaker is appended automatically
+Order = Sequence[Tuple[str, bool]]
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def with_tiebreaker(order: Order) -> List[Tuple[str, bool]]:
+    """Append the id column to an order unless it's already the last key"""
+    order = list(order)
+    if not order or order[-1][0] != "id":
+        order.append(("id", False))
+    return order
+
+
+def _value(row: Any, column: str) -> Any:
+    value = row.get(column) if isinstance(row, dict) else getattr(row, column)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, float, str, bool)):
+        return str(value)
+    return value
+
+
+def encode_cursor(row: Any, order: Order) -> str:
+    """Build the cursor pointing just after a row (model or dict)"""
+    values = [_value(row, column) for column, _ in with_tiebreaker(order)]
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: Order) -> List[Any]:
+    """Decode a cursor into the sort values for an order
+
+    Raises:
+        ValueError: If the cursor is malformed or was built for another order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(with_tiebreaker(order)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def next_cursor(rows: Sequence[Any], limit: int, order: Order) -> Optional[str]:
+    """Cursor for the page after rows, or None when this was the last page"""
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(rows[-1], order)
+
+
+def cursor_headers(rows: Sequence[Any], limit: int, order: Order) -> Dict[str, str]:
+    """Response headers carrying the next page cursor, if there may be more rows"""
+    cursor = next_cursor(rows, limit, order)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+
+def set_next_cursor(response: Any, rows: Sequence[Any], limit: int, order: Order) -> None:
+    """Add the next page cursor header to a response when there may be more rows"""
+    response.headers.update(cursor_headers(rows, limit, order))
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    # Quote so commas, dots and parentheses in the value aren't parsed as syntax
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def keyset_filter(order: Order, values: List[Any]) -> str:
+    """
+    PostgREST or= filter selecting the rows ordered after the cursor values
+
+    For order (a asc, b desc, id asc) this is:
+    a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND id > vid)
+    """
+    order = with_tiebreaker(order)
+    branches = []
+    for i, (column, desc) in enumerate(order):
+        conditions = [
+            f"{prior}.eq.{_literal(value)}"
+            for (prior, _), value in zip(order[:i], values[:i])
+        ]
+        conditions.append(f"{column}.{'lt' if desc else 'gt'}.{_literal(values[i])}")
+        branches.append(
+            conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})"
+        )
+    return ",".join(branches)
+
+
+def apply_keyset(query: Any, order: Order, cursor: Optional[str]) -> Any:
+    """Order a PostgREST query by order + id and, with a cursor, start after it"""
+    order = with_tiebreaker(order)
+    if cursor:
+        values = decode_cursor(cursor, order)
+        if len(order) == 1:
+            column, desc = order[0]
+            query = query.lt(column, values[0]) if desc else query.gt(column, values[0])
+        else:
+            query = query.or_(keyset_filter(order, values))
+    for column, desc in order:
+        query = query.order(column, desc=desc)
+    return query
+
+
+def _comparator(order: List[Tuple[str, bool]]):
+    def compare(a: List[Any], b: List[Any]) -> int:
+        for (_, desc), x, y in zip(order, a, b):
+            if x == y:
+                continue
+            result = -1 if x < y else 1
+            return -result if desc else result
+        return 0
+
+    return compare
+
+
+def keyset_slice(rows: List[Any], order: Order, cursor: Optional[str], limit: int) -> List[Any]:
+    """
+    Page of in-memory rows (already sorted by order + id) after a cursor
+
+    Uses a binary search, so deep pages cost the same as the first.
+
+    Raises:
+        ValueError: If the cursor is invalid, including values of the wrong type
+    """
+    if not cursor:
+        return rows[:limit]
+
+    order = with_tiebreaker(order)
+    values = decode_cursor(cursor, order)
+    key = cmp_to_key(_comparator(order))
+    try:
+        start = bisect_right(
+            rows,
+            key(values),
+            key=lambda row: key([_value(row, column) for column, _ in order]),
+        )
+    except TypeError:
+        raise ValueError("Invalid cursor")
+    return rows[start:start + limit]
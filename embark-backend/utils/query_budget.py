@@ -0,0 +1,83 @@
+"""
+Per-request accounting of data-layer calls.
+
+Each HTTP request gets a QueryTracker in a context variable. The Supabase
+HTTP transport records every PostgREST call against the current tracker, and
+because asyncio tasks and worker threads copy the context, calls made from
+gathered tasks or `asyncio.to_thread` are counted against the same request.
+"""
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Iterable, List, Optional, Tuple
+
+# Query parameters that shape the response but aren't row filters
+NON_FILTER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class QueryTracker:
+    """Data-layer calls made while handling one request"""
+
+    __slots__ = ("count", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, shape: str) -> None:
+        self.count += 1
+        self.shapes[shape] += 1
+
+    def repeated(self, limit: int) -> List[Tuple[str, int]]:
+        """Query shapes issued more than `limit` times, most frequent first"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > limit]
+
+
+_current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar(
+    "query_tracker", default=None
+)
+
+
+def start_tracking() -> Tuple[QueryTracker, Token]:
+    """Begin counting data-layer calls for the current request"""
+    tracker = QueryTracker()
+    return tracker, _current_tracker.set(tracker)
+
+
+def stop_tracking(token: Token) -> None:
+    _current_tracker.reset(token)
+
+
+def current_tracker() -> Optional[QueryTracker]:
+    return _current_tracker.get()
+
+
+def query_shape(target: str, operation: str, params: Iterable[Tuple[str, str]]) -> str:
+    """
+    Describe a call by table/RPC, operation and filter shape, without values
+
+    `quests?id=eq.1` and `quests?id=eq.2` share the shape `select quests id=eq`,
+    which is what a per-row lookup loop looks like.
+    """
+    filters = []
+    for key, value in params:
+        if key in NON_FILTER_PARAMS:
+            continue
+        if key in ("or", "and"):
+            filters.append(key)
+        else:
+            # PostgREST filters are "<operator>.<value>" (optionally "not.<operator>.")
+            operator, _, rest = value.partition(".")
+            if operator == "not":
+                operator += "." + rest.partition(".")[0]
+            filters.append(f"{key}={operator}")
+    shape = f"{operation} {target}"
+    if filters:
+        shape += " " + "&".join(sorted(filters))
+    return shape
+
+
+def record_query(target: str, operation: str, params: Iterable[Tuple[str, str]]) -> None:
+    """Count a data-layer call against the current request, if any"""
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(query_shape(target, operation, params))